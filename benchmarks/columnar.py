@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Compare payload size and client decode time of row-major and columnar results.
+
+    python benchmarks/columnar.py --rows 100000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from daemon import columnar
+from daemon.models import QueryResponse
+from synthetic import COLUMNS, analytical_rows
+
+TYPES = ['FIXED', 'DATE', 'TIMESTAMP_NTZ', 'TEXT', 'TEXT', 'TEXT', 'TEXT', 'TEXT',
+         'FIXED', 'FIXED', 'FIXED', 'FIXED']
+
+
+def timed(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic result rows (default: 100000)")
+    args = parser.parse_args()
+
+    response = QueryResponse(
+        success=True,
+        data=analytical_rows(args.rows),
+        columns=COLUMNS,
+        column_types=[{'name': name, 'type': type_name} for name, type_name in zip(COLUMNS, TYPES)],
+        row_count=args.rows
+    )
+    rows_body = response.model_dump_json()
+    encoded, encode_seconds = timed(columnar.encode_response, response)
+    columnar_body = encoded.model_dump_json()
+
+    _, rows_decode = timed(json.loads, rows_body)
+    parsed, parse_seconds = timed(json.loads, columnar_body)
+    _, transpose_seconds = timed(columnar.decode, parsed)
+
+    print(f"synthetic, {args.rows} rows x {len(COLUMNS)} columns")
+    print(f"{'format':<10} {'bytes':>14} {'encode s':>10} {'decode s':>10}")
+    print(f"{'rows':<10} {len(rows_body):>14,} {'-':>10} {rows_decode:>10.3f}")
+    print(f"{'columnar':<10} {len(columnar_body):>14,} {encode_seconds:>10.3f} "
+          f"{parse_seconds + transpose_seconds:>10.3f}")
+    print(f"columnar is {len(rows_body) / len(columnar_body):.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
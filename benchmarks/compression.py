@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""Compare wire size and latency of /query responses with and without compression.
+
+By default a synthetic result is served in-process through the daemon's
+CompressionMiddleware. With --sql the query runs against a live daemon.
+
+    python benchmarks/compression.py --rows 100000
+    python benchmarks/compression.py --sql "SELECT * FROM big_table" --limit 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+import httpx
+
+from daemon.client import DAEMON_URL
+from daemon.compression import CompressionMiddleware, supported_encodings
+from daemon.models import QueryResponse
+from synthetic import COLUMNS, analytical_rows
+
+
+def synthetic_client(rows: int):
+    """A TestClient for an app serving one pre-encoded synthetic result."""
+    from fastapi import FastAPI
+    from fastapi.responses import Response
+    from fastapi.testclient import TestClient
+
+    data = analytical_rows(rows)
+    body = QueryResponse(success=True, data=data, columns=COLUMNS, row_count=rows).model_dump_json()
+
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware)
+
+    @app.post("/query")
+    def query():
+        return Response(body, media_type="application/json")
+
+    return TestClient(app)
+
+
+def measure(post, encoding: str, repeat: int):
+    """Median latency (seconds) and wire bytes for one Accept-Encoding."""
+    timings = []
+    wire = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = post({"Accept-Encoding": encoding})
+        response.json()
+        timings.append(time.perf_counter() - started)
+        wire = response.num_bytes_downloaded
+    return statistics.median(timings), wire
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic result rows (default: 100000)")
+    parser.add_argument("--sql", help="Query a running daemon instead of a synthetic result")
+    parser.add_argument("--limit", type=int, default=100000, help="Row limit for --sql (default: 100000)")
+    parser.add_argument("--url", default=DAEMON_URL, help=f"Daemon URL for --sql (default: {DAEMON_URL})")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per encoding (default: 5)")
+    args = parser.parse_args()
+
+    if args.sql:
+        payload = {"sql": args.sql, "limit": args.limit}
+
+        def post(headers):
+            return httpx.post(f"{args.url}/query", json=payload, headers=headers, timeout=600.0)
+        label = f"{args.sql!r} (limit {args.limit})"
+    else:
+        client = synthetic_client(args.rows)
+
+        def post(headers):
+            return client.post("/query", headers=headers)
+        label = f"synthetic, {args.rows} rows x {len(COLUMNS)} columns"
+
+    print(label)
+    print(f"{'encoding':<10} {'wire bytes':>14} {'ratio':>7} {'median s':>10}")
+    baseline = None
+    for encoding in ['identity'] + supported_encodings():
+        latency, wire = measure(post, encoding, args.repeat)
+        baseline = baseline or wire
+        print(f"{encoding:<10} {wire:>14,} {baseline / wire:>6.1f}x {latency:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Measure /query serialization cost per 100k rows: Pydantic response model vs orjson.
+
+"before" returns the QueryResponse through FastAPI's response_model, as
+/query used to; "after" returns the body built by daemon.serialization.
+
+    python benchmarks/serialization.py --rows 100000
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+# Add project root to path
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from fastapi import FastAPI
+from fastapi.responses import Response
+from fastapi.testclient import TestClient
+
+from daemon import serialization
+from daemon.models import QueryResponse
+from synthetic import COLUMNS, analytical_rows
+
+
+def median_seconds(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Synthetic result rows (default: 100000)")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (default: 5)")
+    args = parser.parse_args()
+
+    response = QueryResponse(
+        success=True, data=analytical_rows(args.rows), columns=COLUMNS, row_count=args.rows
+    )
+
+    app = FastAPI()
+
+    @app.get("/before", response_model=QueryResponse)
+    async def before():
+        return response
+
+    @app.get("/after")
+    async def after():
+        return Response(serialization.response_body(response), media_type="application/json")
+
+    client = TestClient(app)
+    scale = 100000 / args.rows
+
+    print(f"synthetic, {args.rows} rows x {len(COLUMNS)} columns; seconds per 100k rows")
+    print(f"{'path':<28} {'before':>8} {'after':>8} {'speedup':>8}")
+    measurements = [
+        ("encode only", response.model_dump_json, lambda: serialization.response_body(response)),
+        ("HTTP round trip", lambda: client.get("/before"), lambda: client.get("/after")),
+    ]
+    for label, old, new in measurements:
+        old_seconds = median_seconds(old, args.repeat) * scale
+        new_seconds = median_seconds(new, args.repeat) * scale
+        print(f"{label:<28} {old_seconds:>8.3f} {new_seconds:>8.3f} {old_seconds / new_seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
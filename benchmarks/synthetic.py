@@ -0,0 +1,47 @@
+"""Synthetic query results shaped like a typical wide analytical table.
+
+Low-cardinality text columns, dates, timestamps, decimals and integers,
+the mix that dominates the daemon's large results.
+"""
+import random
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, List, Tuple
+
+COLUMNS = [
+    'ORDER_ID', 'ORDER_DATE', 'UPDATED_AT', 'REGION', 'COUNTRY', 'CHANNEL',
+    'STATUS', 'PRODUCT_LINE', 'QUANTITY', 'UNIT_PRICE', 'DISCOUNT', 'AMOUNT',
+]
+
+REGIONS = ['AMER', 'EMEA', 'APAC', 'LATAM']
+COUNTRIES = ['US', 'CA', 'GB', 'DE', 'FR', 'JP', 'AU', 'BR', 'MX', 'IN']
+CHANNELS = ['web', 'store', 'partner', 'phone']
+STATUSES = ['SHIPPED', 'PENDING', 'CANCELLED', 'RETURNED']
+PRODUCT_LINES = ['Hardware', 'Software', 'Services', 'Support', 'Training']
+
+
+def analytical_rows(count: int, seed: int = 0) -> List[Tuple[Any, ...]]:
+    """``count`` rows in COLUMNS order, as the connector returns them."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        quantity = rng.randint(1, 50)
+        price = Decimal(rng.randint(100, 99999)).scaleb(-2)
+        discount = Decimal(rng.choice([0, 5, 10, 15])).scaleb(-2)
+        updated = start + timedelta(seconds=rng.randint(0, 365 * 86400))
+        rows.append((
+            1_000_000 + i,
+            date(2024, 1, 1) + timedelta(days=rng.randint(0, 364)),
+            updated,
+            rng.choice(REGIONS),
+            rng.choice(COUNTRIES),
+            rng.choice(CHANNELS),
+            rng.choice(STATUSES),
+            rng.choice(PRODUCT_LINES),
+            quantity,
+            price,
+            discount,
+            (price * quantity * (1 - discount)).quantize(Decimal('0.01')),
+        ))
+    return rows
@@ -0,0 +1,69 @@
+"""Byte budgets that bound the size of a query response."""
+from typing import Any, Optional, Tuple
+
+
+class ByteBudget:
+    """Running byte budget for the rows of one response.
+
+    Sizes are approximations of the encoded cell (characters for text,
+    length for binary, ``str()`` length otherwise). Text and binary cells
+    longer than ``max_cell_bytes`` are cut; text cells end with a marker.
+    Binary cells get none, since it would be unreadable once the cell is
+    hex-encoded; ``truncated_cells`` counts them all. Rows are accepted
+    until the next one would not fit in ``max_bytes``.
+    """
+
+    MARKER = "...[{} bytes truncated]"
+
+    def __init__(self, max_bytes: int, max_cell_bytes: Optional[int] = None):
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self.max_bytes = max_bytes
+        # Default lets a single cell take at most a quarter of the budget
+        self.max_cell_bytes = max_cell_bytes or max(1, max_bytes // 4)
+        self.used = 0
+        self.bytes_omitted = 0
+        self.truncated_cells = 0
+        self.exhausted = False
+
+    @staticmethod
+    def cell_size(value: Any) -> int:
+        """Approximate encoded size of one cell."""
+        if value is None:
+            return 4
+        if isinstance(value, (str, bytes, bytearray)):
+            return len(value)
+        return len(str(value))
+
+    @classmethod
+    def rows_size(cls, rows) -> int:
+        """Approximate encoded size of ``rows``, cell by cell."""
+        return sum(cls.cell_size(value) for row in rows for value in row)
+
+    def _cut(self, value: Any) -> Any:
+        """Shorten a text or binary cell over the per-cell cap."""
+        if not isinstance(value, (str, bytes, bytearray)) or len(value) <= self.max_cell_bytes:
+            return value
+
+        omitted = len(value) - self.max_cell_bytes
+        self.bytes_omitted += omitted
+        self.truncated_cells += 1
+        if isinstance(value, str):
+            return value[:self.max_cell_bytes] + self.MARKER.format(omitted)
+        return bytes(value[:self.max_cell_bytes])
+
+    def fit(self, row: Tuple[Any, ...]) -> Optional[Tuple[Any, ...]]:
+        """Return the row with oversized cells cut, or None once it does not fit.
+
+        A row that does not fit marks the budget exhausted and counts
+        towards ``bytes_omitted``.
+        """
+        fitted = tuple(self._cut(value) for value in row)
+        size = sum(self.cell_size(value) for value in fitted)
+        if self.used + size > self.max_bytes:
+            self.exhausted = True
+            self.bytes_omitted += size
+            return None
+
+        self.used += size
+        return fitted
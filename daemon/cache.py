@@ -0,0 +1,160 @@
+"""In-daemon LRU cache of query results."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+from daemon.models import QueryResponse
+
+
+class CacheEntry:
+    """A cached response plus what is needed to expire or invalidate it."""
+
+    def __init__(
+        self,
+        response: QueryResponse,
+        size: int,
+        objects: Set[str],
+        metadata: bool = False,
+        qualified: Optional[Set[Tuple[Optional[str], Optional[str], str]]] = None
+    ):
+        self.response = response
+        self.size = size
+        self.objects = objects
+        self.metadata = metadata  # SHOW/DESCRIBE output, stale after any DDL
+        self.qualified = qualified or set()
+        self.stored_at = time.time()
+
+
+class ResultCache:
+    """LRU result cache bounded by total bytes, with a per-entry TTL.
+
+    Keys are built by the executor from normalized SQL, the session state
+    and the row limit. Entries remember which objects they read so that
+    writes through the executor can drop exactly the affected results.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 300.0,
+        check_freshness: bool = False
+    ):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.check_freshness = check_freshness
+
+        self._entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ResultCache"]:
+        """Create a cache from DAEMON_CACHE_* variables (None if disabled)."""
+        max_bytes = int(os.getenv('DAEMON_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+        if max_bytes <= 0:
+            return None
+        return cls(
+            max_bytes=max_bytes,
+            ttl=float(os.getenv('DAEMON_CACHE_TTL', '300')),
+            check_freshness=os.getenv('DAEMON_CACHE_CHECK_FRESHNESS', 'false').lower() == 'true'
+        )
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        """Look up an entry, counting a hit or a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.time() - entry.stored_at > self.ttl:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CacheEntry) -> bool:
+        """Store an entry, evicting least recently used ones to fit the budget."""
+        if entry.size > self.max_bytes:
+            return False
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            while self._entries and self._bytes + entry.size > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+            self._entries[key] = entry
+            self._bytes += entry.size
+        return True
+
+    def discard(self, key: Hashable):
+        """Drop one entry (e.g. when it failed a freshness check)."""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self.invalidations += 1
+
+    def invalidate(self, objects: Iterable[str], ddl: bool = False) -> int:
+        """Drop entries that read any of ``objects``.
+
+        With ``ddl=True`` every SHOW/DESCRIBE result is dropped as well.
+        An empty ``objects`` means the writer is unknown (e.g. CALL), so
+        everything is dropped. Returns the number of entries removed.
+        """
+        objects = set(objects)
+        with self._lock:
+            if not objects:
+                stale = list(self._entries)
+            else:
+                stale = [
+                    key for key, entry in self._entries.items()
+                    if entry.objects & objects or (ddl and entry.metadata)
+                ]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+        return len(stale)
+
+    def clear(self):
+        """Drop every entry (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: Hashable):
+        """Remove an entry; caller holds the lock."""
+        entry = self._entries.pop(key)
+        self._bytes -= entry.size
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for the /cache endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl,
+                'check_freshness': self.check_freshness,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+            }
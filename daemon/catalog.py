@@ -0,0 +1,511 @@
+"""In-memory catalog of databases, schemas, tables and columns.
+
+A database is bulk-loaded with three INFORMATION_SCHEMA queries (schemata,
+tables, columns) the first time it is looked up; the session's database is
+loaded at startup. From then on lookups are dictionary reads.
+
+A background thread refreshes the databases looked up since its last
+cycle incrementally: one query lists every table with its LAST_ALTERED,
+and columns are read again only for tables that are new or changed.
+Databases nobody looked up are only marked stale, so an idle daemon does
+not keep a warehouse running. DDL run through the executor marks the
+databases it may have changed stale, and a stale database is refreshed
+before its next lookup.
+
+The catalog holds what the current role can see; a role change empties it.
+"""
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, TypeVar
+
+from daemon.connection_pool import SnowflakeConnectionPool
+from daemon.state import SessionState, StateManager
+from daemon.statements import qualified_objects, quote_identifier, split_object_name
+
+# DDL on databases or schemas; group 1 is the object kind
+_CONTAINER_DDL = re.compile(
+    r'^\s*\w+\s+(?:OR\s+REPLACE\s+)?(?:TRANSIENT\s+)?(DATABASE|SCHEMA)\b',
+    re.IGNORECASE
+)
+
+# Up to this many changed tables have their columns re-read by name;
+# more than that re-reads the whole COLUMNS view in one query
+INCREMENTAL_MAX_TABLES = 200
+
+_SCHEMATA_SQL = (
+    "SELECT SCHEMA_NAME, SCHEMA_OWNER, CREATED, COMMENT "
+    "FROM {db}.INFORMATION_SCHEMA.SCHEMATA"
+)
+_TABLES_SQL = (
+    "SELECT TABLE_SCHEMA, TABLE_NAME, TABLE_TYPE, ROW_COUNT, BYTES, LAST_ALTERED, COMMENT "
+    "FROM {db}.INFORMATION_SCHEMA.TABLES WHERE TABLE_SCHEMA <> 'INFORMATION_SCHEMA'"
+)
+_COLUMNS_SQL = (
+    "SELECT TABLE_SCHEMA, TABLE_NAME, COLUMN_NAME, ORDINAL_POSITION, DATA_TYPE, IS_NULLABLE, "
+    "COLUMN_DEFAULT, CHARACTER_MAXIMUM_LENGTH, NUMERIC_PRECISION, NUMERIC_SCALE, COMMENT "
+    "FROM {db}.INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA <> 'INFORMATION_SCHEMA'"
+)
+
+TableKey = Tuple[str, str]  # (schema, table)
+
+T = TypeVar('T')
+
+
+class NotLoaded(Exception):
+    """Raised by MetadataCatalog.cached() when a lookup would need a query."""
+
+
+def like_pattern(pattern: str) -> "re.Pattern":
+    """Case-insensitive regex for a SQL LIKE pattern, as SHOW ... LIKE matches."""
+    regex = ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def _match(names: Iterable[str], name: str) -> Optional[str]:
+    """The exact name if present, else the only case-insensitive match."""
+    names = list(names)
+    if name in names:
+        return name
+    folded = [candidate for candidate in names if candidate.upper() == name.upper()]
+    return folded[0] if len(folded) == 1 else None
+
+
+class _Database:
+    """Loaded metadata of one database. Replaced, never changed, on refresh."""
+
+    def __init__(
+        self,
+        name: str,
+        schemas: Dict[str, Dict[str, Any]],
+        tables: Dict[str, Dict[str, Dict[str, Any]]],
+        columns: Dict[TableKey, List[Dict[str, Any]]]
+    ):
+        self.name = name
+        self.schemas = schemas
+        self.tables = tables  # schema -> table -> info
+        self.columns = columns  # (schema, table) -> columns in ordinal order
+        self.loaded_at = time.time()
+        # Upper-cased column name -> tables that have such a column
+        self.column_index: Dict[str, List[TableKey]] = {}
+        for key, table_columns in columns.items():
+            for column in table_columns:
+                self.column_index.setdefault(column['name'].upper(), []).append(key)
+
+    @property
+    def table_count(self) -> int:
+        return sum(len(names) for names in self.tables.values())
+
+    @property
+    def column_count(self) -> int:
+        return sum(len(columns) for columns in self.columns.values())
+
+
+class MetadataCatalog:
+    """Indexed cache of metadata, loaded per database and kept fresh.
+
+    Lookups are blocking only when something must be (re)loaded; cached()
+    runs a lookup only if it can be answered from memory.
+    """
+
+    def __init__(
+        self,
+        pool: SnowflakeConnectionPool,
+        state_manager: StateManager,
+        refresh_interval: float = 300.0
+    ):
+        self.pool = pool
+        self.state_manager = state_manager
+        self.refresh_interval = refresh_interval
+
+        self._role: Optional[str] = state_manager.get_state().role
+        self._database_list: Optional[List[Dict[str, Any]]] = None
+        self._databases: Dict[str, _Database] = {}
+        self._stale: Set[str] = set()
+        # Looked up since the last refresh cycle
+        self._used: Set[str] = set()
+        self._list_used = False
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.loads = 0
+        self.refreshes = 0
+        self.invalidations = 0
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        pool: SnowflakeConnectionPool,
+        state_manager: StateManager
+    ) -> Optional["MetadataCatalog"]:
+        """Create a catalog from DAEMON_CATALOG_REFRESH (None if 0)."""
+        interval = float(os.getenv('DAEMON_CATALOG_REFRESH', '300'))
+        if interval <= 0:
+            return None
+        return cls(pool, state_manager, refresh_interval=interval)
+
+    # Background refresh
+
+    def start(self):
+        """Load the session's database and keep refreshing in the background."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="catalog-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the background refresh."""
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                self.last_error = str(e)
+            if self._stop.wait(self.refresh_interval):
+                return
+
+    def refresh(self):
+        """Refresh what was looked up since the last call.
+
+        The first call loads the database list and the session's database.
+        Loaded databases that were not looked up are marked stale instead,
+        and an unused database list is dropped; both reload on demand.
+        """
+        self._check_role()
+        with self._lock:
+            used, self._used = self._used, set()
+            list_used, self._list_used = self._list_used, False
+            if self.refreshes:
+                self._stale |= set(self._databases) - used
+                if not list_used:
+                    self._database_list = None
+
+        if self.refreshes == 0:
+            self._load_database_list()
+            database = self.state_manager.get_state().database
+            names = [database] if database else []
+        else:
+            if list_used:
+                self._load_database_list()
+            names = [name for name in self._databases if name in used]
+        for name in names:
+            try:
+                self._get(name, refresh=True)
+            except Exception as e:
+                self.last_error = str(e)
+        self.refreshes += 1
+        self.last_refresh = time.time()
+
+    # Invalidation
+
+    def invalidate(self, sql: str, state: SessionState):
+        """Mark the databases a DDL statement may have changed as stale."""
+        with self._lock:
+            container = _CONTAINER_DDL.match(sql)
+            if container:
+                # The target may be any database: refresh them all
+                stale = set(self._databases)
+                if container.group(1).upper() == 'DATABASE':
+                    self._database_list = None
+            else:
+                stale = {database for database, _, _ in qualified_objects(sql) if database}
+                if state.database:
+                    stale.add(state.database)
+                stale &= set(self._databases)
+            self._stale |= stale
+            self.invalidations += 1
+
+    def clear(self):
+        """Drop all metadata; it is reloaded on the next lookup."""
+        with self._lock:
+            self._database_list = None
+            self._databases = {}
+            self._stale = set()
+
+    def _check_role(self):
+        """Empty the catalog if the role changed since it was filled."""
+        role = self.state_manager.get_state().role
+        if role != self._role:
+            with self._lock:
+                self._role = role
+                self._database_list = None
+                self._databases = {}
+                self._stale = set()
+
+    # Loading
+
+    def _fetch(self, sql: str, params: Optional[Sequence[Any]] = None) -> Tuple[List[str], List[Tuple]]:
+        """Run one metadata query; returns column names and rows."""
+        with self.pool.connection(self.state_manager.get_state()) as member:
+            cursor = member.connection.connect().cursor()
+            try:
+                cursor.execute(sql, params)
+                columns = [desc[0] for desc in cursor.description or []]
+                return columns, cursor.fetchall()
+            finally:
+                cursor.close()
+
+    def _load_database_list(self) -> List[Dict[str, Any]]:
+        columns, rows = self._fetch("SHOW DATABASES")
+        index = {name.lower(): i for i, name in enumerate(columns)}
+        wanted = {'name': 'name', 'owner': 'owner', 'created': 'created_on', 'comment': 'comment'}
+        databases = [
+            {key: row[index[column]] if column in index else None for key, column in wanted.items()}
+            for row in rows
+        ]
+        self._database_list = databases
+        return databases
+
+    def _schemas(self, db: str) -> Dict[str, Dict[str, Any]]:
+        _, rows = self._fetch(_SCHEMATA_SQL.format(db=db))
+        return {
+            name: {'name': name, 'owner': owner, 'created': created, 'comment': comment}
+            for name, owner, created, comment in rows
+        }
+
+    def _tables(self, database: str, db: str) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        _, rows = self._fetch(_TABLES_SQL.format(db=db))
+        tables: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for schema, name, kind, row_count, size, last_altered, comment in rows:
+            tables.setdefault(schema, {})[name] = {
+                'database': database,
+                'schema': schema,
+                'name': name,
+                'kind': kind,
+                'rows': row_count,
+                'bytes': size,
+                'last_altered': last_altered,
+                'comment': comment,
+            }
+        return tables
+
+    def _columns(self, db: str, only: Optional[List[TableKey]] = None) -> Dict[TableKey, List[Dict[str, Any]]]:
+        sql = _COLUMNS_SQL.format(db=db)
+        params: List[Any] = []
+        if only:
+            sql += " AND (" + " OR ".join(["(TABLE_SCHEMA = ? AND TABLE_NAME = ?)"] * len(only)) + ")"
+            for schema, name in only:
+                params.extend([schema, name])
+        _, rows = self._fetch(sql, params or None)
+
+        columns: Dict[TableKey, List[Dict[str, Any]]] = {}
+        for (schema, table, name, position, data_type, nullable, default,
+             length, precision, scale, comment) in rows:
+            info: Dict[str, Any] = {
+                'name': name,
+                'type': data_type,
+                'nullable': nullable == 'YES',
+                'default': default,
+                'position': position,
+                'comment': comment,
+            }
+            if precision is not None:
+                info['precision'] = precision
+            if scale is not None:
+                info['scale'] = scale
+            if length is not None:
+                info['length'] = length
+            columns.setdefault((schema, table), []).append(info)
+        for table_columns in columns.values():
+            table_columns.sort(key=lambda column: column['position'] or 0)
+        return columns
+
+    def _load(self, name: str) -> _Database:
+        """Bulk-load one database: schemata, tables, columns."""
+        db = quote_identifier(name)
+        return _Database(name, self._schemas(db), self._tables(name, db), self._columns(db))
+
+    def _refresh(self, old: _Database) -> _Database:
+        """Reload a database, re-reading columns only for changed tables."""
+        db = quote_identifier(old.name)
+        schemas = self._schemas(db)
+        tables = self._tables(old.name, db)
+        changed = [
+            (schema, name)
+            for schema, names in tables.items()
+            for name, info in names.items()
+            if old.tables.get(schema, {}).get(name, {}).get('last_altered') != info['last_altered']
+        ]
+        if len(changed) > INCREMENTAL_MAX_TABLES:
+            columns = self._columns(db)
+        else:
+            # Keep columns of unchanged tables; dropped tables fall out
+            columns = {
+                key: table_columns for key, table_columns in old.columns.items()
+                if key[1] in tables.get(key[0], {})
+            }
+            if changed:
+                columns.update(self._columns(db, changed))
+        return _Database(old.name, schemas, tables, columns)
+
+    def _get(self, name: str, refresh: bool = False) -> _Database:
+        """Loaded metadata of a database, loading or refreshing it if needed."""
+        with self._load_lock:
+            current = self._databases.get(name)
+            if current is not None and not refresh and name not in self._stale:
+                return current  # Loaded while this thread waited
+
+            role = self._role
+            with self._lock:
+                # DDL arriving during the load marks it stale again
+                self._stale.discard(name)
+            try:
+                loaded = self._refresh(current) if current is not None else self._load(name)
+            except Exception:
+                if current is not None:
+                    with self._lock:
+                        self._stale.add(name)
+                raise
+            with self._lock:
+                if role == self._role:
+                    self._databases[name] = loaded
+            self.loads += 1
+            return loaded
+
+    # Lookups
+
+    def _database_name(self, database: Optional[str]) -> str:
+        """Database a lookup refers to, as stored by Snowflake."""
+        if database is None:
+            name = self.state_manager.get_state().database
+            if not name:
+                raise LookupError("No database given and none selected in the session")
+            return name
+        parts = split_object_name(database)
+        if len(parts) != 1:
+            raise LookupError(f"Not a database name: {database}")
+        known = list(self._databases) + [entry['name'] for entry in self._database_list or []]
+        return _match(known, parts[0]) or parts[0]
+
+    def _database(self, database: Optional[str]) -> _Database:
+        self._check_role()
+        name = self._database_name(database)
+        self._used.add(name)
+        loaded = self._databases.get(name)
+        if loaded is not None and name not in self._stale:
+            return loaded
+        self._require_query()
+        return self._get(name)
+
+    def _require_query(self):
+        """Stop a lookup running under cached() before it blocks."""
+        if getattr(self._local, 'memory_only', False):
+            raise NotLoaded()
+
+    def cached(self, lookup: Callable[..., T], *args: Any) -> T:
+        """Run a lookup method only if it needs no query or lock wait.
+
+        Raises NotLoaded otherwise; the caller then runs it where blocking
+        is fine. Checked during the lookup itself, so metadata that goes
+        stale concurrently cannot slip a query onto the caller's thread.
+        """
+        self._local.memory_only = True
+        try:
+            return lookup(*args)
+        finally:
+            self._local.memory_only = False
+
+    def _schema_name(self, db: _Database, schema: Optional[str]) -> str:
+        if schema is None:
+            state = self.state_manager.get_state()
+            if not state.schema or state.database != db.name:
+                raise LookupError(f"No schema given and none selected in {db.name}")
+            schema = quote_identifier(state.schema)
+        parts = split_object_name(schema)
+        name = _match(db.schemas, parts[-1]) if parts else None
+        if name is None:
+            raise LookupError(f"Schema not found: {db.name}.{schema}")
+        return name
+
+    def databases(self) -> List[Dict[str, Any]]:
+        """Databases visible to the role (SHOW DATABASES)."""
+        self._check_role()
+        self._list_used = True
+        databases = self._database_list
+        if databases is None:
+            self._require_query()
+            with self._load_lock:
+                databases = self._database_list or self._load_database_list()
+        return databases
+
+    def schemas(self, database: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Schemas of a database (default: the session's)."""
+        return list(self._database(database).schemas.values())
+
+    def tables(
+        self,
+        database: Optional[str] = None,
+        schema: Optional[str] = None,
+        like: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Tables and views, in one schema or the whole database.
+
+        ``like`` filters names like SHOW TABLES LIKE does.
+        """
+        db = self._database(database)
+        if schema is not None:
+            found = list(db.tables.get(self._schema_name(db, schema), {}).values())
+        else:
+            found = [info for names in db.tables.values() for info in names.values()]
+        if like is not None:
+            pattern = like_pattern(like)
+            found = [info for info in found if pattern.fullmatch(info['name'])]
+        return found
+
+    def table(self, name: str) -> Dict[str, Any]:
+        """One table or view with its columns; ``name`` may be qualified."""
+        parts = split_object_name(name)
+        if not 1 <= len(parts) <= 3:
+            raise LookupError(f"Not a table name: {name}")
+        db = self._database(quote_identifier(parts[0]) if len(parts) == 3 else None)
+        schema = self._schema_name(db, quote_identifier(parts[-2]) if len(parts) >= 2 else None)
+        table = _match(db.tables.get(schema, {}), parts[-1])
+        if table is None:
+            raise LookupError(f"Table not found: {db.name}.{schema}.{parts[-1]}")
+        return {**db.tables[schema][table], 'columns': db.columns.get((schema, table), [])}
+
+    def find_columns(self, column: str, database: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Tables that have a column of this name (case-insensitive)."""
+        db = self._database(database)
+        parts = split_object_name(column)
+        key = (parts[-1] if parts else column).upper()
+        return [
+            {'database': db.name, 'schema': schema, 'table': table, 'column': info}
+            for schema, table in db.column_index.get(key, [])
+            for info in db.columns[(schema, table)]
+            if info['name'].upper() == key
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Catalog contents and refresh statistics."""
+        databases = dict(self._databases)
+        return {
+            'role': self._role,
+            'databases': len(self._database_list) if self._database_list is not None else None,
+            'loaded': {
+                name: {
+                    'schemas': len(db.schemas),
+                    'tables': db.table_count,
+                    'columns': db.column_count,
+                    'loaded_at': db.loaded_at,
+                }
+                for name, db in databases.items()
+            },
+            'stale': sorted(self._stale),
+            'loads': self.loads,
+            'refreshes': self.refreshes,
+            'invalidations': self.invalidations,
+            'refresh_interval': self.refresh_interval,
+            'last_refresh': self.last_refresh,
+            'last_error': self.last_error,
+        }
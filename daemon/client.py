@@ -1,8 +1,11 @@
 import httpx
+import json
 import subprocess
 import time
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Union
+from urllib.parse import quote
+from daemon.compression import accept_encoding
 
 DAEMON_URL = "http://127.0.0.1:8765"
 DAEMON_SCRIPT = "daemon.server:app"
@@ -11,8 +14,12 @@ DAEMON_SCRIPT = "daemon.server:app"
 class DaemonClient:
     """Client for communicating with the daemon."""
 
-    def __init__(self, base_url: str = DAEMON_URL):
+    def __init__(self, base_url: str = DAEMON_URL, client_id: Optional[str] = None):
         self.base_url = base_url
+        # The daemon's scheduler limits concurrent queries per client ID
+        self.client_id = client_id or os.getenv('DAEMON_CLIENT_ID') or f"pid-{os.getpid()}"
+        # httpx decodes compressed responses itself; zstd needs zstandard
+        self.headers = {"X-Client-Id": self.client_id, "Accept-Encoding": accept_encoding()}
 
     def is_running(self) -> bool:
         """Check if daemon is running."""
@@ -64,16 +71,174 @@ class DaemonClient:
                 "error": str(e)
             }
 
-    def query(self, sql: str, limit: int = 100, format: str = "table") -> Dict[str, Any]:
-        """Execute query via daemon."""
+    def query(
+        self,
+        sql: str,
+        limit: int = 100,
+        format: str = "json",
+        page_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        params: Optional[Union[List[Any], Dict[str, Any]]] = None,
+        timeout_seconds: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Execute query via daemon.
+
+        With ``page_size``, the result holds the first page and a
+        ``query_id`` to pass to fetch_page() for the rest. ``max_bytes``
+        caps the size of the returned rows; see ``bytes_omitted``.
+        ``params`` are bind values: a list for ``?`` placeholders or a
+        dict for ``:name`` placeholders. ``timeout_seconds`` makes
+        Snowflake cancel the statement after that long.
+        """
         if not self.start_daemon():
             return {"success": False, "error": "Failed to start daemon"}
 
+        payload = {"sql": sql, "limit": limit, "format": format}
+        if page_size:
+            payload["page_size"] = page_size
+        if max_bytes:
+            payload["max_bytes"] = max_bytes
+        if params is not None:
+            payload["params"] = params
+        http_timeout = 300.0  # 5 minutes for long queries
+        if timeout_seconds:
+            payload["timeout_seconds"] = timeout_seconds
+            # Leave room for Snowflake to report the timeout itself
+            http_timeout = max(http_timeout, timeout_seconds + 30.0)
+
         try:
             response = httpx.post(
                 f"{self.base_url}/query",
-                json={"sql": sql, "limit": limit, "format": format},
-                timeout=300.0  # 5 minutes for long queries
+                headers=self.headers,
+                json=payload,
+                timeout=http_timeout
+            )
+            return response.json()
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "error": "Query timeout (exceeded 5 minutes)"
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def batch(
+        self,
+        statements: Optional[List[str]] = None,
+        script: Optional[str] = None,
+        stop_on_error: bool = True,
+        limit: int = 100
+    ) -> Dict[str, Any]:
+        """Run several statements in one request; results are per statement."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.post(
+                f"{self.base_url}/batch",
+                headers=self.headers,
+                json={
+                    "statements": statements,
+                    "script": script,
+                    "stop_on_error": stop_on_error,
+                    "limit": limit
+                },
+                timeout=300.0
+            )
+            return response.json()
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "error": "Batch timeout (exceeded 5 minutes)"
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def insert_rows(
+        self,
+        table: str,
+        rows: Union[List[List[Any]], Dict[str, List[Any]]],
+        columns: Optional[List[str]] = None,
+        method: str = "auto"
+    ) -> Dict[str, Any]:
+        """Bulk-load rows into ``table``.
+
+        ``rows`` is a list of rows (with ``columns``) or a columnar dict of
+        column name to values. Small batches use one array-bound INSERT,
+        large ones a staged COPY INTO.
+        """
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        payload: Dict[str, Any] = {"table": table, "method": method}
+        if isinstance(rows, dict):
+            payload["data"] = rows
+        else:
+            payload["columns"] = columns
+            payload["rows"] = rows
+
+        try:
+            response = httpx.post(
+                f"{self.base_url}/ingest",
+                content=json.dumps(payload, default=str),
+                headers={**self.headers, "Content-Type": "application/json"},
+                timeout=300.0
+            )
+            return response.json()
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "error": "Ingest timeout (exceeded 5 minutes)"
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def export(
+        self,
+        sql: str,
+        path: str,
+        format: str = "parquet",
+        parallel: int = 10
+    ) -> Dict[str, Any]:
+        """Unload a query result to Parquet or gzipped CSV files under ``path``.
+
+        ``path`` is a directory on the daemon's machine.
+        """
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.post(
+                f"{self.base_url}/export",
+                headers=self.headers,
+                json={
+                    "sql": sql,
+                    "path": os.path.abspath(path),
+                    "format": format,
+                    "parallel": parallel
+                },
+                timeout=3600.0  # unload and download of large extracts
+            )
+            return response.json()
+        except httpx.TimeoutException:
+            return {
+                "success": False,
+                "error": "Export timeout (exceeded 1 hour)"
+            }
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def fetch_page(self, query_id: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+        """Fetch a page (1-based) of an earlier paged result."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.get(
+                f"{self.base_url}/results/{query_id}",
+                headers=self.headers,
+                params={"offset": (page - 1) * page_size, "size": page_size},
+                timeout=300.0
             )
             return response.json()
         except httpx.TimeoutException:
@@ -84,6 +249,190 @@ class DaemonClient:
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    def render(
+        self,
+        sql: str,
+        format: str = "table",
+        limit: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[Union[bytes, Dict[str, Any]]]:
+        """Execute query and yield its output rendered by the daemon.
+
+        ``format`` is ``table`` (markdown), ``csv`` or ``json``. Yields bytes
+        to write out as they arrive; a failure yields one
+        ``{"success": False, "error": ...}`` dict instead.
+        """
+        if not self.start_daemon():
+            yield {"success": False, "error": "Failed to start daemon"}
+            return
+
+        try:
+            with httpx.stream(
+                "POST",
+                f"{self.base_url}/query/render",
+                headers=self.headers,
+                json={"sql": sql, "format": format, "limit": limit, "chunk_size": chunk_size},
+                timeout=300.0  # per read; each batch resets the clock
+            ) as response:
+                if "x-result-format" not in response.headers:
+                    # Failed before any output: a QueryResponse (or a 429)
+                    response.read()
+                    yield {"success": False, **response.json()}
+                    return
+                for chunk in response.iter_bytes():
+                    yield chunk
+        except httpx.TimeoutException:
+            yield {"success": False, "error": "Query timeout (no data for 5 minutes)"}
+        except Exception as e:
+            yield {"success": False, "error": str(e)}
+
+    def query_stream(
+        self,
+        sql: str,
+        limit: Optional[int] = None,
+        chunk_size: int = 1000
+    ) -> Iterator[Dict[str, Any]]:
+        """Execute query and yield result messages as they arrive.
+
+        Messages are dicts with a ``type`` of ``schema`` (columns),
+        ``rows`` (a batch in ``data``), ``end`` (row_count, execution_time)
+        or ``error``.
+        """
+        if not self.start_daemon():
+            yield {"type": "error", "error": "Failed to start daemon"}
+            return
+
+        try:
+            with httpx.stream(
+                "POST",
+                f"{self.base_url}/query/stream",
+                headers=self.headers,
+                json={"sql": sql, "limit": limit, "chunk_size": chunk_size},
+                timeout=300.0  # per read; each batch resets the clock
+            ) as response:
+                if response.status_code == 429:
+                    response.read()
+                    yield {"type": "error", **response.json()}
+                    return
+                for line in response.iter_lines():
+                    if line:
+                        yield json.loads(line)
+        except httpx.TimeoutException:
+            yield {"type": "error", "error": "Query timeout (no data for 5 minutes)"}
+        except Exception as e:
+            yield {"type": "error", "error": str(e)}
+
+    def query_many(
+        self,
+        queries: List[str],
+        limit: int = 100,
+        max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Run independent queries concurrently; results in ``queries`` order.
+
+        Each result is a query response dict with its ``index``.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+
+        def fill(error: str) -> List[Dict[str, Any]]:
+            return [
+                result if result is not None else {"index": index, "success": False, "error": error}
+                for index, result in enumerate(results)
+            ]
+
+        if not self.start_daemon():
+            return fill("Failed to start daemon")
+
+        try:
+            with httpx.stream(
+                "POST",
+                f"{self.base_url}/fanout",
+                headers=self.headers,
+                json={"queries": queries, "limit": limit, "max_concurrency": max_concurrency},
+                timeout=300.0  # per read; each finished query resets the clock
+            ) as response:
+                if response.status_code == 429:
+                    response.read()
+                    return fill(response.json()["error"])
+                for line in response.iter_lines():
+                    if line:
+                        result = json.loads(line)
+                        results[result["index"]] = result
+        except httpx.TimeoutException:
+            return fill("Query timeout (no result for 5 minutes)")
+        except Exception as e:
+            return fill(str(e))
+
+        return fill("No result returned")
+
+    def query_arrow(self, sql: str, limit: Optional[int] = None):
+        """Execute query and return the result as a ``pyarrow.Table``.
+
+        Requires pyarrow. Raises RuntimeError if the query fails.
+        """
+        import pyarrow as pa
+
+        if not self.start_daemon():
+            raise RuntimeError("Failed to start daemon")
+
+        response = httpx.post(
+            f"{self.base_url}/query",
+            headers=self.headers,
+            json={"sql": sql, "limit": limit, "format": "arrow"},
+            timeout=300.0
+        )
+        if not response.headers.get("content-type", "").startswith("application/vnd.apache.arrow"):
+            raise RuntimeError(response.json().get("error", "Unknown error"))
+
+        return pa.ipc.open_stream(response.content).read_all()
+
+    def query_pandas(self, sql: str, limit: Optional[int] = None):
+        """Execute query and return the result as a pandas DataFrame."""
+        return self.query_arrow(sql, limit=limit).to_pandas()
+
+    def submit(self, sql: str) -> Dict[str, Any]:
+        """Submit a query as a background job; returns its query ID."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.post(
+                f"{self.base_url}/jobs",
+                headers=self.headers,
+                json={"sql": sql},
+                timeout=30.0
+            )
+            return response.json()
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def poll(self, query_id: str, limit: int = 100) -> Dict[str, Any]:
+        """Get job status; includes results in 'result' once 'done' is true."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.get(
+                f"{self.base_url}/jobs/{query_id}",
+                headers=self.headers,
+                params={"limit": limit},
+                timeout=60.0
+            )
+            return response.json()
+        except Exception as e:
+            return {"success": False, "query_id": query_id, "error": str(e)}
+
+    def cancel(self, query_id: str) -> Dict[str, Any]:
+        """Cancel a running job."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.delete(f"{self.base_url}/jobs/{query_id}", timeout=30.0)
+            return response.json()
+        except Exception as e:
+            return {"success": False, "query_id": query_id, "error": str(e)}
+
     def state(self) -> Dict[str, Any]:
         """Get current session state (database, schema, warehouse, role)."""
         if not self.start_daemon():
@@ -99,6 +448,83 @@ class DaemonClient:
                 "error": str(e)
             }
 
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get result cache statistics."""
+        if not self.start_daemon():
+            return {"error": "Failed to start daemon"}
+
+        try:
+            response = httpx.get(f"{self.base_url}/cache", timeout=5.0)
+            return response.json()
+        except Exception as e:
+            return {"error": str(e)}
+
+    def clear_cache(self) -> Dict[str, Any]:
+        """Drop all cached results."""
+        if not self.start_daemon():
+            return {"error": "Failed to start daemon"}
+
+        try:
+            response = httpx.delete(f"{self.base_url}/cache", timeout=5.0)
+            return response.json()
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _catalog_get(self, path: str, **params: Optional[str]) -> Dict[str, Any]:
+        """GET a /catalog endpoint; None parameters are left out."""
+        if not self.start_daemon():
+            return {"success": False, "error": "Failed to start daemon"}
+
+        try:
+            response = httpx.get(
+                f"{self.base_url}/catalog{path}",
+                params={key: value for key, value in params.items() if value is not None},
+                timeout=300.0  # the first lookup in a database loads it
+            )
+            return response.json()
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+
+    def catalog_stats(self) -> Dict[str, Any]:
+        """Get metadata catalog contents and refresh statistics."""
+        return self._catalog_get("")
+
+    def databases(self) -> Dict[str, Any]:
+        """List databases from the catalog."""
+        return self._catalog_get("/databases")
+
+    def schemas(self, database: Optional[str] = None) -> Dict[str, Any]:
+        """List schemas of a database (default: the session's) from the catalog."""
+        return self._catalog_get("/schemas", database=database)
+
+    def tables(
+        self,
+        database: Optional[str] = None,
+        schema: Optional[str] = None,
+        like: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """List tables and views from the catalog, optionally filtered LIKE a pattern."""
+        return self._catalog_get("/tables", database=database, schema=schema, like=like)
+
+    def describe(self, table: str) -> Dict[str, Any]:
+        """Get one table or view with its columns from the catalog."""
+        return self._catalog_get(f"/tables/{quote(table, safe='')}")
+
+    def find_columns(self, name: str, database: Optional[str] = None) -> Dict[str, Any]:
+        """Find the tables that have a column called ``name``."""
+        return self._catalog_get("/columns", name=name, database=database)
+
+    def clear_catalog(self) -> Dict[str, Any]:
+        """Drop all cached metadata."""
+        if not self.start_daemon():
+            return {"error": "Failed to start daemon"}
+
+        try:
+            response = httpx.delete(f"{self.base_url}/catalog", timeout=5.0)
+            return response.json()
+        except Exception as e:
+            return {"error": str(e)}
+
     def stop_daemon(self) -> Dict[str, Any]:
         """Stop the daemon (graceful shutdown)."""
         if not self.is_running():
@@ -0,0 +1,111 @@
+"""Column-major result encoding with dictionary encoding for repetitive text.
+
+A columnar result sends one array per column instead of one array per row.
+Text columns where most values repeat send each distinct value once in a
+``dictionary`` plus integer ``indices`` into it.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+from snowflake.connector.constants import FIELD_ID_TO_NAME
+
+from daemon.models import QueryResponse
+
+# Dictionary-encode a text column when distinct values are at most this
+# fraction of its non-null values
+DICTIONARY_MAX_RATIO = 0.5
+
+
+def column_types(description: Optional[Sequence[Sequence[Any]]]) -> List[Dict[str, Any]]:
+    """Type metadata per column from ``cursor.description``."""
+    types = []
+    for desc in description or []:
+        fields = list(desc) + [None] * (7 - len(desc))
+        name, type_code, _, internal_size, precision, scale, nullable = fields[:7]
+        info: Dict[str, Any] = {
+            'name': name,
+            'type': FIELD_ID_TO_NAME.get(type_code) if isinstance(type_code, int) else None,
+            'nullable': nullable,
+        }
+        if precision is not None:
+            info['precision'] = precision
+        if scale is not None:
+            info['scale'] = scale
+        if internal_size is not None:
+            info['length'] = internal_size
+        types.append(info)
+    return types
+
+
+def _is_text(values: List[Any], type_name: Optional[str]) -> bool:
+    if type_name is not None:
+        return type_name == 'TEXT'
+    return any(value is not None for value in values) and all(
+        value is None or isinstance(value, str) for value in values
+    )
+
+
+def encode_column(values: List[Any], type_name: Optional[str] = None) -> Dict[str, Any]:
+    """``{"values": [...]}``, or ``{"dictionary": [...], "indices": [...]}``
+    for low-cardinality text (NULLs stay null indices)."""
+    if _is_text(values, type_name):
+        positions: Dict[str, int] = {}
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+            else:
+                indices.append(positions.setdefault(value, len(positions)))
+        present = len(values) - indices.count(None)
+        if present and len(positions) <= present * DICTIONARY_MAX_RATIO:
+            return {'dictionary': list(positions), 'indices': indices}
+    return {'values': values}
+
+
+def encode(
+    rows: Sequence[Sequence[Any]],
+    columns: Sequence[str],
+    types: Optional[List[Dict[str, Any]]] = None
+) -> List[Dict[str, Any]]:
+    """Transpose rows into one encoded entry per column."""
+    vectors = [list(vector) for vector in zip(*rows)] if rows else [[] for _ in columns]
+    type_names = [info.get('type') for info in types] if types else [None] * len(columns)
+    return [encode_column(vector, type_name) for vector, type_name in zip(vectors, type_names)]
+
+
+def encode_response(response: QueryResponse) -> QueryResponse:
+    """Copy of a row-major response with ``columnar`` in place of ``data``."""
+    return response.model_copy(update={
+        'columnar': encode(response.data, response.columns or [], response.column_types),
+        'data': None,
+    })
+
+
+def decode_column(entry: Dict[str, Any]) -> List[Any]:
+    """Values of one encoded column."""
+    if 'dictionary' in entry:
+        dictionary = entry['dictionary']
+        return [None if index is None else dictionary[index] for index in entry['indices']]
+    return entry['values']
+
+
+def _row_major(result: Dict[str, Any]) -> bool:
+    """Whether a response came back in ``data`` instead (spilled results do)."""
+    return result.get('columnar') is None and result.get('data') is not None
+
+
+def decode(result: Dict[str, Any]) -> Dict[str, List[Any]]:
+    """Column name -> values for a columnar (or row-major) /query response."""
+    columns = result.get('columns') or []
+    if _row_major(result):
+        return {name: [row[i] for row in result['data']] for i, name in enumerate(columns)}
+    return {
+        name: decode_column(entry)
+        for name, entry in zip(columns, result.get('columnar') or [])
+    }
+
+
+def to_rows(result: Dict[str, Any]) -> List[List[Any]]:
+    """Row-major rows of a columnar (or row-major) /query response."""
+    if _row_major(result):
+        return [list(row) for row in result['data']]
+    return [list(row) for row in zip(*(decode_column(entry) for entry in result.get('columnar') or []))]
@@ -0,0 +1,172 @@
+"""Negotiated response compression (zstd or gzip) for the daemon's HTTP API.
+
+zstd needs the optional ``zstandard`` package; gzip is always available.
+Complete bodies are compressed only from ``minimum_size`` bytes up.
+Streamed bodies (NDJSON, Arrow, spilled results) are compressed chunk by
+chunk, each chunk flushed so the client can decode it on arrival.
+Compression runs on a worker thread so the event loop keeps serving.
+
+Both codecs use fast levels: on a local connection any compression costs
+more time than it saves, so the server only enables this on request.
+"""
+import asyncio
+import importlib.util
+import zlib
+from typing import List, Optional, Sequence
+
+# Complete bodies smaller than this go out uncompressed
+DEFAULT_MIN_BYTES = 1024
+
+# Content types that are already compressed
+INCOMPRESSIBLE_TYPES = ('application/gzip', 'application/zstd', 'application/zip', 'image/')
+
+
+def zstd_available() -> bool:
+    """Whether the zstandard package is installed."""
+    return importlib.util.find_spec('zstandard') is not None
+
+
+def supported_encodings() -> List[str]:
+    """Content codings this process can produce and decode, preferred first."""
+    return ['zstd', 'gzip'] if zstd_available() else ['gzip']
+
+
+def accept_encoding() -> str:
+    """Accept-Encoding header value for requests to the daemon."""
+    return ', '.join(supported_encodings())
+
+
+def choose_encoding(header: str, available: Sequence[str]) -> Optional[str]:
+    """Pick the coding for an Accept-Encoding header, or None for identity.
+
+    The highest q-value wins; ties go to the order of ``available``.
+    """
+    weights = {}
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class _Compressor:
+    """Incremental compressor for one response body."""
+
+    def __init__(self, encoding: str, level: Optional[int] = None):
+        if encoding == 'zstd':
+            import zstandard
+
+            self._obj = zstandard.ZstdCompressor(level=level or 1).compressobj()
+            self._sync = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits 31: gzip container
+            self._obj = zlib.compressobj(level or 1, zlib.DEFLATED, 31)
+            self._sync = zlib.Z_SYNC_FLUSH
+
+    def compress(self, data: bytes, final: bool = False) -> bytes:
+        """Compress a chunk; everything so far is decodable on return."""
+        if final:
+            return self._obj.compress(data) + self._obj.flush()
+        return self._obj.compress(data) + self._obj.flush(self._sync)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing HTTP responses the client accepts."""
+
+    def __init__(self, app, minimum_size: int = DEFAULT_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encodings = supported_encodings()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        header = ''
+        for name, value in scope.get('headers', []):
+            if name == b'accept-encoding':
+                header = value.decode('latin-1')
+        encoding = choose_encoding(header, self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(scope, receive, _Responder(send, encoding, self.minimum_size).send)
+
+
+class _Responder:
+    """Rewrites the response messages of one request."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self._start = None
+        self._compressor: Optional[_Compressor] = None
+        self._passthrough = False
+
+    def _eligible(self) -> bool:
+        for name, value in self._start['headers']:
+            if name == b'content-encoding':
+                return False
+            if name == b'content-type' and value.decode('latin-1').startswith(INCOMPRESSIBLE_TYPES):
+                return False
+        return True
+
+    def _headers(self, length: Optional[int]) -> list:
+        """Response headers for the compressed body."""
+        headers = [(name, value) for name, value in self._start['headers'] if name != b'content-length']
+        headers.append((b'content-encoding', self.encoding.encode()))
+        headers.append((b'vary', b'Accept-Encoding'))
+        if length is not None:
+            headers.append((b'content-length', str(length).encode()))
+        return headers
+
+    async def send(self, message):
+        if message['type'] == 'http.response.start':
+            # Held until the first body chunk shows whether it is streamed
+            self._start = message
+            return
+        if message['type'] != 'http.response.body' or self._passthrough:
+            await self._send(message)
+            return
+
+        body = message.get('body', b'')
+        more = message.get('more_body', False)
+
+        if self._compressor is None:
+            small = not more and len(body) < self.minimum_size
+            if small or not self._eligible():
+                self._passthrough = True
+                await self._send(self._start)
+                await self._send(message)
+                return
+
+            self._compressor = _Compressor(self.encoding)
+            if not more:
+                compressed = await asyncio.to_thread(self._compressor.compress, body, True)
+                await self._send({**self._start, 'headers': self._headers(len(compressed))})
+                await self._send({'type': 'http.response.body', 'body': compressed})
+                return
+            await self._send({**self._start, 'headers': self._headers(None)})
+
+        await self._send({
+            'type': 'http.response.body',
+            'body': await asyncio.to_thread(self._compressor.compress, body, not more),
+            'more_body': more,
+        })
@@ -1,15 +1,28 @@
 import os
-from typing import Optional
+from typing import Callable, Optional
 import snowflake.connector
 from dotenv import load_dotenv
+from daemon.state import SessionState
+from daemon.statements import quote_identifier
 
 load_dotenv()
 
 
 class SnowflakeConnection:
-    """Manages a single Snowflake connection with session state."""
+    """Manages a single Snowflake connection with session state.
 
-    def __init__(self):
+    Fields set in ``state`` override the SNOWFLAKE_* defaults and are sent
+    at login, so the session opens in that context without USE statements.
+    If that login fails (a revoked role, a dropped database), the defaults
+    are tried; when they work, the state is dropped and ``on_state_rejected``
+    is called.
+    """
+
+    def __init__(
+        self,
+        state: Optional[SessionState] = None,
+        on_state_rejected: Optional[Callable[[], None]] = None
+    ):
         self.account = os.getenv('SNOWFLAKE_ACCOUNT')
         self.user = os.getenv('SNOWFLAKE_USER')
         self.password = os.getenv('SNOWFLAKE_PAT')
@@ -17,6 +30,16 @@ class SnowflakeConnection:
         self.database = os.getenv('SNOWFLAKE_DATABASE')
         self.schema = os.getenv('SNOWFLAKE_SCHEMA')
         self.role = os.getenv('SNOWFLAKE_ROLE')
+        self.on_state_rejected = on_state_rejected
+
+        # Names taken from a session state are exact (as the server
+        # reported them) and are quoted at login; env values are not
+        self._exact = set()
+        for field in ('warehouse', 'database', 'schema', 'role'):
+            value = getattr(state, field, None) if state is not None else None
+            if value:
+                setattr(self, field, value)
+                self._exact.add(field)
 
         self._connection: Optional[snowflake.connector.SnowflakeConnection] = None
         self._validate_config()
@@ -31,17 +54,46 @@ class SnowflakeConnection:
     def connect(self) -> snowflake.connector.SnowflakeConnection:
         """Establish connection to Snowflake."""
         if self._connection is None or self._connection.is_closed():
-            self._connection = snowflake.connector.connect(
-                account=self.account,
-                user=self.user,
-                password=self.password,
-                warehouse=self.warehouse,
-                database=self.database,
-                schema=self.schema,
-                role=self.role
-            )
+            try:
+                self._connection = self._login()
+            except Exception:
+                if not self._exact:
+                    raise
+                # Fails like the first attempt if the network or credentials
+                # are the problem; the state is kept in that case
+                connection = self._login(use_state=False)
+                self._drop_state()
+                self._connection = connection
         return self._connection
 
+    def _login(self, use_state: bool = True) -> snowflake.connector.SnowflakeConnection:
+        """Open a session in the state's context, or in the env defaults'."""
+        names = {
+            field: self._login_name(field) if use_state else os.getenv(f'SNOWFLAKE_{field.upper()}')
+            for field in ('warehouse', 'database', 'schema', 'role')
+        }
+        return snowflake.connector.connect(
+            account=self.account,
+            user=self.user,
+            password=self.password,
+            paramstyle='qmark',  # server-side binding
+            **names
+        )
+
+    def _drop_state(self):
+        """Go back to the SNOWFLAKE_* defaults after the state was rejected."""
+        for field in self._exact:
+            setattr(self, field, os.getenv(f'SNOWFLAKE_{field.upper()}'))
+        self._exact = set()
+        if self.on_state_rejected is not None:
+            self.on_state_rejected()
+
+    def _login_name(self, field: str) -> Optional[str]:
+        value = getattr(self, field)
+        if value and field in self._exact:
+            return quote_identifier(value)
+        return value
+
     def close(self):
         """Close the connection."""
         if self._connection and not self._connection.is_closed():
@@ -53,6 +105,10 @@ class SnowflakeConnection:
         self.close()
         return self.connect()
 
+    def is_open(self) -> bool:
+        """Check if an underlying connection is open (no round trip)."""
+        return self._connection is not None and not self._connection.is_closed()
+
     def is_healthy(self) -> bool:
         """Check if connection is active and healthy."""
         try:
@@ -0,0 +1,322 @@
+"""Pool of persistent Snowflake connections shared by the daemon."""
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+from daemon.connection import SnowflakeConnection
+from daemon.state import SessionState
+from daemon.statements import quote_identifier, to_qmark
+
+
+# Order matters: the role decides which warehouses/databases are visible
+STATE_FIELDS = ['role', 'warehouse', 'database', 'schema']
+
+
+class PoolExhaustedError(RuntimeError):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class PooledConnection:
+    """A pool member: one SnowflakeConnection plus recycling bookkeeping."""
+
+    STATEMENT_CACHE_SIZE = 64
+
+    def __init__(
+        self,
+        connection: SnowflakeConnection,
+        session_state: Optional[SessionState] = None
+    ):
+        self.connection = connection
+        self.created_at = time.time()
+        self.use_count = 0
+        self.session_state = session_state if session_state is not None else self._default_state()
+        self._statements: "OrderedDict[Tuple[str, FrozenSet[str]], Tuple[str, List[str]]]" = OrderedDict()
+        self._statements_lock = threading.Lock()
+        self.statement_hits = 0
+
+    def _default_state(self) -> SessionState:
+        """Session state a freshly opened connection starts in."""
+        return SessionState(
+            database=self.connection.database,
+            schema=self.connection.schema,
+            warehouse=self.connection.warehouse,
+            role=self.connection.role
+        )
+
+    @property
+    def age(self) -> float:
+        """Seconds since this member was created."""
+        return time.time() - self.created_at
+
+    def apply_state(self, state: Optional[SessionState]):
+        """Replay session state onto this connection with USE statements.
+
+        Only fields that differ from what the session already has are sent,
+        so a connection that last ran in the same context costs no round trip.
+        """
+        if state is None:
+            return
+
+        pending = [
+            (field, getattr(state, field)) for field in STATE_FIELDS
+            if getattr(state, field) and getattr(state, field) != getattr(self.session_state, field)
+        ]
+        if not pending:
+            return
+
+        cursor = self.connection.connect().cursor()
+        try:
+            for field, value in pending:
+                cursor.execute(f"USE {field.upper()} {quote_identifier(value)}")
+                setattr(self.session_state, field, value)
+        finally:
+            cursor.close()
+
+    def prepare(self, sql: str, names: FrozenSet[str]) -> Tuple[str, List[str]]:
+        """Bind-ready form of a statement with named parameters.
+
+        Rewritten statements are kept in a small LRU, so a statement that
+        runs in a loop is only parsed the first time.
+        """
+        key = (sql, names)
+        with self._statements_lock:
+            prepared = self._statements.get(key)
+            if prepared is not None:
+                self._statements.move_to_end(key)
+                self.statement_hits += 1
+                return prepared
+
+        prepared = to_qmark(sql, names)
+        with self._statements_lock:
+            self._statements[key] = prepared
+            while len(self._statements) > self.STATEMENT_CACHE_SIZE:
+                self._statements.popitem(last=False)
+        return prepared
+
+    def open(self):
+        """Connect if needed. A new session starts in its login context.
+
+        That context can differ from the one this member was created with:
+        a login refused in a restored state falls back to the defaults.
+        """
+        was_open = self.connection.is_open()
+        self.connection.connect()
+        if not was_open:
+            self.session_state = self._default_state()
+
+    def reconnect(self):
+        """Force a new session; the old session's USE state is lost."""
+        self.connection.force_reconnect()
+        self.session_state = self._default_state()
+
+
+class SnowflakeConnectionPool:
+    """Thread-safe pool of Snowflake connections with recycling.
+
+    Members are checked out for the duration of one request and returned
+    afterwards. A member is retired when it is older than ``max_age``
+    seconds or has served ``max_uses`` checkouts.
+    """
+
+    def __init__(
+        self,
+        min_size: int = 1,
+        max_size: int = 5,
+        max_age: float = 3600.0,
+        max_uses: int = 1000,
+        checkout_timeout: float = 30.0,
+        connection_factory: Callable[[], SnowflakeConnection] = SnowflakeConnection
+    ):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_age = max_age
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self._factory = connection_factory
+
+        self._cond = threading.Condition()
+        self._idle: List[PooledConnection] = []
+        self._in_use: List[PooledConnection] = []
+        self._total = 0  # idle + in use + being created
+        self._closed = False
+
+        # Build (but do not connect) the minimum members now, so that
+        # configuration errors surface when the pool is created.
+        for _ in range(min_size):
+            self._idle.append(PooledConnection(self._factory()))
+            self._total += 1
+
+    @classmethod
+    def from_env(cls, **overrides) -> "SnowflakeConnectionPool":
+        """Create a pool sized from DAEMON_POOL_* environment variables."""
+        config = {
+            'min_size': int(os.getenv('DAEMON_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.getenv('DAEMON_POOL_MAX_SIZE', '5')),
+            'max_age': float(os.getenv('DAEMON_POOL_MAX_AGE', '3600')),
+            'max_uses': int(os.getenv('DAEMON_POOL_MAX_USES', '1000')),
+        }
+        config.update(overrides)
+        return cls(**config)
+
+    def _is_expired(self, member: PooledConnection) -> bool:
+        """Check whether a member should be recycled."""
+        return member.age >= self.max_age or member.use_count >= self.max_uses
+
+    def warm_up(self) -> int:
+        """Open the idle members in parallel. Returns how many are open."""
+        with self._cond:
+            members = list(self._idle)
+
+        pending = [m for m in members if not m.connection.is_open()]
+        if pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as workers:
+                list(workers.map(self._open_quietly, pending))
+
+        return sum(1 for m in members if m.connection.is_open())
+
+    @staticmethod
+    def _open_quietly(member: PooledConnection):
+        """Open a member, leaving failures to surface at checkout."""
+        try:
+            member.open()
+        except Exception:
+            pass
+
+    def checkout(
+        self,
+        state: Optional[SessionState] = None,
+        timeout: Optional[float] = None
+    ) -> PooledConnection:
+        """Take a connection from the pool, replaying ``state`` onto it.
+
+        Blocks until a member is free or ``timeout`` seconds have passed.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.time() + timeout
+        retired: List[PooledConnection] = []
+        member = None
+
+        with self._cond:
+            while member is None:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                if self._idle:
+                    candidate = self._idle.pop()  # LIFO keeps hot sessions hot
+                    if self._is_expired(candidate):
+                        self._total -= 1
+                        retired.append(candidate)
+                        continue
+                    member = candidate
+                elif self._total < self.max_size:
+                    self._total += 1
+                    break
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No Snowflake connection available after {timeout:.1f}s "
+                            f"(pool size {self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+        for old in retired:
+            old.connection.close()
+
+        if member is None:
+            try:
+                member = PooledConnection(self._factory())
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+        with self._cond:
+            self._in_use.append(member)
+
+        try:
+            member.open()
+            member.apply_state(state)
+        except Exception:
+            self.checkin(member)
+            raise
+
+        member.use_count += 1
+        return member
+
+    def checkin(self, member: PooledConnection):
+        """Return a member to the pool, retiring it if it has expired."""
+        retire = False
+        with self._cond:
+            if member in self._in_use:
+                self._in_use.remove(member)
+
+            if self._closed or self._is_expired(member):
+                self._total -= 1
+                retire = True
+            else:
+                self._idle.append(member)
+            self._cond.notify()
+
+        if retire:
+            member.connection.close()
+
+    @contextmanager
+    def connection(self, state: Optional[SessionState] = None) -> Iterator[PooledConnection]:
+        """Check out a member for the duration of a ``with`` block."""
+        member = self.checkout(state)
+        try:
+            yield member
+        finally:
+            self.checkin(member)
+
+    @property
+    def size(self) -> int:
+        """Number of members currently held by the pool."""
+        with self._cond:
+            return len(self._idle) + len(self._in_use)
+
+    @property
+    def in_use(self) -> int:
+        """Number of members currently checked out."""
+        with self._cond:
+            return len(self._in_use)
+
+    @property
+    def open_count(self) -> int:
+        """Number of members with an open Snowflake session."""
+        with self._cond:
+            members = self._idle + self._in_use
+        return sum(1 for m in members if m.connection.is_open())
+
+    def stats(self) -> Dict[str, int]:
+        """Pool counters for health reporting."""
+        with self._cond:
+            idle, in_use = len(self._idle), len(self._in_use)
+        return {
+            'size': idle + in_use,
+            'idle': idle,
+            'in_use': in_use,
+            'open': self.open_count,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+        }
+
+    def close(self):
+        """Close idle members; in-use members are closed on checkin."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+
+        for member in idle:
+            member.connection.close()
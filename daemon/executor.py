@@ -1,46 +1,312 @@
-from typing import Optional, Tuple
+import asyncio
+import importlib.util
+import io
+import json
+import os
+import tempfile
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing, contextmanager, nullcontext
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, Iterator, List, Optional, Tuple, Union
 from daemon.connection import SnowflakeConnection
-from daemon.models import QueryResponse
-from daemon.state import StateManager
+from daemon.connection_pool import STATE_FIELDS, PooledConnection, SnowflakeConnectionPool
+from daemon import ingest
+from daemon.budget import ByteBudget
+from daemon.columnar import column_types
+from daemon.spill import arrow_result, spill_cursor
+from daemon.cache import CacheEntry, ResultCache
+from daemon.catalog import MetadataCatalog
+from daemon.results import ResultHandle, ResultPager
+from daemon.scheduler import QueueFullError
+from daemon.models import (
+    BatchResponse,
+    BatchStatementResult,
+    ExportResponse,
+    IngestResponse,
+    JobResponse,
+    QueryResponse,
+)
+from daemon.state import SessionState, StateManager
 from daemon.validators import BaseValidator, ReadOnlyValidator
 from daemon.errors import enhance_error_message, is_retriable_error
+from snowflake.connector.util_text import split_statements
+from daemon.statements import (
+    CONTEXT_COMMANDS,
+    DDL_COMMANDS,
+    METADATA_COMMANDS,
+    is_object_name,
+    is_read_only,
+    is_volatile,
+    normalize_sql,
+    qualified_objects,
+    referenced_objects,
+    statement_type,
+    strip_terminator,
+)
 import time
 
 
+# Statements whose results may be served from the result cache
+CACHEABLE_COMMANDS = {'SELECT', 'WITH', 'SHOW', 'DESCRIBE', 'DESC'}
+
+# Bulk load strategies accepted by QueryExecutor.ingest()
+INGEST_METHODS = {'auto', 'executemany', 'write_pandas', 'copy'}
+
+# COPY INTO <stage> file formats accepted by QueryExecutor.export()
+EXPORT_FORMATS = {
+    'parquet': "FILE_FORMAT = (TYPE = PARQUET)",
+    'csv': "FILE_FORMAT = (TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '\"')",
+}
+
+# Media type of Arrow IPC stream bodies
+ARROW_STREAM_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Bind values: a list for ? placeholders, a dict for :name placeholders
+Params = Union[List[Any], Dict[str, Any]]
+
+
+def _statement_params(timeout_seconds: Optional[int]) -> Dict[str, Any]:
+    """Extra cursor.execute() arguments: a timeout for this statement only."""
+    if not timeout_seconds:
+        return {}
+    return {'_statement_params': {'STATEMENT_TIMEOUT_IN_SECONDS': int(timeout_seconds)}}
+
+
+def _is_write(sql: str) -> bool:
+    """Whether a statement can change data or metadata (USE only switches context)."""
+    return not is_read_only(sql) and statement_type(sql) != 'USE'
+
+
+class _Watch:
+    """Timeout and cancellation hook for one statement execution.
+
+    The worker attaches the connection the statement runs on. cancel() may
+    be called from any thread, before or during execution.
+    """
+
+    def __init__(self, timeout_seconds: Optional[int] = None):
+        self.timeout_seconds = timeout_seconds
+        self.cancelled = False
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def statement_params(self) -> Dict[str, Any]:
+        return _statement_params(self.timeout_seconds)
+
+    def attach(self, connection) -> bool:
+        """Record the connection about to run; False if already cancelled."""
+        with self._lock:
+            if self.cancelled:
+                return False
+            self._connection = connection
+            return True
+
+    def detach(self):
+        """Forget the connection; waits for a cancel() in progress to finish."""
+        with self._lock:
+            self._connection = None
+
+    def cancel(self):
+        """Skip the statement if it has not started, else cancel its session's queries.
+
+        The query ID is only known once cursor.execute() returns, so the
+        whole session is cancelled. A pooled member runs only this statement
+        while it is checked out, and the lock is held until the cancel is
+        done: detach() runs before checkin, so the member cannot be handed
+        to the next request in between. A single SnowflakeConnection is one
+        session shared by every request, so there concurrent statements are
+        cancelled too.
+        """
+        with self._lock:
+            self.cancelled = True
+            connection = self._connection
+            if connection is None:
+                return
+            cursor = connection.cursor()
+            try:
+                cursor.execute("SELECT SYSTEM$CANCEL_ALL_QUERIES(?)", (connection.session_id,))
+            finally:
+                cursor.close()
+
+
+class _Flight:
+    """An execution shared by identical concurrent requests."""
+
+    def __init__(self, key, task: asyncio.Future):
+        self.key = key
+        self.task = task
+        self.waiters = 0
+
+
+class _RowStream:
+    """Thread-safe wrapper that lets a worker-driven generator be closed
+    from another thread without racing an in-flight next()."""
+
+    def __init__(self, generator: Iterator[Dict[str, Any]]):
+        self._generator = generator
+        self._lock = threading.Lock()
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return next(self._generator, None)
+
+    def close(self):
+        with self._lock:
+            self._generator.close()
+
+
+class _ChunkSink:
+    """Write-only file object that collects Arrow IPC output for streaming."""
+
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> Iterator[bytes]:
+        """Yield the bytes written since the last drain."""
+        parts, self._parts = self._parts, []
+        if parts:
+            yield b"".join(parts)
+
+
 class QueryExecutor:
-    """Executes queries against Snowflake connection."""
+    """Executes queries against Snowflake connection.
+
+    The connector is blocking, so every call into it runs on a bounded
+    worker thread pool and the event loop stays free for other requests.
+    """
+
+    # Rows per fetchmany() call while filling a byte budget
+    BUDGET_BATCH_SIZE = 100
 
     def __init__(
         self,
-        connection: SnowflakeConnection,
+        connection: Union[SnowflakeConnection, SnowflakeConnectionPool],
         state_manager: Optional[StateManager] = None,
-        validator: Optional[BaseValidator] = None
+        validator: Optional[BaseValidator] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[ResultCache] = None,
+        catalog: Optional[MetadataCatalog] = None
     ):
         self.connection = connection
         self.state_manager = state_manager if state_manager is not None else StateManager()
         # Default to read-only for safety, but allow override
         self.validator = validator if validator is not None else ReadOnlyValidator()
+        self.cache = cache
+        self.catalog = catalog
+        self.pager = ResultPager()
+        # Submitted writes not yet seen finished: query ID -> (sql, state)
+        self._pending_writes: Dict[str, Tuple[str, SessionState]] = {}
+        # Single-flight: result key -> task of the execution in progress
+        self._in_flight: Dict[Any, asyncio.Future] = {}
+        self.flights_started = 0
+        self.flights_saved = 0
+        # A single connection is one member for its whole life, so its
+        # statement cache survives between queries
+        self._member: Optional[PooledConnection] = None
+
+        if max_workers is None:
+            max_workers = int(os.getenv('DAEMON_WORKER_THREADS', '8'))
+        self.max_workers = max_workers
+        self._workers = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="snowflake-worker"
+        )
+        # /ingest loads at least this many rows with a staged COPY
+        self.bulk_rows = int(os.getenv('DAEMON_INGEST_BULK_ROWS', '10000'))
+        # Results of more rows go to a memory-mapped spill file (0 disables)
+        self.spill_rows = int(os.getenv('DAEMON_SPILL_ROWS', '50000'))
+        self.spill_dir = os.getenv('DAEMON_SPILL_DIR') or None
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking connector call on the worker pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._workers, func, *args)
+
+    def close(self):
+        """Stop the worker pool (waits for running queries to finish)."""
+        self._workers.shutdown(wait=True)
+        self.pager.close_all()
+
+    @contextmanager
+    def _checkout(self) -> Iterator[PooledConnection]:
+        """Check out a connection with the current session state applied.
+
+        A single SnowflakeConnection keeps its own session, so it is used
+        as-is; pool members get the StateManager state replayed onto them.
+        """
+        if isinstance(self.connection, SnowflakeConnectionPool):
+            with self.connection.connection(self.state_manager.get_state()) as member:
+                yield member
+        else:
+            if self._member is None:
+                self._member = PooledConnection(self.connection, self.state_manager.get_state().model_copy())
+            else:
+                self._member.session_state = self.state_manager.get_state().model_copy()
+            yield self._member
 
     def _validate_query(self, sql: str) -> Tuple[bool, Optional[str]]:
         """Validate query using the configured validator."""
         return self.validator.validate(sql)
 
-    def _update_state_from_use_command(self, sql: str):
-        """Update state when USE command is executed."""
-        sql_upper = sql.strip().upper()
-
-        if sql_upper.startswith('USE DATABASE'):
-            db_name = sql_upper.replace('USE DATABASE', '').strip().strip(';').strip('"').strip("'")
-            self.state_manager.set_database(db_name)
-        elif sql_upper.startswith('USE SCHEMA'):
-            schema_name = sql_upper.replace('USE SCHEMA', '').strip().strip(';').strip('"').strip("'")
-            self.state_manager.set_schema(schema_name)
-        elif sql_upper.startswith('USE WAREHOUSE'):
-            wh_name = sql_upper.replace('USE WAREHOUSE', '').strip().strip(';').strip('"').strip("'")
-            self.state_manager.set_warehouse(wh_name)
-        elif sql_upper.startswith('USE ROLE'):
-            role_name = sql_upper.replace('USE ROLE', '').strip().strip(';').strip('"').strip("'")
-            self.state_manager.set_role(role_name)
+    def _capture_state(self, member: PooledConnection, sql: str):
+        """Record the session context after a statement, as the server reports it.
+
+        The connector updates its database/schema/warehouse/role from every
+        query response, so this normally costs no round trip. CURRENT_* is
+        queried only when a statement that can switch context (USE, CALL,
+        EXECUTE IMMEDIATE) leaves some of them unknown. Any statement can
+        change the context (CREATE DATABASE and CREATE SCHEMA switch to the
+        new object), so every statement is compared with the member's state
+        before it ran. Only the fields it changed reach the StateManager, so
+        ordinary queries never undo a concurrent USE.
+        """
+        conn = member.connection.connect()
+        observed = {
+            field: value for field in STATE_FIELDS
+            if isinstance(value := getattr(conn, field, None), str) and value
+        }
+        if len(observed) < len(STATE_FIELDS) and statement_type(sql) in CONTEXT_COMMANDS:
+            observed.update(self._query_state(conn))
+        if not observed:
+            return
+
+        before = member.session_state
+        changed = {
+            field: value for field, value in observed.items()
+            if value != getattr(before, field)
+        }
+        if changed:
+            self.state_manager.update(**changed)
+        member.session_state = before.model_copy(update=observed)
+
+    @staticmethod
+    def _query_state(conn) -> Dict[str, str]:
+        """Ask the server for the session's context (one round trip)."""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                "SELECT " + ", ".join(f"CURRENT_{field.upper()}()" for field in STATE_FIELDS)
+            )
+            row = cursor.fetchone()
+        except Exception:
+            return {}
+        finally:
+            cursor.close()
+        if not isinstance(row, (tuple, list)):
+            return {}
+        return {field: value for field, value in zip(STATE_FIELDS, row) if value}
 
     def _is_auth_error(self, error: Exception) -> bool:
         """Check if error is an authentication/session expiry error."""
@@ -55,34 +321,373 @@ class QueryExecutor:
         ]
         return any(indicator in error_str for indicator in auth_indicators)
 
-    async def execute(self, sql: str, limit: Optional[int] = 100) -> QueryResponse:
-        """Execute query and return results."""
-        start_time = time.time()
+    async def execute(
+        self,
+        sql: str,
+        limit: Optional[int] = 100,
+        page_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        params: Optional[Params] = None,
+        timeout_seconds: Optional[int] = None,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Execute query and return results.
+
+        With ``page_size``, only the first page is returned together with a
+        result handle (``query_id``) for fetch_page(); ``limit`` and
+        ``max_bytes`` are ignored. ``max_bytes`` bounds the size of the
+        returned rows (see ByteBudget). ``params`` are bound server-side:
+        a list for ``?`` placeholders or a dict for ``:name`` placeholders.
+        ``timeout_seconds`` sets STATEMENT_TIMEOUT_IN_SECONDS for this
+        statement only.
+
+        With ``spill``, a result of more than ``spill_rows`` rows is not
+        loaded into ``data``; the response's ``spill`` holds it in a
+        memory-mapped file instead (see daemon.spill).
 
+        Concurrent identical reads (same result key) share one execution;
+        the followers' responses carry ``deduplicated=True``.
+
+        Cancelling the awaiting task cancels the query in Snowflake too
+        (for a shared execution, once every caller has gone).
+        """
         # Validate
         is_valid, error = self._validate_query(sql)
         if not is_valid:
             return QueryResponse(success=False, error=error)
 
-        # Add LIMIT for SELECT queries
-        sql_upper = sql.strip().upper()
-        if limit and 'LIMIT' not in sql_upper and sql_upper.startswith('SELECT'):
-            sql = f"{sql.rstrip(';')} LIMIT {limit}"
+        submitted_at = time.time()
+        result_key = None if page_size else self._result_key(sql, limit, max_bytes, params)
+        cache_key = result_key if self.cache is not None else None
+        if cache_key is not None:
+            cached = await self._cached_response(cache_key, submitted_at)
+            if cached is not None:
+                return cached
+
+        args = (sql, limit, submitted_at, page_size, max_bytes, params, cache_key, timeout_seconds, spill)
+        if result_key is None:
+            return await self._run_and_store(*args)
+
+        # Callers that cannot take a spilled result, or that set another
+        # statement timeout, must not join the execution
+        flight_key = (result_key, spill, timeout_seconds)
+        flight = self._in_flight.get(flight_key)
+        if flight is not None:
+            self.flights_saved += 1
+            response = await self._join(flight)
+            return response.model_copy(update={'deduplicated': True})
 
+        # Run as its own task so that followers still get the result if the
+        # leader's caller goes away
+        flight = _Flight(flight_key, asyncio.ensure_future(self._run_and_store(*args)))
+        self._in_flight[flight_key] = flight
+        self.flights_started += 1
+        flight.task.add_done_callback(lambda _: self._end_flight(flight))
+        return await self._join(flight)
+
+    async def _join(self, flight: _Flight) -> QueryResponse:
+        """Await a shared execution; the last caller to go away cancels it."""
+        flight.waiters += 1
+        try:
+            response = await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                self._end_flight(flight)
+                flight.task.cancel()
+        if response.spill is not None:
+            # Every caller streams the spill and closes it when done
+            response.spill.share()
+        return response
+
+    def _end_flight(self, flight: _Flight):
+        """Stop offering a flight to new callers."""
+        if self._in_flight.get(flight.key) is flight:
+            del self._in_flight[flight.key]
+
+    async def _run_and_store(
+        self,
+        sql: str,
+        limit: Optional[int],
+        submitted_at: float,
+        page_size: Optional[int],
+        max_bytes: Optional[int],
+        params: Optional[Params],
+        cache_key,
+        timeout_seconds: Optional[int] = None,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Execute on a worker, then update the result cache."""
+        watch = _Watch(timeout_seconds)
+        try:
+            response = await self.run_blocking(
+                self._execute_sync, sql, limit, submitted_at, page_size, max_bytes, params, watch, spill
+            )
+        except asyncio.CancelledError:
+            # Nobody is waiting any more: stop the warehouse work too. Not on
+            # the worker pool, which may be full of queued statements.
+            threading.Thread(target=watch.cancel, daemon=True).start()
+            raise
+
+        if response.success and response.has_more:
+            self._prefetch(response.query_id, page_size, page_size)
+
+        if response.success:
+            if cache_key is not None:
+                # Spilled results are too big for the in-memory cache
+                if response.spill is None:
+                    self._store_result(cache_key, sql, response)
+            else:
+                self._note_write(sql)
+        return response
+
+    def flight_stats(self) -> Dict[str, int]:
+        """Single-flight counters: executions started and executions saved."""
+        return {
+            'in_flight': len(self._in_flight),
+            'executions': self.flights_started,
+            'saved': self.flights_saved,
+        }
+
+    def _result_key(
+        self,
+        sql: str,
+        limit: Optional[int],
+        max_bytes: Optional[int] = None,
+        params: Optional[Params] = None
+    ):
+        """Key for sharing a result (cache, single-flight), or None for
+        statements whose results must not be shared."""
+        if statement_type(sql) not in CACHEABLE_COMMANDS or is_volatile(sql):
+            return None
+        state = self.state_manager.get_state()
+        return (
+            normalize_sql(sql),
+            (state.database, state.schema, state.warehouse, state.role),
+            limit,
+            max_bytes,
+            json.dumps(params, sort_keys=True, default=str) if params is not None else None
+        )
+
+    async def _cached_response(self, key, submitted_at: float) -> Optional[QueryResponse]:
+        """Serve a cached result, re-checking LAST_ALTERED if configured."""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+
+        if self.cache.check_freshness and entry.qualified:
+            if not await self.run_blocking(self._is_fresh, entry):
+                self.cache.discard(key)
+                return None
+
+        return entry.response.model_copy(update={
+            "cached": True,
+            "execution_time": time.time() - submitted_at,
+            "queue_time": 0.0,
+        })
+
+    def _store_result(self, key, sql: str, response: QueryResponse):
+        """Add a successful read to the result cache.
+
+        The size is measured on the worker thread (``data_bytes``), so large
+        results are not walked again on the event loop.
+        """
+        data_bytes = response.data_bytes
+        if data_bytes is None:
+            data_bytes = ByteBudget.rows_size(response.data or ())
+        self.cache.put(key, CacheEntry(
+            response=response,
+            size=data_bytes + sum(len(name) for name in response.columns or ()),
+            objects=referenced_objects(sql),
+            metadata=statement_type(sql) in METADATA_COMMANDS,
+            qualified=qualified_objects(sql)
+        ))
+
+    def _note_write(self, sql: str, state: Optional[SessionState] = None):
+        """Invalidate cached results and catalog metadata a write may have changed.
+
+        ``state`` is the session the statement ran in, if not the current one.
+        """
+        if not _is_write(sql):
+            return
+        ddl = statement_type(sql) in DDL_COMMANDS
+        if self.cache is not None:
+            self.cache.invalidate(referenced_objects(sql), ddl=ddl)
+        if ddl and self.catalog is not None:
+            self.catalog.invalidate(sql, state or self.state_manager.get_state())
+
+    def _is_fresh(self, entry: CacheEntry) -> bool:
+        """Check that no table behind a cached result changed after it was stored."""
+        state = self.state_manager.get_state()
+        by_database: Dict[str, list] = {}
+        for database, schema, name in entry.qualified:
+            database = database or state.database
+            if not database:
+                return False
+            by_database.setdefault(database, []).append((schema or state.schema, name))
+
+        try:
+            with self._checkout() as member:
+                cursor = member.connection.connect().cursor()
+                try:
+                    for database, tables in by_database.items():
+                        conditions = []
+                        params = []
+                        for schema, name in tables:
+                            if schema:
+                                conditions.append("(TABLE_SCHEMA = ? AND TABLE_NAME = ?)")
+                                params.extend([schema, name])
+                            else:
+                                conditions.append("(TABLE_NAME = ?)")
+                                params.append(name)
+                        quoted_db = '"' + database.replace('"', '""') + '"'
+                        cursor.execute(
+                            f"SELECT MAX(LAST_ALTERED) FROM {quoted_db}.INFORMATION_SCHEMA.TABLES "
+                            f"WHERE {' OR '.join(conditions)}",
+                            params
+                        )
+                        row = cursor.fetchone()
+                        last_altered = row[0] if row else None
+                        if last_altered is not None and last_altered.timestamp() > entry.stored_at:
+                            return False
+                finally:
+                    cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _execute_sync(
+        self,
+        sql: str,
+        limit: Optional[int],
+        submitted_at: float,
+        page_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        params: Optional[Params] = None,
+        watch: Optional[_Watch] = None,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Worker-thread body of execute(); times queueing separately."""
+        start_time = time.time()
+        response = self._execute_blocking(
+            sql, limit, start_time, page_size, max_bytes, params, watch, spill
+        )
+        response.queue_time = start_time - submitted_at
+        return response
+
+    def _execute_blocking(
+        self,
+        sql: str,
+        limit: Optional[int],
+        start_time: float,
+        page_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        params: Optional[Params] = None,
+        watch: Optional[_Watch] = None,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Check out a connection and run the statement."""
+        try:
+            with self._checkout() as member:
+                return self._execute_on(
+                    member, sql, start_time, page_size, limit, max_bytes, params, watch, spill
+                )
+        except Exception as e:
+            execution_time = time.time() - start_time
+            enhanced_error = enhance_error_message(str(e), sql)
+            return QueryResponse(
+                success=False,
+                error=enhanced_error,
+                execution_time=execution_time
+            )
+
+    def _execute_on(
+        self,
+        member: PooledConnection,
+        sql: str,
+        start_time: float,
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        params: Optional[Params] = None,
+        watch: Optional[_Watch] = None,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Run one statement on a checked-out connection.
+
+        Without ``page_size``, at most ``limit`` rows (and ``max_bytes``)
+        are fetched; the rest of the result is dropped with the cursor.
+        """
+        watch = watch or _Watch()
+        try:
+            return self._execute_watched(
+                member, sql, start_time, page_size, limit, max_bytes, params, watch, spill
+            )
+        finally:
+            watch.detach()
+
+    def _execute_watched(
+        self,
+        member: PooledConnection,
+        sql: str,
+        start_time: float,
+        page_size: Optional[int],
+        limit: Optional[int],
+        max_bytes: Optional[int],
+        params: Optional[Params],
+        watch: _Watch,
+        spill: bool = False
+    ) -> QueryResponse:
+        """Body of _execute_on() with ``watch`` able to cancel the query."""
         # Try executing, with one retry on auth errors
         for attempt in range(2):
             try:
-                conn = self.connection.connect()
+                conn = member.connection.connect()
+                if not watch.attach(conn):
+                    return QueryResponse(
+                        success=False,
+                        error="Query cancelled before it started",
+                        execution_time=time.time() - start_time
+                    )
                 cursor = conn.cursor()
-                cursor.execute(sql)
+                self._execute_bound(member, cursor, sql, params, **watch.statement_params())
 
-                # Track USE commands and update state
-                if sql_upper.startswith('USE'):
-                    self._update_state_from_use_command(sql)
+                self._capture_state(member, sql)
 
-                rows = cursor.fetchall()
                 columns = [desc[0] for desc in cursor.description] if cursor.description else []
 
+                if page_size:
+                    # Keep the cursor open so later pages skip re-execution
+                    handle = self.pager.register(ResultHandle(
+                        cursor.sfqid, columns, cursor=cursor,
+                        total_rows=self._rowcount(cursor)
+                    ))
+                    with handle.lock:
+                        rows = handle.read(0, page_size)
+                    return self._page_response(handle, 0, rows, page_size, start_time)
+
+                total_rows = self._rowcount(cursor)
+                if spill and not max_bytes and self._should_spill(total_rows, limit):
+                    spilled = spill_cursor(cursor, columns, limit, self.spill_dir)
+                    cursor.close()
+                    return QueryResponse(
+                        success=True,
+                        columns=columns,
+                        column_types=column_types(cursor.description),
+                        row_count=spilled.row_count,
+                        execution_time=time.time() - start_time,
+                        truncated=total_rows > spilled.row_count,
+                        total_rows=total_rows,
+                        spill=spilled
+                    )
+
+                budget = ByteBudget(max_bytes) if max_bytes else None
+                if budget is not None:
+                    rows, truncated = self._fetch_budgeted(cursor, limit, budget)
+                else:
+                    rows, truncated = self._fetch_limited(cursor, limit)
+                total_rows = total_rows if truncated else len(rows)
+
                 cursor.close()
 
                 execution_time = time.time() - start_time
@@ -91,14 +696,21 @@ class QueryExecutor:
                     success=True,
                     data=rows,
                     columns=columns,
+                    column_types=column_types(cursor.description),
                     row_count=len(rows),
-                    execution_time=execution_time
+                    execution_time=execution_time,
+                    truncated=truncated,
+                    total_rows=total_rows,
+                    bytes_omitted=budget.bytes_omitted if budget else None,
+                    truncated_cells=budget.truncated_cells if budget else None,
+                    data_bytes=budget.used if budget else ByteBudget.rows_size(rows)
                 )
             except Exception as e:
                 # On auth error, try to reconnect once
                 if attempt == 0 and self._is_auth_error(e):
-                    # Force reconnect and retry
-                    self.connection.force_reconnect()
+                    # Force reconnect, restore session state and retry
+                    member.reconnect()
+                    member.apply_state(self.state_manager.get_state())
                     continue
 
                 # Otherwise, return enhanced error
@@ -116,3 +728,778 @@ class QueryExecutor:
             error="Maximum retry attempts exceeded",
             execution_time=time.time() - start_time
         )
+
+    @staticmethod
+    def _execute_bound(
+        member: PooledConnection,
+        cursor,
+        sql: str,
+        params: Optional[Params],
+        **kwargs: Any
+    ):
+        """cursor.execute() with ``params`` bound: a list for ``?``, a dict for ``:name``."""
+        if params is None:
+            cursor.execute(sql, **kwargs)
+        elif isinstance(params, dict):
+            bound_sql, names = member.prepare(sql, frozenset(params))
+            cursor.execute(bound_sql, [params[name] for name in names], **kwargs)
+        else:
+            cursor.execute(sql, list(params), **kwargs)
+
+    def _should_spill(self, total_rows: Optional[int], limit: Optional[int]) -> bool:
+        """Whether a result of ``total_rows`` rows, read up to ``limit``, is spilled."""
+        if not self.spill_rows or total_rows is None:
+            return False
+        rows = total_rows if limit is None else min(total_rows, limit)
+        return rows > self.spill_rows
+
+    @staticmethod
+    def _fetch_limited(cursor, limit: Optional[int]) -> Tuple[list, bool]:
+        """Fetch at most ``limit`` rows; the flag is True if rows were left unread.
+
+        One extra row is fetched to tell a result of exactly ``limit`` rows
+        from a longer one.
+        """
+        if not limit:
+            return cursor.fetchall(), False
+        rows = cursor.fetchmany(limit + 1)
+        if len(rows) > limit:
+            return rows[:limit], True
+        return rows, False
+
+    @classmethod
+    def _fetch_budgeted(cls, cursor, limit: Optional[int], budget: ByteBudget) -> Tuple[list, bool]:
+        """Like _fetch_limited(), but also stop once ``budget`` is spent.
+
+        Rows are fetched in small batches so that no more than one batch
+        past the budget is ever held in memory.
+        """
+        rows = []
+        while True:
+            size = cls.BUDGET_BATCH_SIZE
+            if limit is not None:
+                size = min(size, limit + 1 - len(rows))
+            batch = cursor.fetchmany(size)
+            for row in batch:
+                if limit is not None and len(rows) == limit:
+                    return rows, True
+                fitted = budget.fit(row)
+                if fitted is None:
+                    return rows, True
+                rows.append(fitted)
+            if len(batch) < size:
+                return rows, False
+
+    @staticmethod
+    def _rowcount(cursor) -> Optional[int]:
+        """Total rows in the result as reported by the connector, if known."""
+        rowcount = cursor.rowcount
+        return rowcount if isinstance(rowcount, int) and rowcount >= 0 else None
+
+    @staticmethod
+    def _page_response(
+        handle: ResultHandle,
+        offset: int,
+        rows: list,
+        size: int,
+        start_time: float
+    ) -> QueryResponse:
+        """Build the response for one page of a result handle."""
+        if handle.total_rows is not None:
+            has_more = offset + len(rows) < handle.total_rows
+        else:
+            has_more = len(rows) == size
+
+        return QueryResponse(
+            success=True,
+            data=rows,
+            columns=handle.columns,
+            row_count=len(rows),
+            execution_time=time.time() - start_time,
+            query_id=handle.query_id,
+            offset=offset,
+            has_more=has_more,
+            total_rows=handle.total_rows
+        )
+
+    async def fetch_page(self, query_id: str, offset: int = 0, size: int = 100) -> QueryResponse:
+        """Serve a page of an earlier result without re-executing the query.
+
+        The next page is prefetched in the background.
+        """
+        response = await self.run_blocking(self._fetch_page_sync, query_id, offset, size)
+        if response.success and response.has_more:
+            self._prefetch(query_id, offset + size, size)
+        return response
+
+    def _fetch_page_sync(self, query_id: str, offset: int, size: int) -> QueryResponse:
+        """Worker-thread body of fetch_page()."""
+        start_time = time.time()
+        try:
+            handle, rows = self._read_page(query_id, offset, size, prefetched=True)
+            return self._page_response(handle, offset, rows, size, start_time)
+        except Exception as e:
+            return QueryResponse(
+                success=False,
+                error=enhance_error_message(str(e)),
+                execution_time=time.time() - start_time
+            )
+
+    def _read_page(self, query_id: str, offset: int, size: int, prefetched: bool):
+        """Read a page from a prefetch, the open cursor, or RESULT_SCAN."""
+        handle = self.pager.get(query_id)
+        if handle is None:
+            handle = self.pager.register(ResultHandle(query_id, columns=[]))
+
+        with handle.lock:
+            rows = handle.take(offset, size) if prefetched else None
+            if rows is None:
+                rows = handle.read(offset, size)
+            if rows is None:
+                rows = self._result_scan(handle, offset, size)
+        return handle, rows
+
+    def _result_scan(self, handle: ResultHandle, offset: int, size: int) -> list:
+        """Read a page of a persisted result with RESULT_SCAN."""
+        with self._checkout() as member:
+            cursor = member.connection.connect().cursor()
+            try:
+                cursor.execute(
+                    f"SELECT * FROM TABLE(RESULT_SCAN(?)) LIMIT {int(size)} OFFSET {int(offset)}",
+                    (handle.query_id,)
+                )
+                rows = cursor.fetchall()
+                if not handle.columns and cursor.description:
+                    handle.columns = [desc[0] for desc in cursor.description]
+            finally:
+                cursor.close()
+        return rows
+
+    def _prefetch(self, query_id: str, offset: int, size: int):
+        """Load a page on the worker pool ahead of the request for it."""
+        def load():
+            try:
+                handle, rows = self._read_page(query_id, offset, size, prefetched=False)
+                with handle.lock:
+                    handle.keep(offset, size, rows)
+            except Exception:
+                pass  # The request for the page will surface the error
+
+        self._workers.submit(load)
+
+    @staticmethod
+    def split_script(script: str) -> List[str]:
+        """Split a script into statements the way the connector does."""
+        return [
+            statement.rstrip(';').strip()
+            for statement, _ in split_statements(io.StringIO(script), remove_comments=True)
+            if statement.rstrip(';').strip()
+        ]
+
+    async def execute_batch(
+        self,
+        statements: List[str],
+        stop_on_error: bool = True,
+        limit: Optional[int] = 100
+    ) -> BatchResponse:
+        """Run statements in order on one connection, in one worker call.
+
+        Every statement is validated before anything runs. USE statements
+        update the session state for the statements after them.
+        """
+        if not statements:
+            return BatchResponse(success=False, error="No statements to execute")
+
+        for index, sql in enumerate(statements):
+            is_valid, error = self._validate_query(sql)
+            if not is_valid:
+                return BatchResponse(success=False, error=f"Statement {index + 1}: {error}")
+
+        return await self.run_blocking(self._batch_sync, statements, stop_on_error, limit)
+
+    def _batch_sync(
+        self,
+        statements: List[str],
+        stop_on_error: bool,
+        limit: Optional[int]
+    ) -> BatchResponse:
+        """Worker-thread body of execute_batch()."""
+        start_time = time.time()
+        results: List[BatchStatementResult] = []
+        try:
+            with self._checkout() as member:
+                for index, sql in enumerate(statements):
+                    statement_start = time.time()
+                    response = self._execute_on(member, sql, statement_start, limit=limit)
+                    results.append(BatchStatementResult(index=index, sql=sql, **response.model_dump()))
+                    if response.success:
+                        self._note_write(sql)
+                    elif stop_on_error:
+                        break
+        except Exception as e:
+            return BatchResponse(
+                success=False,
+                results=results,
+                executed=len(results),
+                failed=sum(1 for r in results if not r.success),
+                error=enhance_error_message(str(e)),
+                execution_time=time.time() - start_time
+            )
+
+        failed = sum(1 for r in results if not r.success)
+        return BatchResponse(
+            success=failed == 0 and len(results) == len(statements),
+            results=results,
+            executed=len(results),
+            failed=failed,
+            execution_time=time.time() - start_time
+        )
+
+    def _check_ingest(self, table: str, columns: List[str]) -> Optional[str]:
+        """Error message if an ingest target is not allowed, else None."""
+        if not is_object_name(table):
+            return f"Invalid table name: {table}"
+        for column in columns:
+            if not is_object_name(column, max_parts=1):
+                return f"Invalid column name: {column}"
+        _, error = self._validate_query(f"INSERT INTO {table}{ingest.column_list(columns)} VALUES (?)")
+        return error
+
+    async def ingest(
+        self,
+        table: str,
+        columns: List[str],
+        rows: List[List[Any]],
+        method: str = "auto"
+    ) -> IngestResponse:
+        """Bulk-load rows into a table.
+
+        ``method`` is ``executemany`` (one array-bound INSERT),
+        ``write_pandas``, ``copy`` (CSV through the table stage) or ``auto``:
+        executemany below ``bulk_rows`` rows, otherwise write_pandas when
+        pandas is installed and copy when it is not.
+        """
+        error = self._check_ingest(table, columns)
+        if error:
+            return IngestResponse(success=False, table=table, error=error)
+        if not rows:
+            return IngestResponse(success=True, table=table, method=method, rows_loaded=0)
+        if method not in INGEST_METHODS:
+            return IngestResponse(success=False, table=table, error=f"Unknown ingest method: {method}")
+
+        if method == "auto":
+            if len(rows) < self.bulk_rows:
+                method = "executemany"
+            else:
+                method = "write_pandas" if importlib.util.find_spec("pandas") else "copy"
+
+        return await self.run_blocking(self._ingest_sync, table, columns, rows, method)
+
+    def _ingest_sync(
+        self,
+        table: str,
+        columns: List[str],
+        rows: List[List[Any]],
+        method: str
+    ) -> IngestResponse:
+        """Worker-thread body of ingest()."""
+        def load(conn):
+            if method == "executemany":
+                return ingest.insert_many(conn, table, columns, rows), None
+            if method == "write_pandas":
+                import pandas as pd
+                return ingest.write_frame(conn, table, pd.DataFrame(rows, columns=columns))
+            return ingest.copy_rows(conn, table, columns, rows)
+
+        return self._load(table, method, load)
+
+    async def ingest_upload(
+        self,
+        table: str,
+        body: bytes,
+        content_type: str,
+        columns: Optional[List[str]] = None
+    ) -> IngestResponse:
+        """Bulk-load an uploaded CSV file (with header) or Arrow IPC stream."""
+        columns = columns or []
+        error = self._check_ingest(table, columns)
+        if error:
+            return IngestResponse(success=False, table=table, error=error)
+
+        if content_type.startswith("text/csv"):
+            return await self.run_blocking(self._ingest_csv_sync, table, body, columns)
+        if content_type.startswith(ARROW_STREAM_MEDIA_TYPE):
+            return await self.run_blocking(self._ingest_arrow_sync, table, body)
+        return IngestResponse(
+            success=False, table=table,
+            error=f"Unsupported upload type: {content_type} (use text/csv or {ARROW_STREAM_MEDIA_TYPE})"
+        )
+
+    def _ingest_csv_sync(self, table: str, body: bytes, columns: List[str]) -> IngestResponse:
+        """Worker-thread body of ingest_upload() for CSV."""
+        def load(conn):
+            with tempfile.TemporaryDirectory(prefix='sf-ingest-') as directory:
+                path = os.path.join(directory, ingest.staging_name())
+                with open(path, 'wb') as f:
+                    f.write(body)
+                return ingest.copy_file(conn, table, path, columns)
+
+        return self._load(table, "copy", load)
+
+    def _ingest_arrow_sync(self, table: str, body: bytes) -> IngestResponse:
+        """Worker-thread body of ingest_upload() for Arrow IPC."""
+        try:
+            import pyarrow as pa
+            import pandas  # noqa: F401  (write_pandas needs it)
+        except ImportError:
+            return IngestResponse(
+                success=False, table=table,
+                error="Arrow uploads require pandas and pyarrow: pip install 'snowflake-connector-python[pandas]'"
+            )
+
+        def load(conn):
+            frame = pa.ipc.open_stream(body).read_all().to_pandas()
+            return ingest.write_frame(conn, table, frame)
+
+        return self._load(table, "write_pandas", load)
+
+    def _load(self, table: str, method: str, load) -> IngestResponse:
+        """Run ``load(conn) -> (rows_loaded, copy_results)`` and time it."""
+        start_time = time.time()
+        try:
+            with self._checkout() as member:
+                rows_loaded, copy_results = load(member.connection.connect())
+        except Exception as e:
+            return IngestResponse(
+                success=False, table=table, method=method,
+                error=enhance_error_message(str(e)),
+                execution_time=time.time() - start_time
+            )
+        finally:
+            self._note_write(f"INSERT INTO {table}")
+
+        execution_time = time.time() - start_time
+        return IngestResponse(
+            success=True,
+            table=table,
+            method=method,
+            rows_loaded=rows_loaded,
+            rows_per_second=rows_loaded / execution_time if execution_time > 0 else None,
+            copy_results=copy_results,
+            execution_time=execution_time
+        )
+
+    async def export(
+        self,
+        sql: str,
+        path: str,
+        format: str = "parquet",
+        parallel: int = 10
+    ) -> ExportResponse:
+        """Unload a query result to files in the local directory ``path``.
+
+        The result is written with COPY INTO a fresh prefix of the user
+        stage (``@~``), then downloaded with GET, which writes files
+        straight to disk on ``parallel`` threads. The staged files are
+        removed afterwards.
+        """
+        if format not in EXPORT_FORMATS:
+            return ExportResponse(success=False, path=path, error=f"Unknown export format: {format}")
+        if not is_read_only(sql) or statement_type(sql) not in ('SELECT', 'WITH'):
+            return ExportResponse(success=False, path=path, error="Only SELECT/WITH queries can be exported")
+        is_valid, error = self._validate_query(sql)
+        if not is_valid:
+            return ExportResponse(success=False, path=path, error=error)
+
+        return await self.run_blocking(self._export_sync, sql, os.path.abspath(path), format, parallel)
+
+    def _export_sync(self, sql: str, path: str, format: str, parallel: int) -> ExportResponse:
+        """Worker-thread body of export()."""
+        start_time = time.time()
+        stage = f"@~/sf-export/{uuid.uuid4().hex}/"
+        local = path.replace("\\", "/").replace("'", "\\'")
+        try:
+            os.makedirs(path, exist_ok=True)
+            with self._checkout() as member:
+                cursor = member.connection.connect().cursor()
+                try:
+                    cursor.execute(
+                        # On its own lines, so a trailing -- comment cannot
+                        # swallow the closing parenthesis
+                        f"COPY INTO {stage} FROM (\n{strip_terminator(sql).strip()}\n) "
+                        f"{EXPORT_FORMATS[format]} HEADER = TRUE"
+                    )
+                    unloaded = cursor.fetchone()
+                    cursor.execute(f"GET {stage} 'file://{local}/' PARALLEL = {min(max(int(parallel), 1), 99)}")
+                    names = [desc[0].lower() for desc in cursor.description] if cursor.description else []
+                    files = [dict(zip(names, row)) for row in cursor.fetchall()]
+                finally:
+                    try:
+                        cursor.execute(f"REMOVE {stage}")
+                    except Exception:
+                        pass  # Leftovers in @~ do not fail the export
+                    cursor.close()
+        except Exception as e:
+            return ExportResponse(
+                success=False, path=path, format=format,
+                error=enhance_error_message(str(e), sql),
+                execution_time=time.time() - start_time
+            )
+
+        return ExportResponse(
+            success=True,
+            path=path,
+            format=format,
+            files=[os.path.join(path, os.path.basename(f['file'])) for f in files],
+            rows_exported=unloaded[0] if unloaded else 0,
+            bytes=sum(f.get('size') or 0 for f in files),
+            execution_time=time.time() - start_time
+        )
+
+    async def submit(self, sql: str, timeout_seconds: Optional[int] = None) -> JobResponse:
+        """Submit a query without waiting for it; returns the Snowflake query ID."""
+        is_valid, error = self._validate_query(sql)
+        if not is_valid:
+            return JobResponse(success=False, error=error)
+
+        return await self.run_blocking(self._submit_sync, sql, timeout_seconds)
+
+    def _submit_sync(self, sql: str, timeout_seconds: Optional[int] = None) -> JobResponse:
+        """Worker-thread body of submit()."""
+        try:
+            with self._checkout() as member:
+                cursor = member.connection.connect().cursor()
+                try:
+                    cursor.execute_async(sql, **_statement_params(timeout_seconds))
+                    query_id = cursor.sfqid
+                    # Results cached while the job runs are dropped again
+                    # once poll() sees it finish
+                    self._note_write(sql)
+                    if _is_write(sql):
+                        self._pending_writes[query_id] = (sql, self.state_manager.get_state())
+                finally:
+                    cursor.close()
+            return JobResponse(success=True, query_id=query_id, status="RUNNING")
+        except Exception as e:
+            return JobResponse(success=False, error=enhance_error_message(str(e), sql))
+
+    async def poll(self, query_id: str, limit: Optional[int] = 100) -> JobResponse:
+        """Check a submitted query; includes its results once it has finished."""
+        return await self.run_blocking(self._poll_sync, query_id, limit)
+
+    def _poll_sync(self, query_id: str, limit: Optional[int]) -> JobResponse:
+        """Worker-thread body of poll()."""
+        try:
+            with self._checkout() as member:
+                conn = member.connection.connect()
+                status = conn.get_query_status(query_id)
+
+                if conn.is_still_running(status):
+                    return JobResponse(success=True, query_id=query_id, status=status.name)
+
+                pending = self._pending_writes.pop(query_id, None)
+                if pending is not None:
+                    self._note_write(*pending)
+
+                if conn.is_an_error(status):
+                    try:
+                        conn.get_query_status_throw_if_error(query_id)
+                        message = f"Query {query_id} ended with status {status.name}"
+                    except Exception as e:
+                        message = enhance_error_message(str(e))
+                    return JobResponse(
+                        success=False, query_id=query_id, status=status.name,
+                        done=True, error=message
+                    )
+
+                start_time = time.time()
+                cursor = conn.cursor()
+                try:
+                    cursor.get_results_from_sfqid(query_id)
+                    rows, truncated = self._fetch_limited(cursor, limit)
+                    total_rows = self._rowcount(cursor) if truncated else len(rows)
+                    columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                finally:
+                    cursor.close()
+
+                return JobResponse(
+                    success=True, query_id=query_id, status=status.name, done=True,
+                    result=QueryResponse(
+                        success=True,
+                        data=rows,
+                        columns=columns,
+                        row_count=len(rows),
+                        execution_time=time.time() - start_time,
+                        truncated=truncated,
+                        total_rows=total_rows
+                    )
+                )
+        except Exception as e:
+            return JobResponse(success=False, query_id=query_id, error=enhance_error_message(str(e)))
+
+    async def cancel(self, query_id: str) -> JobResponse:
+        """Cancel a running query with SYSTEM$CANCEL_QUERY."""
+        return await self.run_blocking(self._cancel_sync, query_id)
+
+    def _cancel_sync(self, query_id: str) -> JobResponse:
+        """Worker-thread body of cancel()."""
+        try:
+            with self._checkout() as member:
+                cursor = member.connection.connect().cursor()
+                try:
+                    cursor.execute("SELECT SYSTEM$CANCEL_QUERY(?)", (query_id,))
+                    row = cursor.fetchone()
+                finally:
+                    cursor.close()
+            return JobResponse(
+                success=True, query_id=query_id, status="ABORTING", done=True,
+                message=row[0] if row else None
+            )
+        except Exception as e:
+            return JobResponse(success=False, query_id=query_id, error=enhance_error_message(str(e)))
+
+    async def fanout(
+        self,
+        queries: List[str],
+        limit: Optional[int] = 100,
+        max_concurrency: Optional[int] = None,
+        admit: Optional[Callable[[], AsyncContextManager[Any]]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Run independent queries concurrently, yielding each as it finishes.
+
+        Each message is a QueryResponse dict plus the query's ``index`` in
+        ``queries``. At most ``max_concurrency`` queries run at once; the
+        default is the pool size (or the worker count for one connection).
+        ``admit`` returns a context held around each query (a scheduler
+        slot); a full queue fails that query rather than the fan-out.
+        """
+        cap = self._fanout_cap(max_concurrency)
+        semaphore = asyncio.Semaphore(cap)
+
+        async def run(index: int, sql: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    async with admit() if admit else nullcontext():
+                        response = await self.execute(sql, limit)
+                except QueueFullError as e:
+                    response = QueryResponse(success=False, error=str(e))
+            return {'index': index, **response.model_dump()}
+
+        tasks = [asyncio.ensure_future(run(index, sql)) for index, sql in enumerate(queries)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            # Client went away: queries not yet started never start
+            for task in tasks:
+                task.cancel()
+
+    @property
+    def capacity(self) -> int:
+        """Statements that can run at once: connections and worker threads."""
+        if isinstance(self.connection, SnowflakeConnectionPool):
+            return min(self.connection.max_size, self.max_workers)
+        return self.max_workers
+
+    def _fanout_cap(self, requested: Optional[int]) -> int:
+        """Concurrency for fanout(): what was asked, bounded by capacity."""
+        capacity = self.capacity
+        return max(1, min(requested or capacity, capacity))
+
+    async def stream(
+        self,
+        sql: str,
+        chunk_size: int = 1000,
+        limit: Optional[int] = None,
+        timeout_seconds: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Execute query and yield results incrementally.
+
+        Yields a ``schema`` message, then ``rows`` messages of at most
+        ``chunk_size`` rows, then an ``end`` message (or an ``error``
+        message). Only one chunk is held in memory at a time.
+        """
+        is_valid, error = self._validate_query(sql)
+        if not is_valid:
+            yield {"type": "error", "error": error}
+            return
+
+        async with aclosing(self._drive(self._stream_sync(sql, chunk_size, limit, timeout_seconds))) as messages:
+            async for message in messages:
+                yield message
+
+    async def _drive(self, generator: Iterator[Any]) -> AsyncIterator[Any]:
+        """Advance a blocking generator on the worker pool, one item at a time."""
+        items = _RowStream(generator)
+        try:
+            while True:
+                item = await self.run_blocking(items.next)
+                if item is None:
+                    break
+                yield item
+        finally:
+            # Releases the cursor and pooled connection if the client went away
+            await self.run_blocking(items.close)
+
+    def _stream_sync(
+        self,
+        sql: str,
+        chunk_size: int,
+        limit: Optional[int],
+        timeout_seconds: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """Generator driven from worker threads by stream()."""
+        start_time = time.time()
+        try:
+            with self._checkout() as member:
+                for attempt in range(2):
+                    try:
+                        cursor = member.connection.connect().cursor()
+                        cursor.execute(sql, **_statement_params(timeout_seconds))
+                        break
+                    except Exception as e:
+                        if attempt == 0 and self._is_auth_error(e):
+                            member.reconnect()
+                            member.apply_state(self.state_manager.get_state())
+                            continue
+                        raise
+
+                try:
+                    self._capture_state(member, sql)
+                    self._note_write(sql)
+
+                    yield {
+                        "type": "schema",
+                        "columns": [desc[0] for desc in cursor.description] if cursor.description else [],
+                        "query_id": cursor.sfqid,
+                    }
+
+                    row_count = 0
+                    while limit is None or row_count < limit:
+                        size = chunk_size if limit is None else min(chunk_size, limit - row_count)
+                        batch = cursor.fetchmany(size)
+                        if not batch:
+                            break
+                        row_count += len(batch)
+                        yield {"type": "rows", "data": batch}
+                finally:
+                    cursor.close()
+
+            yield {
+                "type": "end",
+                "row_count": row_count,
+                "execution_time": time.time() - start_time,
+            }
+        except Exception as e:
+            yield {"type": "error", "error": enhance_error_message(str(e), sql)}
+
+    async def stream_arrow(
+        self,
+        sql: str,
+        limit: Optional[int] = None,
+        params: Optional[Params] = None,
+        timeout_seconds: Optional[int] = None
+    ) -> AsyncIterator[Any]:
+        """Execute query and yield an Arrow IPC stream as bytes chunks.
+
+        Batches come straight from ``cursor.fetch_arrow_batches()``, so no
+        Python object is built per row. If the query fails before any data
+        is produced, a single ``{"type": "error"}`` dict is yielded instead.
+        ``params`` and ``timeout_seconds`` apply as in execute(), and a
+        consumer that goes away cancels a statement still running.
+        """
+        is_valid, error = self._validate_query(sql)
+        if not is_valid:
+            yield {"type": "error", "error": error}
+            return
+
+        watch = _Watch(timeout_seconds)
+        async with aclosing(self._drive(self._arrow_sync(sql, limit, params, watch))) as chunks:
+            try:
+                async for chunk in chunks:
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                # Before the worker is closed, which waits for the statement
+                threading.Thread(target=watch.cancel, daemon=True).start()
+                raise
+
+    def _arrow_sync(
+        self,
+        sql: str,
+        limit: Optional[int],
+        params: Optional[Params] = None,
+        watch: Optional[_Watch] = None
+    ) -> Iterator[Any]:
+        """Generator driven from worker threads by stream_arrow()."""
+        watch = watch or _Watch()
+        try:
+            import pyarrow as pa
+        except ImportError:
+            yield {
+                "type": "error",
+                "error": "Arrow results require pyarrow: pip install 'snowflake-connector-python[pandas]'"
+            }
+            return
+
+        sink = _ChunkSink()
+        writer = None
+        try:
+            with self._checkout() as member:
+                try:
+                    # One retry on auth errors, as in _execute_watched()
+                    for attempt in range(2):
+                        try:
+                            conn = member.connection.connect()
+                            if not watch.attach(conn):
+                                yield {"type": "error", "error": "Query cancelled before it started"}
+                                return
+                            cursor = conn.cursor()
+                            self._execute_bound(member, cursor, sql, params, **watch.statement_params())
+                            break
+                        except Exception as e:
+                            if attempt == 0 and self._is_auth_error(e):
+                                member.reconnect()
+                                member.apply_state(self.state_manager.get_state())
+                                continue
+                            raise
+                finally:
+                    watch.detach()
+
+                try:
+                    self._capture_state(member, sql)
+                    self._note_write(sql)
+                    if not arrow_result(cursor):
+                        # SHOW, DESCRIBE and DML results come back as JSON
+                        yield {
+                            "type": "error",
+                            "error": "Arrow format not available for this statement; use the default json format"
+                        }
+                        return
+
+                    remaining = limit
+                    for table in cursor.fetch_arrow_batches(force_microsecond_precision=True):
+                        if remaining is not None:
+                            table = table.slice(0, remaining)
+                            remaining -= table.num_rows
+                        if writer is None:
+                            writer = pa.ipc.new_stream(sink, table.schema)
+                        writer.write_table(table)
+                        yield from sink.drain()
+                        if remaining == 0:
+                            break
+
+                    if writer is None:
+                        # No batches at all: still send the (empty) schema
+                        empty = cursor.fetch_arrow_all(force_return_table=True, force_microsecond_precision=True)
+                        writer = pa.ipc.new_stream(sink, empty.schema)
+                finally:
+                    cursor.close()
+
+            writer.close()
+            yield from sink.drain()
+        except Exception as e:
+            if writer is None:
+                yield {"type": "error", "error": enhance_error_message(str(e), sql)}
+            else:
+                # Bytes already went out; a truncated stream fails to decode
+                raise
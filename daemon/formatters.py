@@ -0,0 +1,181 @@
+"""Server-side renderers for query results: markdown table, CSV and JSON.
+
+Renderers are incremental: feed them the column names, then row batches,
+then the end of the result, and write out the bytes each call returns.
+"""
+import csv
+import io
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Type
+
+from daemon import serialization
+
+# How NULL appears in table output
+NULL = "NULL"
+
+# Table columns are padded to at most this many characters; longer values
+# still print in full
+MAX_COLUMN_WIDTH = 40
+
+
+def _text(value: Any) -> str:
+    """Plain-text form of a value shared by the text renderers."""
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    return str(value)
+
+
+class Renderer:
+    """Incremental renderer; subclasses produce one output format."""
+
+    media_type = "text/plain"
+
+    def __init__(self, columns: Sequence[str]):
+        self.columns = list(columns)
+        self.row_count = 0
+
+    def start(self) -> bytes:
+        """Output before the first row."""
+        return b""
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        """Output for a batch of rows."""
+        raise NotImplementedError
+
+    def end(self, execution_time: Optional[float] = None) -> bytes:
+        """Output after the last row."""
+        return b""
+
+
+class TableRenderer(Renderer):
+    """Markdown table, padded to widths measured on the first batch.
+
+    NULL prints as ``NULL``. Pipes and line breaks in values are escaped so
+    each row stays on one line. Numbers are right-aligned. With ``summary``
+    the output ends with a row count and timing line.
+    """
+
+    media_type = "text/markdown; charset=utf-8"
+
+    def __init__(self, columns: Sequence[str], summary: bool = True):
+        super().__init__(columns)
+        self.summary = summary
+        self.widths: Optional[List[int]] = None
+        self.numeric: List[bool] = [False] * len(self.columns)
+
+    @staticmethod
+    def cell(value: Any) -> str:
+        if value is None:
+            return NULL
+        return (
+            _text(value)
+            .replace('\\', '\\\\')
+            .replace('|', '\\|')
+            .replace('\r\n', '\\n')
+            .replace('\n', '\\n')
+            .replace('\r', '\\n')
+        )
+
+    def _line(self, cells: Sequence[str]) -> str:
+        padded = [
+            cell.rjust(width) if numeric else cell.ljust(width)
+            for cell, width, numeric in zip(cells, self.widths, self.numeric)
+        ]
+        return "| " + " | ".join(padded) + " |\n"
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if not rows:
+            return b""
+        lines = [[self.cell(value) for value in row] for row in rows]
+        out = []
+        if self.widths is None:
+            # Widths come from the header and the first batch only, so
+            # output can start before the whole result has arrived
+            header = [self.cell(column) for column in self.columns]
+            self.widths = [
+                min(MAX_COLUMN_WIDTH, max(len(text) for text in column))
+                for column in zip(header, *lines)
+            ]
+            first = rows[0]
+            self.numeric = [
+                isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+                for value in first
+            ]
+            out.append("| " + " | ".join(h.ljust(w) for h, w in zip(header, self.widths)) + " |\n")
+            out.append("|" + "|".join(
+                "-" * (w + 1) + ":" if numeric else "-" * (w + 2)
+                for w, numeric in zip(self.widths, self.numeric)
+            ) + "|\n")
+        out.extend(self._line(line) for line in lines)
+        self.row_count += len(rows)
+        return "".join(out).encode()
+
+    def end(self, execution_time: Optional[float] = None) -> bytes:
+        text = "No results returned\n" if self.row_count == 0 else ""
+        if self.summary:
+            timing = f" in {execution_time:.3f}s" if execution_time is not None else ""
+            text += f"\n✓ {self.row_count} row(s){timing}\n"
+        return text.encode()
+
+
+class CsvRenderer(Renderer):
+    """RFC 4180 CSV with a header row; NULL is an empty field."""
+
+    media_type = "text/csv; charset=utf-8"
+
+    def _write(self, rows) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerows(rows)
+        return buffer.getvalue().encode()
+
+    def start(self) -> bytes:
+        return self._write([self.columns])
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        self.row_count += len(rows)
+        return self._write([
+            ['' if value is None else _text(value) for value in row]
+            for row in rows
+        ])
+
+
+class JsonRenderer(Renderer):
+    """JSON array of objects keyed by column name, one row per line."""
+
+    media_type = "application/json"
+
+    def start(self) -> bytes:
+        return b"["
+
+    def rows(self, rows: Sequence[Sequence[Any]]) -> bytes:
+        if not rows:
+            return b""
+        out = b",\n".join(serialization.dumps(dict(zip(self.columns, row))) for row in rows)
+        separator = b"\n" if self.row_count == 0 else b",\n"
+        self.row_count += len(rows)
+        return separator + out
+
+    def end(self, execution_time: Optional[float] = None) -> bytes:
+        return b"\n]\n" if self.row_count else b"]\n"
+
+
+RENDERERS: Dict[str, Type[Renderer]] = {
+    'table': TableRenderer,
+    'csv': CsvRenderer,
+    'json': JsonRenderer,
+}
+
+
+def field_renderer(format: str, columns: Sequence[str]) -> Renderer:
+    """Renderer for a response's ``formatted`` field: no table summary line."""
+    return TableRenderer(columns, summary=False) if format == 'table' else RENDERERS[format](columns)
+
+
+def render(format: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> str:
+    """Render a whole result at once, without a table summary line."""
+    renderer = field_renderer(format, columns)
+    return (renderer.start() + renderer.rows(rows) + renderer.end()).decode()
@@ -0,0 +1,132 @@
+"""Bulk loading helpers: array-bound INSERTs and staged COPY INTO.
+
+Every function takes an open connector connection and blocks; the
+executor calls them from its worker threads.
+"""
+import os
+import tempfile
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from daemon.statements import object_name_parts
+
+
+# COPY INTO file format for CSV written by write_csv() (header row, quoted text)
+CSV_FILE_FORMAT = (
+    "FILE_FORMAT = (TYPE = CSV SKIP_HEADER = 1 FIELD_OPTIONALLY_ENCLOSED_BY = '\"')"
+)
+
+
+def column_list(columns: Optional[Sequence[str]]) -> str:
+    """`` (a, b)`` for an INSERT/COPY column list, or '' for all columns."""
+    return f" ({', '.join(columns)})" if columns else ""
+
+
+def insert_many(conn, table: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]) -> int:
+    """INSERT rows with executemany(); the connector sends them as one array bind."""
+    placeholders = ', '.join('?' for _ in columns)
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(
+            f"INSERT INTO {table}{column_list(columns)} VALUES ({placeholders})",
+            [list(row) for row in rows]
+        )
+        return cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else len(rows)
+    finally:
+        cursor.close()
+
+
+def _csv_field(value: Any) -> str:
+    """One CSV field: NULL is an empty unquoted field, text is always quoted."""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (bytes, bytearray)):
+        return bytes(value).hex()
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def write_csv(path: str, columns: Sequence[str], rows: Sequence[Sequence[Any]]):
+    """Write rows as CSV matching CSV_FILE_FORMAT."""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(','.join(_csv_field(column) for column in columns) + '\n')
+        for row in rows:
+            f.write(','.join(_csv_field(value) for value in row) + '\n')
+
+
+def table_stage(table: str) -> str:
+    """The table's own stage: ``db.schema.t`` -> ``@db.schema.%t``."""
+    parts = object_name_parts(table)
+    return '@' + ''.join(part + '.' for part in parts[:-1]) + '%' + parts[-1]
+
+
+def staging_name(suffix: str = '.csv') -> str:
+    """Unique file name for a staged load.
+
+    Loads into one table share its stage, and each PUTs with OVERWRITE and
+    COPYs with PURGE, so a shared name would let concurrent loads replace
+    or remove each other's file.
+    """
+    return f"sf-ingest-{uuid.uuid4().hex}{suffix}"
+
+
+def copy_file(
+    conn,
+    table: str,
+    path: str,
+    columns: Optional[Sequence[str]] = None
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """PUT a local CSV file on the table stage and COPY it in.
+
+    Returns rows loaded and the COPY INTO result rows as dicts. The staged
+    file is purged after loading.
+    """
+    stage = table_stage(table)
+    filename = os.path.basename(path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"PUT 'file://{path}' {stage} AUTO_COMPRESS = TRUE OVERWRITE = TRUE")
+        cursor.execute(
+            f"COPY INTO {table}{column_list(columns)} FROM {stage} "
+            f"FILES = ('{filename}.gz') {CSV_FILE_FORMAT} PURGE = TRUE"
+        )
+        names = [desc[0].lower() for desc in cursor.description] if cursor.description else []
+        results = [dict(zip(names, row)) for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+    return sum(result.get('rows_loaded') or 0 for result in results), results
+
+
+def copy_rows(
+    conn,
+    table: str,
+    columns: Sequence[str],
+    rows: Sequence[Sequence[Any]]
+) -> Tuple[int, List[Dict[str, Any]]]:
+    """Load rows with a staged COPY INTO through a temporary CSV file."""
+    with tempfile.TemporaryDirectory(prefix='sf-ingest-') as directory:
+        path = os.path.join(directory, staging_name())
+        write_csv(path, columns, rows)
+        return copy_file(conn, table, path, columns)
+
+
+def write_frame(conn, table: str, frame) -> Tuple[int, List[Dict[str, Any]]]:
+    """Load a pandas DataFrame with write_pandas (Parquet, PUT, COPY INTO)."""
+    from snowflake.connector.pandas_tools import write_pandas
+
+    parts = object_name_parts(table)
+    schema = parts[-2] if len(parts) >= 2 else None
+    database = parts[-3] if len(parts) == 3 else None
+    _, _, rows, output = write_pandas(
+        conn, frame, parts[-1],
+        database=database, schema=schema,
+        quote_identifiers=False
+    )
+    fields = ['file', 'status', 'rows_parsed', 'rows_loaded', 'error_limit',
+              'errors_seen', 'first_error', 'first_error_line', 'first_error_character',
+              'first_error_column_name']
+    return rows, [dict(zip(fields, result)) for result in output]
@@ -1,25 +1,134 @@
-from pydantic import BaseModel
-from typing import Optional, List, Any
+from pydantic import BaseModel, Field
+from typing import Optional, List, Any, Dict, Union
 
 
 class QueryRequest(BaseModel):
     sql: str
     limit: Optional[int] = 100
-    format: str = "table"  # table, json, csv
+    format: str = "json"  # json (rows in data), columnar, arrow (Arrow IPC body), table/csv (text in formatted)
+    chunk_size: int = 1000  # rows per batch on /query/stream
+    page_size: Optional[int] = None  # return a first page plus a result handle
+    max_bytes: Optional[int] = None  # size budget for the returned rows
+    params: Optional[Union[List[Any], Dict[str, Any]]] = None  # ? (list) or :name (dict) binds
+    timeout_seconds: Optional[int] = None  # STATEMENT_TIMEOUT_IN_SECONDS for this statement
 
 
 class QueryResponse(BaseModel):
     success: bool
     data: Optional[List[Any]] = None
     columns: Optional[List[str]] = None
+    column_types: Optional[List[Dict[str, Any]]] = None  # name, type, nullable, precision, scale, length
+    columnar: Optional[List[Dict[str, Any]]] = None  # format="columnar": per-column values, see daemon.columnar
     row_count: Optional[int] = None
     formatted: Optional[str] = None
     error: Optional[str] = None
+    execution_time: Optional[float] = None  # seconds on a worker thread
+    queue_time: Optional[float] = None  # seconds waiting for a worker thread
+    cached: bool = False  # served from the daemon's result cache
+    deduplicated: bool = False  # shared the execution of an identical in-flight query
+    query_id: Optional[str] = None  # result handle for GET /results/{query_id}
+    offset: Optional[int] = None
+    has_more: Optional[bool] = None
+    total_rows: Optional[int] = None  # full result size, when known
+    truncated: bool = False  # more rows than ``limit``/``max_bytes``; the rest were not fetched
+    bytes_omitted: Optional[int] = None  # with max_bytes: bytes cut from cells and rows
+    truncated_cells: Optional[int] = None  # with max_bytes: cells cut short (text cells end in a marker)
+    # Large result left in a daemon.spill.SpillFile instead of ``data``;
+    # the server streams it out and it is never serialized with the model
+    spill: Optional[Any] = Field(None, exclude=True)
+    # Approximate size of ``data`` (see daemon.budget.ByteBudget), measured
+    # on the worker thread for the result cache; never serialized
+    data_bytes: Optional[int] = Field(None, exclude=True)
+
+
+class BatchRequest(BaseModel):
+    statements: Optional[List[str]] = None  # ordered statements, or...
+    script: Optional[str] = None  # ...a whole script split on semicolons
+    stop_on_error: bool = True
+    limit: Optional[int] = 100  # per statement
+
+
+class FanoutRequest(BaseModel):
+    queries: List[str]
+    limit: Optional[int] = 100  # per query
+    max_concurrency: Optional[int] = None  # default: pool size
+
+
+class BatchStatementResult(QueryResponse):
+    index: int
+    sql: str
+
+
+class BatchResponse(BaseModel):
+    success: bool
+    results: List[BatchStatementResult] = []
+    executed: int = 0
+    failed: int = 0
+    error: Optional[str] = None
+    execution_time: Optional[float] = None
+
+
+class IngestRequest(BaseModel):
+    table: str
+    columns: Optional[List[str]] = None  # with rows
+    rows: Optional[List[List[Any]]] = None
+    data: Optional[Dict[str, List[Any]]] = None  # columnar: {column: values}
+    method: str = "auto"  # auto, executemany, write_pandas, copy
+
+
+class IngestResponse(BaseModel):
+    success: bool
+    table: str
+    method: Optional[str] = None
+    rows_loaded: int = 0
+    rows_per_second: Optional[float] = None
+    copy_results: Optional[List[Dict[str, Any]]] = None  # COPY INTO output, one per file
+    error: Optional[str] = None
+    execution_time: Optional[float] = None
+
+
+class ExportRequest(BaseModel):
+    sql: str
+    path: str  # local directory the files are written to
+    format: str = "parquet"  # parquet or csv (gzip-compressed)
+    parallel: int = 10  # GET download threads
+
+
+class ExportResponse(BaseModel):
+    success: bool
+    path: str
+    format: Optional[str] = None
+    files: List[str] = []
+    rows_exported: int = 0
+    bytes: int = 0
+    error: Optional[str] = None
     execution_time: Optional[float] = None
 
 
+class JobResponse(BaseModel):
+    success: bool
+    query_id: Optional[str] = None
+    status: Optional[str] = None  # Snowflake QueryStatus name, e.g. RUNNING, SUCCESS
+    done: bool = False
+    result: Optional[QueryResponse] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+
+class CatalogResponse(BaseModel):
+    success: bool
+    data: Optional[Any] = None  # databases/schemas/tables list, one table with columns, or column matches
+    error: Optional[str] = None
+
+
 class HealthResponse(BaseModel):
     status: str  # "healthy", "degraded", "unhealthy"
     uptime_seconds: float
     connection_count: int
-    active_queries: int
+    active_queries: int  # requests holding a scheduler slot
+    queue_depth: int = 0  # requests waiting for a slot
+    wait_p50: Optional[float] = None  # seconds spent queued, recent requests
+    wait_p95: Optional[float] = None
+    wait_p99: Optional[float] = None
+    scheduler: Optional[Dict[str, Any]] = None
+    deduplication: Optional[Dict[str, int]] = None  # single-flight executions / saved
@@ -0,0 +1,123 @@
+"""Result handles for paging through large query results."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ResultHandle:
+    """Paging state for one query result, keyed by Snowflake query ID.
+
+    While ``cursor`` is open, pages at or after ``position`` are read from
+    it directly; earlier pages come from RESULT_SCAN. Prefetched pages wait
+    in ``pages`` until they are requested.
+    """
+
+    MAX_PREFETCHED = 2
+
+    def __init__(
+        self,
+        query_id: str,
+        columns: List[str],
+        cursor: Any = None,
+        position: int = 0,
+        total_rows: Optional[int] = None
+    ):
+        self.query_id = query_id
+        self.columns = columns
+        self.cursor = cursor
+        self.position = position
+        self.total_rows = total_rows
+        self.pages: Dict[Tuple[int, int], List[Any]] = {}
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    def read(self, offset: int, size: int) -> Optional[List[Any]]:
+        """Read a page from the open cursor; None if it cannot serve it.
+
+        Caller holds ``lock``.
+        """
+        if self.cursor is None or offset < self.position:
+            return None
+
+        # Skip forward without keeping the skipped rows
+        while self.position < offset:
+            skipped = self.cursor.fetchmany(min(offset - self.position, 10000))
+            if not skipped:
+                self._exhausted()
+                return []
+            self.position += len(skipped)
+
+        rows = self.cursor.fetchmany(size)
+        self.position += len(rows)
+        if len(rows) < size:
+            self._exhausted()
+        return rows
+
+    def _exhausted(self):
+        """Close the cursor once every row has been read."""
+        self.total_rows = self.position
+        self.close()
+
+    def take(self, offset: int, size: int) -> Optional[List[Any]]:
+        """Pop a prefetched page. Caller holds ``lock``."""
+        return self.pages.pop((offset, size), None)
+
+    def keep(self, offset: int, size: int, rows: List[Any]):
+        """Store a prefetched page. Caller holds ``lock``."""
+        if len(self.pages) < self.MAX_PREFETCHED:
+            self.pages[(offset, size)] = rows
+
+    def close(self):
+        """Release the cursor (RESULT_SCAN still serves later pages)."""
+        if self.cursor is not None:
+            try:
+                self.cursor.close()
+            except Exception:
+                pass
+            self.cursor = None
+
+
+class ResultPager:
+    """Registry of open result handles with an LRU cap and idle expiry."""
+
+    def __init__(self, max_handles: int = 32, idle_timeout: float = 600.0):
+        self.max_handles = max_handles
+        self.idle_timeout = idle_timeout
+        self._handles: "OrderedDict[str, ResultHandle]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, handle: ResultHandle) -> ResultHandle:
+        """Track a handle, closing the least recently used ones over the cap."""
+        retired = []
+        with self._lock:
+            self._handles[handle.query_id] = handle
+            self._handles.move_to_end(handle.query_id)
+            now = time.time()
+            for query_id, other in list(self._handles.items()):
+                too_many = len(self._handles) > self.max_handles
+                if other is not handle and (too_many or now - other.last_used > self.idle_timeout):
+                    retired.append(self._handles.pop(query_id))
+
+        for old in retired:
+            with old.lock:
+                old.close()
+                old.pages.clear()
+        return handle
+
+    def get(self, query_id: str) -> Optional[ResultHandle]:
+        """Find a handle and mark it as recently used."""
+        with self._lock:
+            handle = self._handles.get(query_id)
+            if handle is not None:
+                handle.last_used = time.time()
+                self._handles.move_to_end(query_id)
+            return handle
+
+    def close_all(self):
+        """Close every handle's cursor."""
+        with self._lock:
+            handles, self._handles = list(self._handles.values()), OrderedDict()
+        for handle in handles:
+            with handle.lock:
+                handle.close()
@@ -0,0 +1,205 @@
+"""Admission control for queries: priorities, concurrency limits, backpressure."""
+import asyncio
+import itertools
+import math
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+
+from daemon.statements import METADATA_COMMANDS, statement_type
+
+
+# Priority classes; lower runs first
+INTERACTIVE = 0  # SHOW/DESCRIBE/USE and small SELECTs
+NORMAL = 1
+BATCH = 2  # batches, fan-outs, bulk loads and exports, unbounded reads
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', NORMAL: 'normal', BATCH: 'batch'}
+
+# A SELECT with at most this many rows counts as interactive
+SMALL_QUERY_ROWS = 1000
+
+
+def classify(sql: str, limit: Optional[int] = None) -> int:
+    """Priority class of a single statement run through /query."""
+    command = statement_type(sql)
+    if command in METADATA_COMMANDS or command == 'USE':
+        return INTERACTIVE
+    if command in ('SELECT', 'WITH'):
+        if limit is None:
+            return BATCH
+        return INTERACTIVE if limit <= SMALL_QUERY_ROWS else NORMAL
+    return NORMAL
+
+
+class QueueFullError(RuntimeError):
+    """Raised when the wait queue is full; retry after ``retry_after`` seconds."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    """A request waiting for a slot."""
+
+    def __init__(self, client: str, priority: int, sequence: int, future: asyncio.Future):
+        self.client = client
+        self.priority = priority
+        self.sequence = sequence
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class QueryScheduler:
+    """Grants execution slots by priority, fairly across clients.
+
+    At most ``max_concurrent`` requests run at once and at most
+    ``per_client`` for any one client. Waiting requests are granted in
+    priority order; within a class, the client with the fewest running
+    requests goes first, then the one that has waited longest. When
+    ``max_queue`` requests are already waiting, new ones are refused with
+    QueueFullError.
+
+    Must be used from a single event loop.
+    """
+
+    WAIT_SAMPLES = 1000
+
+    def __init__(self, max_concurrent: int = 8, per_client: int = 4, max_queue: int = 100):
+        if max_concurrent < 1 or per_client < 1:
+            raise ValueError("max_concurrent and per_client must be at least 1")
+        self.max_concurrent = max_concurrent
+        self.per_client = per_client
+        self.max_queue = max_queue
+
+        self._waiting: List[_Waiter] = []
+        self._running: Dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._waits: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self._durations: Deque[float] = deque(maxlen=self.WAIT_SAMPLES)
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls, capacity: Optional[int] = None) -> "QueryScheduler":
+        """Create a scheduler from DAEMON_SCHEDULER_* variables.
+
+        ``capacity`` caps concurrency at what the executor can actually run
+        (connections and worker threads). Requests admitted beyond it would
+        wait in pool checkout, outside the priority queue, and time out.
+        """
+        max_concurrent = int(os.getenv('DAEMON_SCHEDULER_MAX_CONCURRENT', '8'))
+        if capacity is not None:
+            max_concurrent = max(1, min(max_concurrent, capacity))
+        return cls(
+            max_concurrent=max_concurrent,
+            per_client=int(os.getenv('DAEMON_SCHEDULER_PER_CLIENT', '4')),
+            max_queue=int(os.getenv('DAEMON_SCHEDULER_MAX_QUEUE', '100'))
+        )
+
+    @property
+    def running(self) -> int:
+        """Requests holding a slot."""
+        return sum(self._running.values())
+
+    @property
+    def queue_depth(self) -> int:
+        """Requests waiting for a slot."""
+        return len(self._waiting)
+
+    def _can_run(self, client: str) -> bool:
+        return self.running < self.max_concurrent and self._running.get(client, 0) < self.per_client
+
+    def _retry_after(self) -> int:
+        """Seconds until the queue has likely drained by one slot's worth."""
+        if not self._durations:
+            return 1
+        mean = sum(self._durations) / len(self._durations)
+        return max(1, math.ceil(mean * len(self._waiting) / self.max_concurrent))
+
+    @asynccontextmanager
+    async def slot(self, client: str, priority: int = NORMAL) -> AsyncIterator[None]:
+        """Hold an execution slot for the duration of the block."""
+        await self._acquire(client, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._durations.append(time.monotonic() - started)
+            self._release(client)
+
+    async def _acquire(self, client: str, priority: int):
+        if not self._waiting and self._can_run(client):
+            self._running[client] = self._running.get(client, 0) + 1
+            self._waits.append(0.0)
+            return
+
+        if len(self._waiting) >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(
+                f"Query queue is full ({self.max_queue} waiting)",
+                retry_after=self._retry_after()
+            )
+
+        waiter = _Waiter(client, priority, next(self._sequence), asyncio.get_running_loop().create_future())
+        self._waiting.append(waiter)
+        # Someone ahead may be blocked only by their own client limit
+        self._dispatch()
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter in self._waiting:
+                self._waiting.remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller went away: hand the slot on
+                self._release(client)
+            raise
+
+    def _release(self, client: str):
+        self._running[client] -= 1
+        if not self._running[client]:
+            del self._running[client]
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to the best eligible waiters."""
+        while self._waiting and self.running < self.max_concurrent:
+            eligible = [w for w in self._waiting if self._can_run(w.client)]
+            if not eligible:
+                return
+            waiter = min(
+                eligible,
+                key=lambda w: (w.priority, self._running.get(w.client, 0), w.sequence)
+            )
+            self._waiting.remove(waiter)
+            self._running[waiter.client] = self._running.get(waiter.client, 0) + 1
+            self._waits.append(time.monotonic() - waiter.enqueued_at)
+            waiter.future.set_result(None)
+
+    def wait_percentiles(self) -> Dict[str, Optional[float]]:
+        """p50/p95/p99 of recent queue waits, in seconds."""
+        waits = sorted(self._waits)
+        if not waits:
+            return {'p50': None, 'p95': None, 'p99': None}
+        return {
+            name: waits[min(len(waits) - 1, math.ceil(q * len(waits)) - 1)]
+            for name, q in (('p50', 0.50), ('p95', 0.95), ('p99', 0.99))
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /health."""
+        queued = {name: 0 for name in PRIORITY_NAMES.values()}
+        for waiter in self._waiting:
+            queued[PRIORITY_NAMES[waiter.priority]] += 1
+        return {
+            'running': self.running,
+            'queue_depth': self.queue_depth,
+            'queued_by_priority': queued,
+            'max_concurrent': self.max_concurrent,
+            'per_client': self.per_client,
+            'max_queue': self.max_queue,
+            'rejected': self.rejected,
+            'wait_seconds': self.wait_percentiles(),
+        }
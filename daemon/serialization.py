@@ -0,0 +1,70 @@
+"""Fast JSON encoding of query results with orjson.
+
+Result rows skip Pydantic validation and its generic encoder. Snowflake
+values are encoded explicitly and without loss:
+
+- NUMBER with a scale (``Decimal``): string, every digit kept
+- ``datetime``/``date``/``time``: ISO 8601, UTC as ``Z``
+- BINARY (``bytes``): hex string, Snowflake's default binary output format
+- integers beyond 64 bits (NUMBER(38,0)): decimal string, like ``Decimal``;
+  only results that hold one pay for converting them
+- anything else orjson does not know: Pydantic's JSON form
+"""
+from decimal import Decimal
+from typing import Any, Iterable
+
+import orjson
+from pydantic_core import to_jsonable_python
+
+from daemon.models import QueryResponse
+
+OPTIONS = orjson.OPT_UTC_Z
+
+# Integer range orjson encodes natively
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 64 - 1
+
+
+def default(value: Any) -> Any:
+    """orjson fallback for types it does not encode natively."""
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return bytes(value).hex()
+    return to_jsonable_python(value)
+
+
+def _wide_ints_as_str(value: Any) -> Any:
+    """Copy of ``value`` with integers beyond orjson's range as strings."""
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value) if not _INT_MIN <= value <= _INT_MAX else value
+    if isinstance(value, (list, tuple)):
+        return [_wide_ints_as_str(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _wide_ints_as_str(item) for key, item in value.items()}
+    return value
+
+
+def dumps(value: Any) -> bytes:
+    """Encode rows or any JSON-like value."""
+    try:
+        return orjson.dumps(value, default=default, option=OPTIONS)
+    except orjson.JSONEncodeError:
+        # Integer beyond 64 bits; only such results pay for the copy
+        return orjson.dumps(_wide_ints_as_str(value), default=default, option=OPTIONS)
+
+
+def response_body(response: QueryResponse) -> bytes:
+    """JSON body of a QueryResponse, with rows encoded by orjson.
+
+    Only the small envelope goes through Pydantic.
+    """
+    body = response.model_dump(exclude={'data', 'columnar'})
+    body['data'] = response.data
+    body['columnar'] = response.columnar
+    return dumps(body)
+
+
+def rows_fragment(rows: Iterable[Any]) -> bytes:
+    """Rows as comma-separated JSON arrays, without the enclosing brackets."""
+    return dumps(list(rows))[1:-1]
@@ -1,54 +1,549 @@
-from fastapi import FastAPI
-from daemon.models import QueryRequest, QueryResponse, HealthResponse
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, TypeVar
+from fastapi import FastAPI, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from daemon.models import (
+    BatchRequest,
+    BatchResponse,
+    CatalogResponse,
+    ExportRequest,
+    ExportResponse,
+    FanoutRequest,
+    IngestRequest,
+    IngestResponse,
+    HealthResponse,
+    JobResponse,
+    QueryRequest,
+    QueryResponse,
+)
 from daemon.connection import SnowflakeConnection
-from daemon.executor import QueryExecutor
+from daemon.connection_pool import SnowflakeConnectionPool
+from daemon.cache import ResultCache
+from daemon.catalog import MetadataCatalog, NotLoaded
+from daemon import columnar, formatters, serialization
+from daemon.compression import DEFAULT_MIN_BYTES, CompressionMiddleware
+from daemon.executor import ARROW_STREAM_MEDIA_TYPE, QueryExecutor
+from daemon.scheduler import BATCH, INTERACTIVE, NORMAL, QueryScheduler, QueueFullError, classify
 from daemon.state import StateManager, SessionState
 from daemon.validators import WriteValidator
+import inspect
+import json
 import time
 import os
 import signal
+import threading
 
-app = FastAPI(title="Snowflake Daemon")
 start_time = time.time()
 
-# Global connection, state manager, and executor (will improve in Phase 3 with connection pool)
-state_manager = StateManager()
+# How often a waiting request checks whether its client is still there
+DISCONNECT_POLL_SECONDS = 1.0
+
+T = TypeVar('T')
+
+# Global connection pool, state manager, and executor
+# The state saved by the previous run is restored here; pool members are
+# created with it and log straight into that context while warming up.
+# If Snowflake rejects that context, they log in with the SNOWFLAKE_*
+# defaults and the saved state is discarded
+state_manager = StateManager.from_env()
 validator = WriteValidator()  # Allow all operations (read, DML, DDL)
+cache = ResultCache.from_env()
 try:
-    connection = SnowflakeConnection()
-    executor = QueryExecutor(connection, state_manager, validator)
+    pool = SnowflakeConnectionPool.from_env(
+        connection_factory=lambda: SnowflakeConnection(
+            state_manager.get_state(), on_state_rejected=state_manager.discard
+        )
+    )
+    catalog = MetadataCatalog.from_env(pool, state_manager)
+    executor = QueryExecutor(pool, state_manager, validator, cache=cache, catalog=catalog)
     connection_available = True
 except ValueError as e:
     # Missing credentials - daemon will start but queries will fail with helpful error
-    connection = None
+    pool = None
+    catalog = None
     executor = None
     connection_available = False
     connection_error = str(e)
 
+# Admit no more requests than there are connections and worker threads
+scheduler = QueryScheduler.from_env(capacity=executor.capacity if connection_available else None)
+
+
+def warm_up():
+    pool.warm_up()
+    if catalog is not None:
+        catalog.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open pool members in the background so /health answers immediately,
+    # then load the catalog over the warm connections
+    if connection_available:
+        threading.Thread(target=warm_up, daemon=True).start()
+    yield
+    if catalog is not None:
+        catalog.stop()
+    if connection_available:
+        executor.close()
+        pool.close()
+
+
+app = FastAPI(title="Snowflake Daemon", lifespan=lifespan)
+# Off by default: compressing costs more than it saves on localhost
+if os.getenv('DAEMON_COMPRESS', 'false').lower() == 'true':
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(os.getenv('DAEMON_COMPRESS_MIN_BYTES', str(DEFAULT_MIN_BYTES)))
+    )
+
+
+@app.exception_handler(QueueFullError)
+async def queue_full(request: Request, exc: QueueFullError) -> JSONResponse:
+    """Backpressure: tell the client when to try again."""
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "error": str(exc), "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+def client_id(http_request: Request) -> str:
+    """Scheduler identity: the X-Client-Id header, else the caller's address."""
+    return http_request.headers.get("x-client-id") or (
+        http_request.client.host if http_request.client else "unknown"
+    )
+
+
+async def admit(http_request: Request, priority: int) -> AsyncExitStack:
+    """Wait for a scheduler slot; close the returned stack to release it.
+
+    Raises QueueFullError (HTTP 429) when too many requests are waiting.
+    """
+    stack = AsyncExitStack()
+    await stack.enter_async_context(scheduler.slot(client_id(http_request), priority))
+    return stack
+
+
+async def unless_disconnected(http_request: Request, work: Awaitable[T]) -> Optional[T]:
+    """Await ``work``, cancelling it if the HTTP client goes away.
+
+    Cancelling an executor call also cancels its Snowflake query, so an
+    abandoned request stops using the warehouse. Returns None in that case.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await http_request.is_disconnected():
+                task.cancel()
+                return None
+    finally:
+        if not task.done():
+            task.cancel()
+
 
 @app.get("/health")
 async def health() -> HealthResponse:
-    conn_count = 1 if connection_available and connection and connection.is_healthy() else 0
     status = "healthy" if connection_available else "degraded"
+    waits = scheduler.wait_percentiles()
 
     return HealthResponse(
         status=status,
         uptime_seconds=time.time() - start_time,
-        connection_count=conn_count,
-        active_queries=0
+        connection_count=pool.open_count if connection_available else 0,
+        active_queries=scheduler.running,
+        queue_depth=scheduler.queue_depth,
+        wait_p50=waits['p50'],
+        wait_p95=waits['p95'],
+        wait_p99=waits['p99'],
+        scheduler=scheduler.stats(),
+        deduplication=executor.flight_stats() if connection_available else None
+    )
+
+
+@app.post("/query", response_model=QueryResponse)
+async def execute_query(request: QueryRequest, http_request: Request):
+    if not connection_available:
+        return QueryResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    slot = await admit(http_request, classify(request.sql, request.page_size or request.limit))
+    if request.format == "arrow":
+        return await arrow_response(request, slot)
+
+    async with slot:
+        response = await unless_disconnected(http_request, executor.execute(
+            request.sql,
+            request.limit,
+            page_size=request.page_size,
+            max_bytes=request.max_bytes,
+            params=request.params,
+            timeout_seconds=request.timeout_seconds,
+            spill=True
+        ))
+    if response is None:
+        # The client went away and the query was cancelled
+        return Response(status_code=499)
+    if response.spill is not None:
+        # Spilled results stay row-major so they can be streamed
+        body = spilled_json(response, request.format)
+        done = AsyncExitStack()
+        done.callback(close_spilled, body, response)
+        return SlotStreamingResponse(body, done, media_type="application/json")
+    # Pre-serialized, so FastAPI does not validate and re-encode every row
+    body = await executor.run_blocking(query_body, response, request.format)
+    return Response(body, media_type="application/json")
+
+
+def query_body(response: QueryResponse, format: str) -> bytes:
+    """Encode a /query response in the requested format."""
+    if format == "columnar" and response.data is not None:
+        response = columnar.encode_response(response)
+    elif format in ("table", "csv") and response.data is not None:
+        response = response.model_copy(update={
+            "formatted": formatters.render(format, response.columns or [], response.data),
+            "data": None,
+        })
+    return serialization.response_body(response)
+
+
+def spilled_json(response: QueryResponse, format: str = "json") -> Iterator[bytes]:
+    """Encode a spilled response one stored batch at a time.
+
+    The body is the same JSON as an in-memory QueryResponse; only one
+    batch of rows is ever decoded from the spill file at once. The spill
+    is closed once the body ends, however it ends.
+    """
+    try:
+        if format in ("table", "csv"):
+            yield from spilled_formatted(response, format)
+            return
+
+        head = response.model_dump_json(exclude={'data'})
+        yield head[:-1].encode() + b', "data": ['
+        first = True
+        for rows in response.spill.batches():
+            if not rows:
+                continue
+            body = serialization.rows_fragment(rows)
+            yield body if first else b',' + body
+            first = False
+        yield b']}'
+    finally:
+        response.spill.close()
+
+
+def close_spilled(body: Iterator[bytes], response: QueryResponse):
+    """Close a spilled_json() body, and its spill if the body never started.
+
+    Starlette leaves a sync body unclosed when the client goes away, and
+    a generator that never started skips its ``finally``.
+    """
+    if inspect.getgeneratorstate(body) == inspect.GEN_CREATED:
+        response.spill.close()
+    body.close()
+
+
+def spilled_formatted(response: QueryResponse, format: str) -> Iterator[bytes]:
+    """Render a spilled response into ``formatted``, one stored batch at a time."""
+    renderer = formatters.field_renderer(format, response.columns or [])
+
+    def escaped(chunk: bytes) -> bytes:
+        # Renderers return whole rows, so each chunk decodes on its own
+        return json.dumps(chunk.decode(), ensure_ascii=False)[1:-1].encode()
+
+    head = response.model_dump_json(exclude={'data', 'formatted'})
+    yield head[:-1].encode() + b', "data": null, "formatted": "' + escaped(renderer.start())
+    for rows in response.spill.batches():
+        yield escaped(renderer.rows(rows))
+    yield escaped(renderer.end()) + b'"}'
+
+
+class SlotStreamingResponse(StreamingResponse):
+    """A StreamingResponse that closes ``slot`` however the response ends.
+
+    A body generator's ``finally`` never runs if the client disconnects
+    before the body starts, which would keep the scheduler slot and the
+    pooled connection of an already-started query.
+    """
+
+    def __init__(self, content: Any, slot: AsyncExitStack, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.slot.aclose()
+
+
+async def arrow_response(request: QueryRequest, slot: AsyncExitStack):
+    """Answer with an Arrow IPC stream, or a JSON QueryResponse on failure.
+
+    ``slot`` is held until the stream is finished.
+    """
+    chunks = executor.stream_arrow(request.sql, request.limit, request.params, request.timeout_seconds)
+    # Closed before the slot is released
+    slot.push_async_callback(chunks.aclose)
+    try:
+        first = await anext(chunks)
+    except BaseException:
+        await slot.aclose()
+        raise
+    if isinstance(first, dict):
+        await slot.aclose()
+        return QueryResponse(success=False, error=first["error"])
+
+    async def body():
+        yield first
+        async for chunk in chunks:
+            yield chunk
+
+    return SlotStreamingResponse(body(), slot, media_type=ARROW_STREAM_MEDIA_TYPE)
+
+
+@app.post("/query/render")
+async def render_query(request: QueryRequest, http_request: Request):
+    """Stream the result rendered as a markdown table, CSV or JSON.
+
+    Rendered bodies carry an X-Result-Format header. Without it, the body
+    is a JSON QueryResponse for a query that failed before producing a
+    result.
+    """
+    if not connection_available:
+        return QueryResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+    renderer_class = formatters.RENDERERS.get(request.format)
+    if renderer_class is None:
+        return QueryResponse(
+            success=False,
+            error=f"Unknown format '{request.format}'. Use one of: {', '.join(formatters.RENDERERS)}"
+        )
+
+    slot = await admit(http_request, classify(request.sql, request.limit))
+    messages = executor.stream(request.sql, request.chunk_size, request.limit, request.timeout_seconds)
+    slot.push_async_callback(messages.aclose)
+    try:
+        first = await anext(messages)
+    except BaseException:
+        await slot.aclose()
+        raise
+    if first["type"] == "error":
+        await slot.aclose()
+        return QueryResponse(success=False, error=first["error"])
+
+    renderer = renderer_class(first.get("columns", []))
+
+    async def body():
+        yield renderer.start()
+        async for message in messages:
+            if message["type"] == "rows":
+                yield await executor.run_blocking(renderer.rows, message["data"])
+            elif message["type"] == "end":
+                yield renderer.end(message.get("execution_time"))
+            elif message["type"] == "error":
+                # Output already went out; an aborted body tells the client
+                raise RuntimeError(message["error"])
+
+    return SlotStreamingResponse(
+        body(),
+        slot,
+        media_type=renderer.media_type,
+        headers={"X-Result-Format": request.format}
     )
 
 
-@app.post("/query")
-async def execute_query(request: QueryRequest) -> QueryResponse:
+def ndjson_line(message: Dict[str, Any]) -> bytes:
+    """One NDJSON line, with values encoded like /query encodes them."""
+    return serialization.dumps(message) + b"\n"
+
+
+@app.post("/query/stream")
+async def stream_query(request: QueryRequest, http_request: Request) -> StreamingResponse:
+    """Stream results as newline-delimited JSON: schema, row batches, end."""
+    if not connection_available:
+        message = {"type": "error", "error": f"Snowflake connection not configured: {connection_error}"}
+        return StreamingResponse(iter([json.dumps(message) + "\n"]), media_type="application/x-ndjson")
+
+    slot = await admit(http_request, classify(request.sql, request.limit))
+    messages = executor.stream(request.sql, request.chunk_size, request.limit, request.timeout_seconds)
+    slot.push_async_callback(messages.aclose)
+
+    async def ndjson():
+        async for message in messages:
+            yield ndjson_line(message)
+
+    return SlotStreamingResponse(ndjson(), slot, media_type="application/x-ndjson")
+
+
+@app.post("/batch")
+async def execute_batch(request: BatchRequest, http_request: Request) -> BatchResponse:
+    """Run an ordered list of statements (or a script) on one connection."""
+    if not connection_available:
+        return BatchResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    statements = list(request.statements or [])
+    if request.script:
+        statements.extend(executor.split_script(request.script))
+
+    async with await admit(http_request, BATCH):
+        return await executor.execute_batch(statements, request.stop_on_error, request.limit)
+
+
+@app.post("/fanout")
+async def fanout(request: FanoutRequest, http_request: Request) -> StreamingResponse:
+    """Run independent queries concurrently; NDJSON results in completion order.
+
+    Each query takes its own batch slot, so a fan-out competes for
+    capacity like the same queries sent one by one.
+    """
+    client = client_id(http_request)
+
+    async def ndjson():
+        if not connection_available:
+            error = f"Snowflake connection not configured: {connection_error}"
+            for index in range(len(request.queries)):
+                yield json.dumps({"index": index, "success": False, "error": error}) + "\n"
+            return
+
+        results = executor.fanout(
+            request.queries, request.limit, request.max_concurrency,
+            admit=lambda: scheduler.slot(client, BATCH)
+        )
+        async for result in results:
+            yield ndjson_line(result)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+@app.post("/ingest")
+async def ingest_rows(request: IngestRequest, http_request: Request) -> IngestResponse:
+    """Bulk-load JSON rows (row-wise with columns, or columnar in data)."""
+    if request.data is not None and len({len(values) for values in request.data.values()}) > 1:
+        lengths = ", ".join(f"{name}={len(values)}" for name, values in request.data.items())
+        return JSONResponse(status_code=400, content=jsonable_encoder(IngestResponse(
+            success=False,
+            table=request.table,
+            error=f"Columns in data must have the same length ({lengths})"
+        )))
+
+    if not connection_available:
+        return IngestResponse(
+            success=False,
+            table=request.table,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    if request.data is not None:
+        columns = list(request.data)
+        rows = [list(row) for row in zip(*request.data.values())]
+    else:
+        columns, rows = request.columns or [], request.rows or []
+
+    async with await admit(http_request, BATCH):
+        return await executor.ingest(request.table, columns, rows, request.method)
+
+
+@app.post("/ingest/{table}")
+async def ingest_upload(table: str, request: Request, columns: Optional[str] = None) -> IngestResponse:
+    """Bulk-load an uploaded CSV (text/csv, with header) or Arrow IPC stream body."""
+    if not connection_available:
+        return IngestResponse(
+            success=False,
+            table=table,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    async with await admit(request, BATCH):
+        return await executor.ingest_upload(
+            table,
+            await request.body(),
+            request.headers.get("content-type", ""),
+            columns.split(",") if columns else None
+        )
+
+
+@app.post("/export")
+async def export_result(request: ExportRequest, http_request: Request) -> ExportResponse:
+    """Unload a query result to local Parquet/CSV files via the user stage."""
+    if not connection_available:
+        return ExportResponse(
+            success=False,
+            path=request.path,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    async with await admit(http_request, BATCH):
+        return await executor.export(request.sql, request.path, request.format, request.parallel)
+
+
+@app.get("/results/{query_id}")
+async def fetch_results(
+    query_id: str,
+    http_request: Request,
+    offset: int = 0,
+    size: int = 100
+) -> QueryResponse:
+    """Serve a page of an earlier result (see QueryRequest.page_size)."""
     if not connection_available:
         return QueryResponse(
             success=False,
             error=f"Snowflake connection not configured: {connection_error}"
         )
 
-    response = await executor.execute(request.sql, request.limit)
-    return response
+    async with await admit(http_request, INTERACTIVE):
+        return await executor.fetch_page(query_id, offset, size)
+
+
+@app.post("/jobs")
+async def submit_job(request: QueryRequest, http_request: Request) -> JobResponse:
+    """Submit a query asynchronously; returns its Snowflake query ID at once."""
+    if not connection_available:
+        return JobResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    async with await admit(http_request, NORMAL):
+        return await executor.submit(request.sql, request.timeout_seconds)
+
+
+@app.get("/jobs/{query_id}")
+async def poll_job(query_id: str, http_request: Request, limit: Optional[int] = 100) -> JobResponse:
+    """Get the status of a submitted query, with results once it is done."""
+    if not connection_available:
+        return JobResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    async with await admit(http_request, INTERACTIVE):
+        return await executor.poll(query_id, limit)
+
+
+@app.delete("/jobs/{query_id}")
+async def cancel_job(query_id: str) -> JobResponse:
+    """Cancel a submitted query (never queued behind other work)."""
+    if not connection_available:
+        return JobResponse(
+            success=False,
+            error=f"Snowflake connection not configured: {connection_error}"
+        )
+
+    return await executor.cancel(query_id)
 
 
 @app.get("/state")
@@ -57,19 +552,113 @@ async def get_state() -> SessionState:
     return state_manager.get_state()
 
 
+@app.get("/cache")
+async def cache_stats():
+    """Result cache hit/miss/eviction statistics."""
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop every cached result."""
+    if cache is not None:
+        cache.clear()
+    return {"status": "cleared"}
+
+
+def catalog_unavailable() -> CatalogResponse:
+    """Error response when there is no catalog."""
+    if not connection_available:
+        return CatalogResponse(success=False, error=f"Snowflake connection not configured: {connection_error}")
+    return CatalogResponse(success=False, error="Catalog disabled (DAEMON_CATALOG_REFRESH=0)")
+
+
+async def catalog_lookup(lookup: Callable[..., Any], *args) -> CatalogResponse:
+    """Answer from memory when possible; loads run on a worker thread."""
+    try:
+        try:
+            data = catalog.cached(lookup, *args)
+        except NotLoaded:
+            data = await executor.run_blocking(lookup, *args)
+    except Exception as e:
+        return CatalogResponse(success=False, error=str(e))
+    return CatalogResponse(success=True, data=data)
+
+
+@app.get("/catalog")
+async def catalog_stats():
+    """Catalog contents and refresh statistics."""
+    if catalog is None:
+        return {"enabled": False}
+    return {"enabled": True, **catalog.stats()}
+
+
+@app.delete("/catalog")
+async def clear_catalog():
+    """Drop all cached metadata; it is reloaded on the next lookup."""
+    if catalog is not None:
+        catalog.clear()
+    return {"status": "cleared"}
+
+
+@app.get("/catalog/databases")
+async def catalog_databases() -> CatalogResponse:
+    """Databases visible to the current role."""
+    if catalog is None:
+        return catalog_unavailable()
+    return await catalog_lookup(catalog.databases)
+
+
+@app.get("/catalog/schemas")
+async def catalog_schemas(database: Optional[str] = None) -> CatalogResponse:
+    """Schemas of a database (default: the session's)."""
+    if catalog is None:
+        return catalog_unavailable()
+    return await catalog_lookup(catalog.schemas, database)
+
+
+@app.get("/catalog/tables")
+async def catalog_tables(
+    database: Optional[str] = None,
+    schema: Optional[str] = None,
+    like: Optional[str] = None
+) -> CatalogResponse:
+    """Tables and views of a schema or database; ``like`` as in SHOW TABLES LIKE."""
+    if catalog is None:
+        return catalog_unavailable()
+    return await catalog_lookup(catalog.tables, database, schema, like)
+
+
+@app.get("/catalog/tables/{name}")
+async def catalog_table(name: str) -> CatalogResponse:
+    """One table or view with its columns; ``name`` may be qualified."""
+    if catalog is None:
+        return catalog_unavailable()
+    return await catalog_lookup(catalog.table, name)
+
+
+@app.get("/catalog/columns")
+async def catalog_columns(name: str, database: Optional[str] = None) -> CatalogResponse:
+    """Tables in a database that have a column called ``name``."""
+    if catalog is None:
+        return catalog_unavailable()
+    return await catalog_lookup(catalog.find_columns, name, database)
+
+
 @app.post("/shutdown")
 async def shutdown():
     """Gracefully shutdown the daemon."""
-    # Close Snowflake connection
-    if connection_available and connection:
-        connection.close()
+    # Close Snowflake connections (off the event loop, closing is network I/O)
+    if connection_available:
+        await executor.run_blocking(pool.close)
 
     # Schedule shutdown signal (delayed to allow response to be sent)
     def trigger_shutdown():
         time.sleep(0.5)  # Give time for response to be sent
         os.kill(os.getpid(), signal.SIGTERM)
 
-    import threading
     threading.Thread(target=trigger_shutdown, daemon=True).start()
 
     return {"status": "shutting down"}
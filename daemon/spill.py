@@ -0,0 +1,224 @@
+"""Spill files: large results kept in memory-mapped temp files.
+
+A result over the spill threshold is written batch by batch to a temp file
+and read back through a memory map, so the daemon never holds it as one
+list of tuples. With pyarrow installed the file is Arrow IPC, filled
+straight from the connector's Arrow batches. Otherwise, and for results
+the server sends as JSON (SHOW, DESCRIBE), it holds pickled row batches.
+
+The file is unlinked as soon as it is mapped. The kernel frees it when the
+last reader drops the mapping, so a spill never outlives its response.
+"""
+import importlib.util
+import mmap
+import os
+import pickle
+import tempfile
+import threading
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+
+# Rows per fetchmany() call when spilling without pyarrow
+SPILL_BATCH_ROWS = 10000
+
+
+def arrow_available() -> bool:
+    """Whether pyarrow is installed."""
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def arrow_result(cursor) -> bool:
+    """Whether an executed cursor can hand out Arrow batches.
+
+    SHOW, DESCRIBE and other metadata results come back as JSON, and
+    ``fetch_arrow_batches()`` refuses them.
+    """
+    return arrow_available() and getattr(cursor, '_query_result_format', None) == 'arrow'
+
+
+class SpillFile:
+    """Write-once, read-many storage for the rows of one result.
+
+    Call append() for each batch, then finish() before reading with
+    batches(). Every response that streams the spill calls share() first
+    and close() when done; the last close() releases it.
+    """
+
+    SUFFIX = ''
+
+    def __init__(self, columns: Sequence[str], directory: Optional[str] = None):
+        self.columns = list(columns)
+        self.row_count = 0
+        fd, self.path = tempfile.mkstemp(prefix='sf-spill-', suffix=self.SUFFIX, dir=directory)
+        self._file = os.fdopen(fd, 'wb')
+        self._holders = 0
+        # Readers stream from worker threads and may close concurrently
+        self._holders_lock = threading.Lock()
+
+    def share(self) -> "SpillFile":
+        """Take a reference for one more reader; pair it with close()."""
+        with self._holders_lock:
+            self._holders += 1
+        return self
+
+    def append(self, batch: Any):
+        raise NotImplementedError
+
+    def batches(self) -> Iterator[List[Tuple[Any, ...]]]:
+        """Yield the rows back as lists of tuples, one stored batch at a time."""
+        raise NotImplementedError
+
+    def _end_writing(self):
+        """Flush whatever the format needs at the end of the file."""
+
+    def _map(self):
+        """Map the finished file for reading."""
+        raise NotImplementedError
+
+    def finish(self) -> "SpillFile":
+        """Close the file for writing, map it and unlink it."""
+        self._end_writing()
+        self._file.close()
+        self._map()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass  # Mapped files cannot be removed everywhere; close() retries
+        return self
+
+    def _unmap(self):
+        """Drop the mapping made by _map(), if any."""
+
+    def close(self):
+        """Drop the mapping and remove the file if it is still there.
+
+        With readers from share(), only the last close() does so.
+        """
+        with self._holders_lock:
+            if self._holders > 0:
+                self._holders -= 1
+                if self._holders:
+                    return
+        self._unmap()
+        if not self._file.closed:
+            self._file.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+class RowSpill(SpillFile):
+    """Spill of Python row batches, pickled one frame per batch."""
+
+    SUFFIX = '.rows'
+
+    def __init__(self, columns: Sequence[str], directory: Optional[str] = None):
+        super().__init__(columns, directory)
+        self._frames: List[Tuple[int, int]] = []
+        self._mmap: Optional[mmap.mmap] = None
+
+    def append(self, rows: Sequence[Sequence[Any]]):
+        if not rows:
+            return
+        frame = pickle.dumps([tuple(row) for row in rows], protocol=pickle.HIGHEST_PROTOCOL)
+        self._frames.append((self._file.tell(), len(frame)))
+        self._file.write(frame)
+        self.row_count += len(rows)
+
+    def _map(self):
+        if not self._frames:
+            return  # Empty files cannot be mapped
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def batches(self) -> Iterator[List[Tuple[Any, ...]]]:
+        for offset, length in self._frames:
+            yield pickle.loads(self._mmap[offset:offset + length])
+
+    def _unmap(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ArrowSpill(SpillFile):
+    """Spill of Arrow tables in the IPC file format."""
+
+    SUFFIX = '.arrow'
+
+    def __init__(self, columns: Sequence[str], directory: Optional[str] = None):
+        super().__init__(columns, directory)
+        self._writer = None
+        self._schema = None
+        self._buffer = None
+
+    def append(self, table):
+        import pyarrow as pa
+
+        if self._writer is None:
+            self._schema = table.schema
+            self._writer = pa.ipc.new_file(self._file, table.schema)
+        elif table.schema != self._schema:
+            table = table.cast(self._schema)
+        self._writer.write_table(table)
+        self.row_count += table.num_rows
+
+    def _end_writing(self):
+        if self._writer is not None:
+            self._writer.close()
+
+    def _map(self):
+        import pyarrow as pa
+
+        if self._writer is not None:
+            self._buffer = pa.memory_map(self.path).read_buffer()
+
+    def batches(self) -> Iterator[List[Tuple[Any, ...]]]:
+        import pyarrow as pa
+
+        if self._buffer is None:
+            return
+        # A reader per call, so concurrent readers do not share a position
+        reader = pa.ipc.open_file(self._buffer)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            yield list(zip(*(column.to_pylist() for column in batch.columns)))
+
+    def _unmap(self):
+        self._buffer = None
+
+
+def spill_cursor(
+    cursor,
+    columns: Sequence[str],
+    limit: Optional[int] = None,
+    directory: Optional[str] = None
+) -> SpillFile:
+    """Drain up to ``limit`` rows of an executed cursor into a finished spill."""
+    spill = ArrowSpill(columns, directory) if arrow_result(cursor) else RowSpill(columns, directory)
+    try:
+        remaining = limit
+        if isinstance(spill, ArrowSpill):
+            # Microseconds in every batch: one schema for the whole file,
+            # and dates such as 9999-12-31 stay in range
+            for table in cursor.fetch_arrow_batches(force_microsecond_precision=True):
+                if remaining is not None:
+                    table = table.slice(0, remaining)
+                    remaining -= table.num_rows
+                spill.append(table)
+                if remaining == 0:
+                    break
+        else:
+            while remaining is None or remaining > 0:
+                size = SPILL_BATCH_ROWS if remaining is None else min(SPILL_BATCH_ROWS, remaining)
+                rows = cursor.fetchmany(size)
+                spill.append(rows)
+                if remaining is not None:
+                    remaining -= len(rows)
+                if len(rows) < size:
+                    break
+        return spill.finish()
+    except BaseException:
+        spill.close()
+        raise
@@ -1,5 +1,11 @@
+import os
+import tempfile
+import threading
 from typing import Optional
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, ValidationError
+
+# Where the daemon keeps its session state between runs
+DEFAULT_STATE_FILE = os.path.join(os.path.expanduser('~'), '.snowflake-daemon', 'state.json')
 
 
 class SessionState(BaseModel):
@@ -12,12 +18,74 @@ class SessionState(BaseModel):
     role: Optional[str] = None
 
 
+def load_state(path: str) -> Optional[SessionState]:
+    """Read a saved session state; None if the file is missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return SessionState.model_validate_json(f.read())
+    except (OSError, ValueError, ValidationError):
+        return None
+
+
+def save_state(state: SessionState, path: str):
+    """Write a session state atomically, so a crash never leaves half a file."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.state-', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(state.model_dump_json())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
 class StateManager:
-    """Manages session state for Snowflake connection."""
+    """Manages session state for Snowflake connection.
+
+    With a ``path`` every change is saved to that file, so a restarted
+    daemon can pick up where the last one left off.
+    """
 
-    def __init__(self, initial_state: Optional[SessionState] = None):
+    def __init__(self, initial_state: Optional[SessionState] = None, path: Optional[str] = None):
         """Initialize state manager with optional initial state."""
         self.state = initial_state if initial_state is not None else SessionState()
+        self.path = path
+        self._save_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "StateManager":
+        """State manager persisting to DAEMON_STATE_FILE (empty disables).
+
+        Starts from the state saved by the previous run, if any.
+        """
+        path = os.path.expanduser(os.getenv('DAEMON_STATE_FILE', DEFAULT_STATE_FILE)) or None
+        return cls(initial_state=load_state(path) if path else None, path=path)
+
+    def _changed(self):
+        """Save the state after a change. Persistence is best effort."""
+        if self.path is None:
+            return
+        with self._save_lock:
+            try:
+                save_state(self.state, self.path)
+            except OSError:
+                pass  # An unwritable state file must not fail the query
+
+    def discard(self):
+        """Forget the state and delete its file, e.g. after Snowflake rejected it."""
+        with self._save_lock:
+            for field in SessionState.model_fields:
+                setattr(self.state, field, None)
+            if self.path is not None:
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
 
     def get_state(self) -> SessionState:
         """Get current session state."""
@@ -26,15 +94,27 @@ class StateManager:
     def set_database(self, database: Optional[str]):
         """Set current database."""
         self.state.database = database if database else None
+        self._changed()
 
     def set_schema(self, schema: Optional[str]):
         """Set current schema."""
         self.state.schema = schema if schema else None
+        self._changed()
 
     def set_warehouse(self, warehouse: Optional[str]):
         """Set current warehouse."""
         self.state.warehouse = warehouse if warehouse else None
+        self._changed()
 
     def set_role(self, role: Optional[str]):
         """Set current role."""
         self.state.role = role if role else None
+        self._changed()
+
+    def update(self, **fields: Optional[str]):
+        """Set several fields at once, e.g. ``update(database="DB")``."""
+        for field, value in fields.items():
+            if field not in SessionState.model_fields:
+                raise ValueError(f"Unknown session state field: {field}")
+            setattr(self.state, field, value if value else None)
+        self._changed()
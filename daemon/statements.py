@@ -0,0 +1,215 @@
+"""SQL text helpers: normalization, statement classification, object references."""
+import re
+from typing import Collection, List, Optional, Set, Tuple
+
+
+# String literals, quoted identifiers, comments and whitespace runs
+_TOKEN_PATTERN = re.compile(
+    r"""('(?:[^'\\]|\\.|'')*')"""      # 1: string literal
+    r"""|("(?:[^"]|"")*")"""           # 2: quoted identifier
+    r"""|(--[^\n]*|//[^\n]*|/\*.*?\*/)"""  # 3: comment
+    r"""|(\s+)""",                     # 4: whitespace
+    re.DOTALL
+)
+
+_IDENTIFIER = r'(?:"(?:[^"]|"")+"|[A-Za-z_][\w$]*)'
+
+# Keywords that are followed by an object name
+_OBJECT_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN|INTO|UPDATE|TABLE|VIEW|USING|TRUNCATE|DESCRIBE|DESC)\s+'
+    r'(?:(?:TABLE|VIEW)\s+)?'
+    r'(?:IF\s+(?:NOT\s+)?EXISTS\s+)?'
+    rf'({_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER}){{0,2}})',
+    re.IGNORECASE
+)
+
+# Words the object pattern can capture that are not object names
+_NOT_OBJECTS = {'TABLE', 'LATERAL', 'SELECT', 'VALUES', 'TABLES', 'VIEW', 'VIEWS'}
+
+READ_COMMANDS = {'SELECT', 'WITH', 'SHOW', 'DESCRIBE', 'DESC', 'LIST', 'GET'}
+
+METADATA_COMMANDS = {'SHOW', 'DESCRIBE', 'DESC'}
+
+# Statements that may leave the session in another database, schema,
+# warehouse or role
+CONTEXT_COMMANDS = {'USE', 'CALL', 'EXECUTE'}
+
+DDL_COMMANDS = {'CREATE', 'DROP', 'ALTER', 'TRUNCATE', 'RENAME', 'COMMENT', 'UNDROP'}
+
+# :name placeholders; a preceding word character or colon means a
+# VARIANT path (src:name) or a cast (x::int), not a placeholder
+_NAMED_PARAMETER = re.compile(r'(?<![:\w]):([A-Za-z_]\w*)')
+
+# Functions whose result changes between identical executions
+_VOLATILE_PATTERN = re.compile(
+    r'\b(?:CURRENT_(?:TIMESTAMP|TIME|DATE)|LOCALTIME(?:STAMP)?|SYSDATE|GETDATE|'
+    r'RANDOM|RANDSTR|UNIFORM|NORMAL|ZIPF|UUID_STRING|SEQ[1248]|'
+    r'SYSTEM\$\w+|RESULT_SCAN|LAST_QUERY_ID)\b',
+    re.IGNORECASE
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """Canonical form of a statement for use as a lookup key.
+
+    Comments are dropped, whitespace runs collapse to one space, unquoted
+    text is uppercased (Snowflake folds unquoted identifiers and keywords)
+    and a trailing semicolon is removed. Literals and quoted identifiers
+    are kept byte-for-byte.
+    """
+    parts = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        if match.start() > position:
+            parts.append(sql[position:match.start()].upper())
+        if match.group(1) or match.group(2):
+            parts.append(match.group(0))
+        elif parts and parts[-1] != ' ':
+            parts.append(' ')
+        position = match.end()
+    parts.append(sql[position:].upper())
+
+    normalized = ''.join(parts).strip()
+    while normalized.endswith(';'):
+        normalized = normalized[:-1].rstrip()
+    return normalized
+
+
+def strip_terminator(sql: str) -> str:
+    """Statement without its trailing semicolon, even one followed by comments."""
+    end = 0  # End of the last text that is neither comment nor whitespace
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        if match.start() > position:
+            end = match.start()
+        if match.group(1) or match.group(2):
+            end = match.end()
+        position = match.end()
+    if len(sql) > position:
+        end = len(sql)
+
+    code = sql[:end].rstrip()
+    while code.endswith(';'):
+        code = code[:-1].rstrip()
+    return code + sql[end:]
+
+
+def _strip_literals(sql: str) -> str:
+    """Blank out string literals and comments so they cannot match keywords."""
+    def replace(match):
+        if match.group(1):
+            return "''"
+        if match.group(2):
+            return match.group(0)
+        return ' '
+    return _TOKEN_PATTERN.sub(replace, sql)
+
+
+def statement_type(sql: str) -> str:
+    """First keyword of the statement, uppercased ('' for empty SQL)."""
+    words = _strip_literals(sql).split()
+    return words[0].upper() if words else ''
+
+
+def is_read_only(sql: str) -> bool:
+    """True for statements that cannot change data or objects."""
+    return statement_type(sql) in READ_COMMANDS
+
+
+def is_volatile(sql: str) -> bool:
+    """True if the statement calls functions with per-execution results."""
+    return bool(_VOLATILE_PATTERN.search(_strip_literals(sql)))
+
+
+_OBJECT_NAME = re.compile(rf'{_IDENTIFIER}(?:\.{_IDENTIFIER}){{0,2}}')
+
+
+def is_object_name(name: str, max_parts: int = 3) -> bool:
+    """True if ``name`` is a (possibly qualified) identifier and nothing else."""
+    return bool(_OBJECT_NAME.fullmatch(name)) and len(re.findall(_IDENTIFIER, name)) <= max_parts
+
+
+def object_name_parts(name: str) -> List[str]:
+    """Parts of a qualified name as written (quotes kept): ``db.s.t`` -> [db, s, t]."""
+    return re.findall(_IDENTIFIER, name)
+
+
+def _normalize_identifier(identifier: str) -> str:
+    """Fold an identifier the way Snowflake resolves it."""
+    identifier = identifier.strip()
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier.upper()
+
+
+def referenced_objects(sql: str) -> Set[str]:
+    """Unqualified names of the tables/views a statement reads or writes.
+
+    Names are folded like Snowflake folds them (unquoted names uppercased).
+    Only the last part of a qualified name is kept, which makes matching
+    conservative: ``DB1.S.T`` and ``DB2.S.T`` are both ``T``.
+    """
+    objects = set()
+    for match in _OBJECT_PATTERN.finditer(_strip_literals(sql)):
+        name = split_object_name(match.group(1))[-1]
+        if name.upper() not in _NOT_OBJECTS:
+            objects.add(name)
+    return objects
+
+
+def split_object_name(name: str) -> List[str]:
+    """Split ``db.schema.table`` into normalized parts, honouring quotes."""
+    parts = re.findall(_IDENTIFIER, name)
+    return [_normalize_identifier(part) for part in parts]
+
+
+def qualified_objects(sql: str) -> Set[Tuple[Optional[str], Optional[str], str]]:
+    """Referenced objects as (database, schema, name) tuples; missing parts are None."""
+    objects = set()
+    for match in _OBJECT_PATTERN.finditer(_strip_literals(sql)):
+        parts = split_object_name(match.group(1))
+        if parts[-1].upper() in _NOT_OBJECTS:
+            continue
+        objects.add(tuple([None] * (3 - len(parts)) + parts))
+    return objects
+
+
+
+def to_qmark(sql: str, names: Collection[str]) -> Tuple[str, List[str]]:
+    """Rewrite ``:name`` placeholders to ``?`` for server-side binding.
+
+    Only names in ``names`` are rewritten, and never inside literals,
+    quoted identifiers or comments. Returns the new SQL and the name
+    bound to each ``?``, in order.
+    """
+    order: List[str] = []
+
+    def replace(match):
+        if match.group(1) not in names:
+            return match.group(0)
+        order.append(match.group(1))
+        return '?'
+
+    parts = []
+    position = 0
+    for match in _TOKEN_PATTERN.finditer(sql):
+        if match.start() > position:
+            parts.append(_NAMED_PARAMETER.sub(replace, sql[position:match.start()]))
+        parts.append(match.group(0))
+        position = match.end()
+    parts.append(_NAMED_PARAMETER.sub(replace, sql[position:]))
+    return ''.join(parts), order
+
+
+_SIMPLE_IDENTIFIER = re.compile(r'[A-Z_][A-Z0-9_$]*')
+
+
+def quote_identifier(name: str) -> str:
+    """SQL text for an identifier that resolves to exactly ``name``.
+
+    Names as Snowflake reports them are case-sensitive; only all-uppercase
+    simple names can go unquoted.
+    """
+    if _SIMPLE_IDENTIFIER.fullmatch(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
@@ -0,0 +1,52 @@
+import pytest
+from daemon.budget import ByteBudget
+
+
+class TestByteBudget:
+    """Test the per-response byte budget."""
+
+    def test_rejects_non_positive_budget(self):
+        """Test that a budget must allow some bytes."""
+        with pytest.raises(ValueError):
+            ByteBudget(0)
+
+    def test_small_rows_pass_unchanged(self):
+        """Test that rows within budget are returned as they are."""
+        budget = ByteBudget(100)
+
+        assert budget.fit((1, "abc", None)) == (1, "abc", None)
+        assert budget.used == 1 + 3 + 4
+        assert budget.bytes_omitted == 0
+
+    def test_oversized_text_cell_is_cut_with_marker(self):
+        """Test that a long string keeps its prefix and says how much was cut."""
+        budget = ByteBudget(1000, max_cell_bytes=10)
+
+        row = budget.fit(("x" * 50,))
+
+        assert row[0] == "x" * 10 + "...[40 bytes truncated]"
+        assert budget.truncated_cells == 1
+        assert budget.bytes_omitted == 40
+
+    def test_oversized_binary_cell_is_cut(self):
+        """Test that binary cells are cut without a marker and stay bytes."""
+        budget = ByteBudget(1000, max_cell_bytes=4)
+
+        row = budget.fit((b"\x00" * 10,))
+
+        assert row[0] == b"\x00" * 4
+        assert budget.truncated_cells == 1
+        assert budget.bytes_omitted == 6
+
+    def test_default_cell_cap_is_quarter_of_budget(self):
+        """Test that one cell cannot take the whole budget by default."""
+        assert ByteBudget(400).max_cell_bytes == 100
+
+    def test_row_over_budget_exhausts(self):
+        """Test that the first row that does not fit is refused."""
+        budget = ByteBudget(10, max_cell_bytes=10)
+
+        assert budget.fit(("abcdef",)) is not None
+        assert budget.fit(("abcdef",)) is None
+        assert budget.exhausted is True
+        assert budget.bytes_omitted == 6
@@ -0,0 +1,108 @@
+"""Tests for the result cache."""
+import pytest
+from daemon.cache import CacheEntry, ResultCache
+from daemon.models import QueryResponse
+
+
+def make_entry(size=10, objects=("T",), metadata=False):
+    """Create a cache entry with a trivial response."""
+    response = QueryResponse(success=True, data=[(1,)], columns=["ID"], row_count=1)
+    return CacheEntry(response, size=size, objects=set(objects), metadata=metadata)
+
+
+class TestLookup:
+    """Tests for get/put and statistics."""
+
+    def test_miss_then_hit(self):
+        cache = ResultCache()
+        assert cache.get("k") is None
+        cache.put("k", make_entry())
+        assert cache.get("k") is not None
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_entry_expires_after_ttl(self):
+        cache = ResultCache(ttl=60)
+        entry = make_entry()
+        cache.put("k", entry)
+        entry.stored_at -= 120
+
+        assert cache.get("k") is None
+        assert cache.stats()["expirations"] == 1
+
+    def test_oversized_entry_not_stored(self):
+        cache = ResultCache(max_bytes=5)
+        assert cache.put("k", make_entry(size=10)) is False
+        assert cache.stats()["entries"] == 0
+
+
+class TestEviction:
+    """Tests for LRU eviction under the byte budget."""
+
+    def test_least_recently_used_evicted(self):
+        cache = ResultCache(max_bytes=25)
+        cache.put("a", make_entry(size=10))
+        cache.put("b", make_entry(size=10))
+        cache.get("a")  # a is now most recently used
+        cache.put("c", make_entry(size=10))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.stats()["evictions"] == 1
+
+    def test_bytes_tracked(self):
+        cache = ResultCache()
+        cache.put("a", make_entry(size=7))
+        cache.put("a", make_entry(size=3))
+        assert cache.stats()["bytes"] == 3
+
+
+class TestInvalidation:
+    """Tests for write-driven invalidation."""
+
+    def test_invalidate_matching_objects_only(self):
+        cache = ResultCache()
+        cache.put("orders", make_entry(objects=["ORDERS"]))
+        cache.put("users", make_entry(objects=["USERS"]))
+
+        assert cache.invalidate({"ORDERS"}) == 1
+        assert cache.get("orders") is None
+        assert cache.get("users") is not None
+
+    def test_ddl_invalidates_metadata_entries(self):
+        cache = ResultCache()
+        cache.put("show", make_entry(objects=[], metadata=True))
+        cache.put("users", make_entry(objects=["USERS"]))
+
+        cache.invalidate({"NEW_TABLE"}, ddl=True)
+
+        assert cache.get("show") is None
+        assert cache.get("users") is not None
+
+    def test_unknown_objects_invalidate_everything(self):
+        cache = ResultCache()
+        cache.put("a", make_entry(objects=["A"]))
+        cache.put("b", make_entry(objects=["B"]))
+
+        assert cache.invalidate(set()) == 2
+
+
+class TestFromEnv:
+    """Tests for environment configuration."""
+
+    def test_disabled_with_zero_budget(self, monkeypatch):
+        monkeypatch.setenv('DAEMON_CACHE_MAX_BYTES', '0')
+        assert ResultCache.from_env() is None
+
+    def test_reads_settings(self, monkeypatch):
+        monkeypatch.setenv('DAEMON_CACHE_MAX_BYTES', '1000')
+        monkeypatch.setenv('DAEMON_CACHE_TTL', '30')
+        monkeypatch.setenv('DAEMON_CACHE_CHECK_FRESHNESS', 'true')
+
+        cache = ResultCache.from_env()
+
+        assert cache.max_bytes == 1000
+        assert cache.ttl == 30
+        assert cache.check_freshness is True
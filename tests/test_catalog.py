@@ -0,0 +1,236 @@
+"""Tests for the metadata catalog."""
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import pytest
+
+from daemon.catalog import MetadataCatalog, NotLoaded, like_pattern
+from daemon.state import SessionState, StateManager
+
+JAN = datetime(2024, 1, 1)
+FEB = datetime(2024, 2, 1)
+
+
+class FakeSnowflake:
+    """Pool whose cursors answer catalog queries from in-memory rows."""
+
+    def __init__(self):
+        self.databases = [('ANALYTICS',), ('RAW',)]
+        self.schemata = [('PUBLIC', 'SYSADMIN', JAN, None), ('my schema', 'SYSADMIN', JAN, None)]
+        self.tables = [
+            ('PUBLIC', 'ORDERS', 'BASE TABLE', 10, 1024, JAN, None),
+            ('PUBLIC', 'CUSTOMERS', 'BASE TABLE', 5, 512, JAN, None),
+            ('my schema', 'events', 'VIEW', None, None, JAN, None),
+        ]
+        self.columns = [
+            ('PUBLIC', 'ORDERS', 'CUSTOMER_ID', 2, 'NUMBER', 'NO', None, None, 38, 0, None),
+            ('PUBLIC', 'ORDERS', 'ID', 1, 'NUMBER', 'NO', None, None, 38, 0, None),
+            ('PUBLIC', 'CUSTOMERS', 'CUSTOMER_ID', 1, 'NUMBER', 'NO', None, None, 38, 0, None),
+            ('PUBLIC', 'CUSTOMERS', 'NAME', 2, 'TEXT', 'YES', None, 100, None, None, None),
+            ('my schema', 'events', 'payload', 1, 'VARIANT', 'YES', None, None, None, None, None),
+        ]
+        self.statements = []
+        self.pool = MagicMock()
+        cursor = self.pool.connection.return_value.__enter__.return_value.connection.connect.return_value.cursor.return_value
+        cursor.execute.side_effect = self._execute
+        cursor.fetchall.side_effect = lambda: self._rows
+        self.cursor = cursor
+
+    def _execute(self, sql, params=None):
+        self.statements.append((sql, params))
+        self.cursor.description = [('x',)]
+        if sql.startswith("SHOW DATABASES"):
+            self.cursor.description = [('created_on',), ('name',)]
+            self._rows = [(JAN, name) for (name,) in self.databases]
+        elif "SCHEMATA" in sql:
+            self._rows = list(self.schemata)
+        elif "INFORMATION_SCHEMA.TABLES" in sql:
+            self._rows = list(self.tables)
+        elif params:
+            wanted = set(zip(params[::2], params[1::2]))
+            self._rows = [row for row in self.columns if (row[0], row[1]) in wanted]
+        else:
+            self._rows = list(self.columns)
+
+
+def in_memory(catalog, lookup=None) -> bool:
+    """Whether a lookup (default: tables of the session's database) needs no query."""
+    try:
+        catalog.cached(lookup or catalog.tables)
+    except NotLoaded:
+        return False
+    return True
+
+
+@pytest.fixture
+def snowflake():
+    return FakeSnowflake()
+
+
+@pytest.fixture
+def state_manager():
+    return StateManager(initial_state=SessionState(database="ANALYTICS", schema="PUBLIC", role="ANALYST"))
+
+
+@pytest.fixture
+def catalog(snowflake, state_manager):
+    return MetadataCatalog(snowflake.pool, state_manager)
+
+
+class TestLoading:
+    """Test bulk loading and in-memory lookups."""
+
+    def test_database_loads_in_three_queries(self, catalog, snowflake):
+        """Test that schemata, tables and columns are read once, then served from memory."""
+        assert not in_memory(catalog)
+
+        catalog.tables()
+        catalog.table("orders")
+        catalog.schemas("analytics")
+
+        assert len(snowflake.statements) == 3
+        assert snowflake.statements[0][0].startswith("SELECT SCHEMA_NAME")
+        assert "FROM ANALYTICS.INFORMATION_SCHEMA.TABLES" in snowflake.statements[1][0]
+        assert in_memory(catalog)
+
+    def test_table_lookup_resolves_names_like_snowflake(self, catalog):
+        """Test that unquoted names fold to uppercase and quoted names are exact."""
+        table = catalog.table("analytics.public.orders")
+
+        assert table['kind'] == 'BASE TABLE'
+        assert [c['name'] for c in table['columns']] == ['ID', 'CUSTOMER_ID']
+        assert table['columns'][0]['precision'] == 38
+        assert catalog.table('"my schema"."events"')['kind'] == 'VIEW'
+
+    def test_unknown_table_raises_lookup_error(self, catalog):
+        """Test that a missing table is reported, not answered with nothing."""
+        with pytest.raises(LookupError, match="Table not found"):
+            catalog.table("missing")
+
+    def test_tables_filtered_like_show_tables(self, catalog):
+        """Test that the like pattern matches case-insensitively."""
+        names = [t['name'] for t in catalog.tables(schema="public", like="cust%")]
+        assert names == ['CUSTOMERS']
+
+    def test_find_columns_uses_index(self, catalog):
+        """Test that every table with a column of that name is found."""
+        found = catalog.find_columns("customer_id")
+        assert sorted(f['table'] for f in found) == ['CUSTOMERS', 'ORDERS']
+
+    def test_databases_come_from_show_databases(self, catalog, snowflake):
+        """Test that the database list is read once by column name."""
+        assert [d['name'] for d in catalog.databases()] == ['ANALYTICS', 'RAW']
+        catalog.databases()
+        assert len(snowflake.statements) == 1
+        assert in_memory(catalog, catalog.databases)
+
+
+class TestRefresh:
+    """Test incremental refresh and invalidation."""
+
+    def test_refresh_rereads_only_changed_tables(self, catalog, snowflake):
+        """Test that columns are re-read only for tables with a new LAST_ALTERED."""
+        catalog.tables()
+        snowflake.tables[0] = ('PUBLIC', 'ORDERS', 'BASE TABLE', 11, 1024, FEB, None)
+        del snowflake.tables[1]
+        snowflake.columns.append(('PUBLIC', 'ORDERS', 'TOTAL', 3, 'NUMBER', 'YES', None, None, 10, 2, None))
+        snowflake.statements.clear()
+
+        catalog.refresh()
+
+        column_queries = [s for s in snowflake.statements if "COLUMNS" in s[0]]
+        assert column_queries[0][1] == ['PUBLIC', 'ORDERS']
+        assert [c['name'] for c in catalog.table("orders")['columns']] == ['ID', 'CUSTOMER_ID', 'TOTAL']
+        assert catalog.find_columns("name") == []
+
+    def test_refresh_loads_session_database_first_time(self, catalog):
+        """Test that the first refresh loads the session's database."""
+        catalog.refresh()
+        assert in_memory(catalog)
+        assert catalog.stats()['databases'] == 2
+
+    def test_idle_databases_are_not_refreshed(self, catalog, snowflake):
+        """Test that a cycle with no lookups runs no query and marks the database stale."""
+        catalog.refresh()
+        snowflake.statements.clear()
+
+        catalog.refresh()
+
+        assert snowflake.statements == []
+        assert not in_memory(catalog)
+        assert not in_memory(catalog, catalog.databases)
+
+    def test_looked_up_databases_are_refreshed(self, catalog, snowflake):
+        """Test that a database used since the last cycle is refreshed in the background."""
+        catalog.refresh()
+        catalog.tables()
+        snowflake.statements.clear()
+
+        catalog.refresh()
+
+        assert any("INFORMATION_SCHEMA.TABLES" in sql for sql, _ in snowflake.statements)
+        assert not any(sql.startswith("SHOW DATABASES") for sql, _ in snowflake.statements)
+        assert in_memory(catalog)
+
+    def test_ddl_marks_database_stale(self, catalog, snowflake, state_manager):
+        """Test that DDL makes the next lookup refresh first."""
+        catalog.tables()
+        catalog.invalidate("CREATE TABLE t (x INT)", state_manager.get_state())
+
+        assert not in_memory(catalog)
+        snowflake.tables.append(('PUBLIC', 'T', 'BASE TABLE', 0, 0, FEB, None))
+        assert catalog.table("t")['name'] == 'T'
+        assert in_memory(catalog)
+
+    def test_database_ddl_drops_database_list(self, catalog, state_manager):
+        """Test that CREATE DATABASE makes the database list reload."""
+        catalog.databases()
+        catalog.invalidate("CREATE OR REPLACE DATABASE scratch", state_manager.get_state())
+        assert not in_memory(catalog, catalog.databases)
+
+    def test_role_change_empties_catalog(self, catalog, state_manager):
+        """Test that metadata read with another role is not served."""
+        catalog.tables()
+        state_manager.set_role("OTHER")
+
+        assert not in_memory(catalog)
+        catalog.tables()
+        assert catalog.stats()['role'] == "OTHER"
+
+
+class TestCached:
+    """Test lookups that must not block."""
+
+    def test_loaded_lookup_answers_from_memory(self, catalog):
+        """Test that a loaded database is answered without a query."""
+        catalog.tables()
+        assert catalog.cached(catalog.table, "orders")['name'] == 'ORDERS'
+
+    def test_lookup_needing_a_query_raises(self, catalog, snowflake):
+        """Test that NotLoaded is raised before any query runs."""
+        with pytest.raises(NotLoaded):
+            catalog.cached(catalog.tables)
+        with pytest.raises(NotLoaded):
+            catalog.cached(catalog.databases)
+        assert snowflake.statements == []
+
+    def test_stale_database_raises(self, catalog, state_manager):
+        """Test that DDL after loading makes the next cached lookup defer."""
+        catalog.tables()
+        catalog.invalidate("CREATE TABLE t (x INT)", state_manager.get_state())
+        with pytest.raises(NotLoaded):
+            catalog.cached(catalog.tables)
+
+
+class TestConfiguration:
+    """Test catalog configuration and helpers."""
+
+    def test_refresh_zero_disables_catalog(self, monkeypatch, snowflake, state_manager):
+        """Test that DAEMON_CATALOG_REFRESH=0 turns the catalog off."""
+        monkeypatch.setenv("DAEMON_CATALOG_REFRESH", "0")
+        assert MetadataCatalog.from_env(snowflake.pool, state_manager) is None
+
+    def test_like_pattern(self):
+        """Test % and _ wildcards and escaping of regex characters."""
+        assert like_pattern("a_c%").fullmatch("ABCdef")
+        assert not like_pattern("a.c").fullmatch("abc")
@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import Mock, patch, MagicMock
 from daemon.client import DaemonClient
@@ -231,6 +232,262 @@ class TestQuery:
         assert call_kwargs["timeout"] == 300.0
 
 
+class TestClientId:
+    """Test scheduler client identification."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_query_sends_client_id(self, mock_post, mock_start):
+        """Test that queries carry X-Client-Id for per-client limits."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True}
+        mock_post.return_value = mock_response
+
+        DaemonClient(client_id="notebook-1").query("SELECT 1")
+
+        assert mock_post.call_args.kwargs["headers"]["X-Client-Id"] == "notebook-1"
+
+    def test_requests_compressed_responses(self):
+        """Test that the client asks for a coding it can decode."""
+        with patch('daemon.compression.zstd_available', return_value=False):
+            assert DaemonClient().headers["Accept-Encoding"] == "gzip"
+        with patch('daemon.compression.zstd_available', return_value=True):
+            assert DaemonClient().headers["Accept-Encoding"] == "zstd, gzip"
+
+
+class TestPaging:
+    """Test paged queries."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_query_sends_page_size(self, mock_post, mock_start, client):
+        """Test that page_size is included in the query payload."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "query_id": "qid-1"}
+        mock_post.return_value = mock_response
+
+        client.query("SELECT * FROM t", page_size=50)
+
+        assert mock_post.call_args.kwargs["json"]["page_size"] == 50
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.get')
+    def test_fetch_page_converts_page_to_offset(self, mock_get, mock_start, client):
+        """Test that 1-based page numbers become offsets."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "data": []}
+        mock_get.return_value = mock_response
+
+        client.fetch_page("qid-1", page=3, page_size=50)
+
+        assert mock_get.call_args[0][0] == "http://127.0.0.1:8765/results/qid-1"
+        assert mock_get.call_args.kwargs["params"] == {"offset": 100, "size": 50}
+
+
+class TestBatch:
+    """Test multi-statement batches."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_batch_posts_statements(self, mock_post, mock_start, client):
+        """Test that batch() posts the statements and options."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "results": []}
+        mock_post.return_value = mock_response
+
+        client.batch(["SELECT 1", "SELECT 2"], stop_on_error=False)
+
+        assert mock_post.call_args[0][0] == "http://127.0.0.1:8765/batch"
+        payload = mock_post.call_args.kwargs["json"]
+        assert payload["statements"] == ["SELECT 1", "SELECT 2"]
+        assert payload["stop_on_error"] is False
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    def test_batch_reports_daemon_start_failure(self, mock_start, client):
+        """Test that batch() fails cleanly when the daemon cannot start."""
+        mock_start.return_value = False
+
+        result = client.batch(script="SELECT 1; SELECT 2")
+
+        assert result["success"] is False
+
+
+class TestInsertRows:
+    """Test bulk loading."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_insert_rows_sends_columnar_data(self, mock_post, mock_start, client):
+        """Test that a dict of columns is sent as columnar data."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "rows_loaded": 2}
+        mock_post.return_value = mock_response
+
+        client.insert_rows("t", {"a": [1, 2], "b": ["x", "y"]})
+
+        assert mock_post.call_args[0][0] == "http://127.0.0.1:8765/ingest"
+        payload = json.loads(mock_post.call_args.kwargs["content"])
+        assert payload["data"] == {"a": [1, 2], "b": ["x", "y"]}
+        assert "rows" not in payload
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_insert_rows_sends_rows_with_columns(self, mock_post, mock_start, client):
+        """Test that row lists are sent with their column names."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True}
+        mock_post.return_value = mock_response
+
+        client.insert_rows("t", [[1, "x"]], columns=["a", "b"])
+
+        payload = json.loads(mock_post.call_args.kwargs["content"])
+        assert payload["columns"] == ["a", "b"]
+        assert payload["rows"] == [[1, "x"]]
+
+
+class TestQueryMany:
+    """Test concurrent fan-out queries."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_query_many_orders_results_by_index(self, mock_stream, mock_start, client):
+        """Test that results come back in query order, not completion order."""
+        mock_start.return_value = True
+        mock_response = MagicMock()
+        mock_response.iter_lines.return_value = iter([
+            '{"index": 1, "success": true, "data": [[2]]}',
+            '{"index": 0, "success": true, "data": [[1]]}',
+        ])
+        mock_stream.return_value.__enter__.return_value = mock_response
+
+        results = client.query_many(["SELECT 1", "SELECT 2"])
+
+        assert [r["data"] for r in results] == [[[1]], [[2]]]
+        assert mock_stream.call_args[0][1] == "http://127.0.0.1:8765/fanout"
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_query_many_fills_missing_results(self, mock_stream, mock_start, client):
+        """Test that queries without a result are reported as failures."""
+        mock_start.return_value = True
+        mock_stream.side_effect = Exception("connection reset")
+
+        results = client.query_many(["SELECT 1"])
+
+        assert results == [{"index": 0, "success": False, "error": "connection reset"}]
+
+
+class TestQueryStream:
+    """Test streaming query results."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_query_stream_yields_messages(self, mock_stream, mock_start, client):
+        """Test that each NDJSON line is yielded as a dict."""
+        mock_start.return_value = True
+        mock_response = MagicMock()
+        mock_response.iter_lines.return_value = iter([
+            '{"type": "schema", "columns": ["id"]}',
+            '{"type": "rows", "data": [[1], [2]]}',
+            '',
+            '{"type": "end", "row_count": 2}',
+        ])
+        mock_stream.return_value.__enter__.return_value = mock_response
+
+        messages = list(client.query_stream("SELECT id FROM t", limit=10))
+
+        assert [m["type"] for m in messages] == ["schema", "rows", "end"]
+        assert messages[1]["data"] == [[1], [2]]
+        assert mock_stream.call_args.kwargs["json"]["limit"] == 10
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    def test_query_stream_reports_daemon_start_failure(self, mock_start, client):
+        """Test that a daemon that will not start yields an error message."""
+        mock_start.return_value = False
+
+        messages = list(client.query_stream("SELECT 1"))
+
+        assert messages == [{"type": "error", "error": "Failed to start daemon"}]
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_query_stream_handles_timeout(self, mock_stream, mock_start, client):
+        """Test that a read timeout is reported as an error message."""
+        mock_start.return_value = True
+        mock_stream.side_effect = httpx.TimeoutException("Timeout")
+
+        messages = list(client.query_stream("SELECT 1"))
+
+        assert messages[-1]["type"] == "error"
+        assert "timeout" in messages[-1]["error"].lower()
+
+
+class TestJobs:
+    """Test asynchronous job methods."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_submit_posts_to_jobs(self, mock_post, mock_start, client):
+        """Test that submit posts the SQL to /jobs."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "query_id": "qid-1"}
+        mock_post.return_value = mock_response
+
+        result = client.submit("SELECT * FROM big_table")
+
+        assert result["query_id"] == "qid-1"
+        assert mock_post.call_args[0][0] == "http://127.0.0.1:8765/jobs"
+        assert mock_post.call_args.kwargs["json"]["sql"] == "SELECT * FROM big_table"
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.get')
+    def test_poll_gets_job_status(self, mock_get, mock_start, client):
+        """Test that poll requests /jobs/{query_id}."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "status": "RUNNING", "done": False}
+        mock_get.return_value = mock_response
+
+        result = client.poll("qid-1", limit=5)
+
+        assert result["status"] == "RUNNING"
+        assert mock_get.call_args[0][0] == "http://127.0.0.1:8765/jobs/qid-1"
+        assert mock_get.call_args.kwargs["params"] == {"limit": 5}
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.delete')
+    def test_cancel_deletes_job(self, mock_delete, mock_start, client):
+        """Test that cancel sends DELETE /jobs/{query_id}."""
+        mock_start.return_value = True
+        mock_response = Mock()
+        mock_response.json.return_value = {"success": True, "status": "ABORTING"}
+        mock_delete.return_value = mock_response
+
+        result = client.cancel("qid-1")
+
+        assert result["status"] == "ABORTING"
+        assert mock_delete.call_args[0][0] == "http://127.0.0.1:8765/jobs/qid-1"
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.post')
+    def test_submit_handles_exception(self, mock_post, mock_start, client):
+        """Test that submit handles exceptions gracefully."""
+        mock_start.return_value = True
+        mock_post.side_effect = Exception("Network error")
+
+        result = client.submit("SELECT 1")
+
+        assert result["success"] is False
+        assert "Network error" in result["error"]
+
+
 class TestCustomBaseUrl:
     """Test custom base URL."""
 
@@ -247,3 +504,62 @@ class TestCustomBaseUrl:
         client.is_running()
 
         mock_get.assert_called_once_with(f"{custom_url}/health", timeout=1.0)
+
+
+class TestRender:
+    """Test daemon-rendered output."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_yields_rendered_bytes(self, mock_stream, mock_start):
+        """Test that rendered output is passed through as bytes."""
+        mock_start.return_value = True
+        response = MagicMock()
+        response.headers = {"x-result-format": "table"}
+        response.iter_bytes.return_value = iter([b"| A |\n", b"| 1 |\n"])
+        mock_stream.return_value.__enter__.return_value = response
+
+        chunks = list(DaemonClient().render("SELECT 1 AS a"))
+
+        assert chunks == [b"| A |\n", b"| 1 |\n"]
+        assert mock_stream.call_args.kwargs["json"]["format"] == "table"
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.stream')
+    def test_failure_yields_error(self, mock_stream, mock_start):
+        """Test that a query failing before output yields one error dict."""
+        mock_start.return_value = True
+        response = MagicMock()
+        response.headers = {"content-type": "application/json"}
+        response.json.return_value = {"success": False, "error": "syntax error"}
+        mock_stream.return_value.__enter__.return_value = response
+
+        chunks = list(DaemonClient().render("SELEC 1"))
+
+        assert chunks == [{"success": False, "error": "syntax error"}]
+
+
+class TestCatalog:
+    """Test catalog lookups."""
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.get')
+    def test_describe_quotes_table_name(self, mock_get, mock_start):
+        """Test that qualified and quoted names survive the URL path."""
+        mock_start.return_value = True
+        mock_get.return_value.json.return_value = {"success": True, "data": {}}
+
+        DaemonClient().describe('db.s."my table"')
+
+        assert mock_get.call_args[0][0].endswith('/catalog/tables/db.s.%22my%20table%22')
+
+    @patch('daemon.client.DaemonClient.start_daemon')
+    @patch('httpx.get')
+    def test_tables_omits_unset_filters(self, mock_get, mock_start):
+        """Test that only given filters are sent."""
+        mock_start.return_value = True
+        mock_get.return_value.json.return_value = {"success": True, "data": []}
+
+        DaemonClient().tables(schema="PUBLIC")
+
+        assert mock_get.call_args.kwargs["params"] == {"schema": "PUBLIC"}
@@ -0,0 +1,82 @@
+from daemon import columnar
+from daemon.columnar import column_types, decode, encode, encode_column, to_rows
+from daemon.models import QueryResponse
+
+
+class TestColumnTypes:
+    """Test type metadata from cursor.description."""
+
+    def test_from_result_metadata(self):
+        """Test that connector metadata becomes named types with precision and scale."""
+        description = [
+            ('ID', 0, None, None, 38, 0, False),
+            ('NAME', 2, None, 16777216, None, None, True),
+            ('CREATED', 8, None, None, 0, 9, True),
+        ]
+
+        types = column_types(description)
+
+        assert types[0] == {'name': 'ID', 'type': 'FIXED', 'nullable': False, 'precision': 38, 'scale': 0}
+        assert types[1] == {'name': 'NAME', 'type': 'TEXT', 'nullable': True, 'length': 16777216}
+        assert types[2]['type'] == 'TIMESTAMP_NTZ'
+
+    def test_short_descriptions(self):
+        """Test that partial descriptions yield unknown types."""
+        assert column_types([('N',)]) == [{'name': 'N', 'type': None, 'nullable': None}]
+        assert column_types(None) == []
+
+
+class TestEncodeColumn:
+    """Test per-column encoding."""
+
+    def test_low_cardinality_text_uses_dictionary(self):
+        """Test that repeated strings are sent once with indices."""
+        entry = encode_column(['EMEA', 'AMER', 'EMEA', None, 'EMEA'], 'TEXT')
+
+        assert entry == {'dictionary': ['EMEA', 'AMER'], 'indices': [0, 1, 0, None, 0]}
+
+    def test_high_cardinality_text_stays_plain(self):
+        """Test that mostly distinct strings are not dictionary-encoded."""
+        values = ['a', 'b', 'c', 'a']
+
+        assert encode_column(values, 'TEXT') == {'values': values}
+
+    def test_non_text_stays_plain(self):
+        """Test that numbers are never dictionary-encoded."""
+        values = [1, 1, 1, 1]
+
+        assert encode_column(values, 'FIXED') == {'values': values}
+
+    def test_untyped_strings_detected(self):
+        """Test that string columns without type metadata are still encoded."""
+        assert 'dictionary' in encode_column(['x', 'x', 'x', 'y'])
+
+
+class TestRoundTrip:
+    """Test encoding a response and decoding it on the client."""
+
+    def test_encode_response(self):
+        """Test that data moves into columnar and decodes to the same rows."""
+        rows = [(1, 'SHIPPED'), (2, 'SHIPPED'), (3, 'PENDING'), (4, 'SHIPPED')]
+        response = QueryResponse(
+            success=True, data=rows, columns=['ID', 'STATUS'], row_count=4,
+            column_types=[{'name': 'ID', 'type': 'FIXED'}, {'name': 'STATUS', 'type': 'TEXT'}]
+        )
+
+        result = columnar.encode_response(response).model_dump()
+
+        assert result['data'] is None
+        assert result['columnar'][1]['dictionary'] == ['SHIPPED', 'PENDING']
+        assert decode(result) == {'ID': [1, 2, 3, 4], 'STATUS': ['SHIPPED', 'SHIPPED', 'PENDING', 'SHIPPED']}
+        assert to_rows(result) == [list(row) for row in rows]
+
+    def test_empty_result(self):
+        """Test that an empty result has one empty column per name."""
+        assert encode([], ['A', 'B']) == [{'values': []}, {'values': []}]
+
+    def test_row_major_response_decodes(self):
+        """Test that a spilled result, sent row-major, still decodes instead of coming back empty."""
+        result = {'columns': ['ID', 'STATUS'], 'data': [[1, 'A'], [2, 'B']], 'columnar': None}
+
+        assert decode(result) == {'ID': [1, 2], 'STATUS': ['A', 'B']}
+        assert to_rows(result) == [[1, 'A'], [2, 'B']]
@@ -0,0 +1,97 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import Response, StreamingResponse
+from fastapi.testclient import TestClient
+
+from daemon.compression import CompressionMiddleware, choose_encoding
+
+
+BIG = b'{"data": [' + b','.join(b'["ACTIVE", "EMEA", 42]' for _ in range(500)) + b']}'
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    def big():
+        return Response(BIG, media_type="application/json")
+
+    @app.get("/small")
+    def small():
+        return Response(b'{"ok": true}', media_type="application/json")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([b'{"a": 1}\n', b'{"a": 2}\n']), media_type="application/x-ndjson")
+
+    @app.get("/gzipped")
+    def gzipped():
+        return Response(gzip.compress(BIG), media_type="application/gzip")
+
+    return TestClient(app)
+
+
+class TestChooseEncoding:
+    """Test Accept-Encoding negotiation."""
+
+    def test_prefers_first_available_on_tie(self):
+        """Test that the server's preference order breaks ties."""
+        assert choose_encoding("gzip, zstd", ['zstd', 'gzip']) == 'zstd'
+
+    def test_highest_q_wins(self):
+        """Test that q-values override the server's preference."""
+        assert choose_encoding("zstd;q=0.5, gzip", ['zstd', 'gzip']) == 'gzip'
+
+    def test_unsupported_or_refused(self):
+        """Test that identity is used when nothing acceptable is available."""
+        assert choose_encoding("br", ['zstd', 'gzip']) is None
+        assert choose_encoding("gzip;q=0", ['gzip']) is None
+        assert choose_encoding("", ['gzip']) is None
+
+    def test_wildcard(self):
+        """Test that * accepts any coding."""
+        assert choose_encoding("*", ['gzip']) == 'gzip'
+
+
+class TestCompressionMiddleware:
+    """Test response compression."""
+
+    def test_large_body_compressed(self, client):
+        """Test that bodies over the threshold are gzip-encoded and decode back."""
+        response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert int(response.headers["content-length"]) < len(BIG)
+        assert response.content == BIG
+
+    def test_small_body_not_compressed(self, client):
+        """Test that bodies under the threshold go out as-is."""
+        response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == b'{"ok": true}'
+
+    def test_identity_when_not_accepted(self, client):
+        """Test that clients that do not ask for compression do not get it."""
+        response = client.get("/big", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in response.headers
+        assert response.content == BIG
+
+    def test_streamed_body_compressed(self, client):
+        """Test that streamed bodies are compressed chunk by chunk."""
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert "content-length" not in response.headers
+        assert response.text == '{"a": 1}\n{"a": 2}\n'
+
+    def test_compressed_types_passed_through(self, client):
+        """Test that already-compressed content is not compressed again."""
+        response = client.get("/gzipped", headers={"Accept-Encoding": "gzip"})
+
+        assert "content-encoding" not in response.headers
@@ -1,6 +1,7 @@
 import pytest
 from unittest.mock import Mock, patch
 from daemon.connection import SnowflakeConnection
+from daemon.state import SessionState
 
 
 @pytest.fixture
@@ -52,6 +53,59 @@ def test_connection_validation_fails_with_partial_credentials(monkeypatch):
         SnowflakeConnection()
 
 
+@patch('snowflake.connector.connect')
+def test_connect_uses_server_side_binding(mock_connect, mock_env):
+    """Test that connections bind parameters server-side (qmark)."""
+    SnowflakeConnection().connect()
+
+    assert mock_connect.call_args.kwargs['paramstyle'] == 'qmark'
+
+
+@patch('snowflake.connector.connect')
+def test_restored_state_is_sent_at_login(mock_connect, mock_env, monkeypatch):
+    """Test that a saved state overrides env defaults with exact names."""
+    monkeypatch.setenv('SNOWFLAKE_DATABASE', 'env_db')
+    monkeypatch.setenv('SNOWFLAKE_WAREHOUSE', 'env_wh')
+
+    conn = SnowflakeConnection(SessionState(database="my_db", role="ANALYST"))
+    conn.connect()
+
+    kwargs = mock_connect.call_args.kwargs
+    assert conn.database == "my_db"
+    assert kwargs['database'] == '"my_db"'
+    assert kwargs['role'] == 'ANALYST'
+    assert kwargs['warehouse'] == 'env_wh'
+
+
+@patch('snowflake.connector.connect')
+def test_rejected_state_falls_back_to_defaults(mock_connect, mock_env, monkeypatch):
+    """Test that a login refused in the restored context retries with env defaults."""
+    monkeypatch.setenv('SNOWFLAKE_ROLE', 'PUBLIC')
+    rejected = Mock()
+    mock_connect.side_effect = [Exception("Role 'GONE' does not exist or not authorized"), Mock()]
+
+    conn = SnowflakeConnection(SessionState(role="GONE"), on_state_rejected=rejected)
+    conn.connect()
+
+    assert mock_connect.call_args.kwargs['role'] == 'PUBLIC'
+    assert conn.role == 'PUBLIC'
+    rejected.assert_called_once()
+
+
+@patch('snowflake.connector.connect')
+def test_state_kept_when_defaults_also_fail(mock_connect, mock_env):
+    """Test that a failure unrelated to the state does not discard it."""
+    rejected = Mock()
+    mock_connect.side_effect = Exception("Network unreachable")
+
+    conn = SnowflakeConnection(SessionState(role="ANALYST"), on_state_rejected=rejected)
+    with pytest.raises(Exception, match="Network unreachable"):
+        conn.connect()
+
+    assert conn.role == 'ANALYST'
+    rejected.assert_not_called()
+
+
 @patch('snowflake.connector.connect')
 def test_connect_creates_connection(mock_connect, mock_env):
     """Test that connect() creates a new Snowflake connection."""
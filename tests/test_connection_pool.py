@@ -0,0 +1,277 @@
+import threading
+import pytest
+from unittest.mock import DEFAULT, Mock
+from daemon.connection import SnowflakeConnection
+from daemon.connection_pool import (
+    SnowflakeConnectionPool,
+    PooledConnection,
+    PoolExhaustedError
+)
+from daemon.state import SessionState
+
+
+def make_connection():
+    """Create a mock SnowflakeConnection with no default context."""
+    conn = Mock(spec=SnowflakeConnection)
+    conn.database = None
+    conn.schema = None
+    conn.warehouse = None
+    conn.role = None
+    conn.is_open.return_value = False
+
+    def connect():
+        conn.is_open.return_value = True
+        return DEFAULT
+
+    conn.connect.side_effect = connect
+    return conn
+
+
+@pytest.fixture
+def factory():
+    """Connection factory that records every connection it creates."""
+    created = []
+
+    def _factory():
+        conn = make_connection()
+        created.append(conn)
+        return conn
+
+    _factory.created = created
+    return _factory
+
+
+class TestPoolSizing:
+    """Test pool creation and sizing."""
+
+    def test_pool_builds_min_size_members(self, factory):
+        """Test that min_size members are created up front."""
+        pool = SnowflakeConnectionPool(min_size=2, max_size=4, connection_factory=factory)
+        assert pool.size == 2
+        assert len(factory.created) == 2
+
+    def test_pool_does_not_connect_on_creation(self, factory):
+        """Test that members are not connected until warm-up or checkout."""
+        SnowflakeConnectionPool(min_size=2, max_size=4, connection_factory=factory)
+        for conn in factory.created:
+            conn.connect.assert_not_called()
+
+    def test_pool_rejects_invalid_sizes(self, factory):
+        """Test that min_size greater than max_size is rejected."""
+        with pytest.raises(ValueError, match="Invalid pool size"):
+            SnowflakeConnectionPool(min_size=3, max_size=2, connection_factory=factory)
+
+    def test_pool_propagates_missing_credentials(self):
+        """Test that configuration errors surface when the pool is created."""
+        def failing_factory():
+            raise ValueError("Missing required env vars: SNOWFLAKE_PAT")
+
+        with pytest.raises(ValueError, match="Missing required env vars"):
+            SnowflakeConnectionPool(min_size=1, connection_factory=failing_factory)
+
+    def test_from_env_reads_pool_settings(self, factory, monkeypatch):
+        """Test that from_env reads DAEMON_POOL_* variables."""
+        monkeypatch.setenv('DAEMON_POOL_MIN_SIZE', '2')
+        monkeypatch.setenv('DAEMON_POOL_MAX_SIZE', '7')
+        monkeypatch.setenv('DAEMON_POOL_MAX_USES', '50')
+
+        pool = SnowflakeConnectionPool.from_env(connection_factory=factory)
+
+        assert pool.min_size == 2
+        assert pool.max_size == 7
+        assert pool.max_uses == 50
+
+
+class TestWarmUp:
+    """Test parallel warm-up of pool members."""
+
+    def test_warm_up_connects_all_idle_members(self, factory):
+        """Test that warm_up opens every idle member."""
+        pool = SnowflakeConnectionPool(min_size=3, max_size=5, connection_factory=factory)
+        pool.warm_up()
+
+        for conn in factory.created:
+            conn.connect.assert_called_once()
+
+    def test_warm_up_tolerates_connection_failures(self, factory):
+        """Test that a failing member does not abort warm-up."""
+        pool = SnowflakeConnectionPool(min_size=2, max_size=5, connection_factory=factory)
+        factory.created[0].connect.side_effect = Exception("Network down")
+
+        pool.warm_up()
+
+        factory.created[1].connect.assert_called_once()
+
+
+class TestCheckout:
+    """Test checkout and checkin."""
+
+    def test_checkout_marks_member_in_use(self, factory):
+        """Test that checked out members are counted as in use."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=2, connection_factory=factory)
+
+        member = pool.checkout()
+        assert pool.in_use == 1
+
+        pool.checkin(member)
+        assert pool.in_use == 0
+
+    def test_checkout_reuses_idle_member(self, factory):
+        """Test that a returned member is reused instead of opening a new one."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=3, connection_factory=factory)
+
+        first = pool.checkout()
+        pool.checkin(first)
+        second = pool.checkout()
+
+        assert first is second
+        assert len(factory.created) == 1
+
+    def test_checkout_grows_pool_up_to_max(self, factory):
+        """Test that concurrent checkouts open new members up to max_size."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=3, connection_factory=factory)
+
+        members = [pool.checkout() for _ in range(3)]
+
+        assert len({id(m) for m in members}) == 3
+        assert pool.size == 3
+
+    def test_checkout_times_out_when_exhausted(self, factory):
+        """Test that checkout raises when no member frees up in time."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        pool.checkout()
+
+        with pytest.raises(PoolExhaustedError):
+            pool.checkout(timeout=0.05)
+
+    def test_checkout_waits_for_checkin(self, factory):
+        """Test that a blocked checkout is served when a member is returned."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        member = pool.checkout()
+
+        timer = threading.Timer(0.05, pool.checkin, args=[member])
+        timer.start()
+        second = pool.checkout(timeout=2.0)
+        timer.join()
+
+        assert second is member
+
+    def test_connection_context_manager_returns_member(self, factory):
+        """Test that the connection() context manager checks the member back in."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+
+        with pool.connection() as member:
+            assert pool.in_use == 1
+            assert isinstance(member, PooledConnection)
+
+        assert pool.in_use == 0
+
+    def test_failed_connect_returns_member_to_pool(self, factory):
+        """Test that a member whose connect fails does not leak."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        factory.created[0].connect.side_effect = Exception("Connection failed")
+
+        with pytest.raises(Exception, match="Connection failed"):
+            pool.checkout()
+
+        assert pool.in_use == 0
+
+
+class TestStateReplay:
+    """Test replay of session state onto checked out connections."""
+
+    def test_checkout_replays_state_with_use_statements(self, factory):
+        """Test that state differing from the session is applied with USE."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        cursor = factory.created[0].connect.return_value.cursor.return_value
+
+        pool.checkout(SessionState(database="MY_DB", role="ANALYST"))
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert statements == ["USE ROLE ANALYST", "USE DATABASE MY_DB"]
+
+    def test_replay_quotes_case_sensitive_names(self, factory):
+        """Test that names are replayed exactly as the server reported them."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        cursor = factory.created[0].connect.return_value.cursor.return_value
+
+        pool.checkout(SessionState(schema="my schema"))
+
+        cursor.execute.assert_called_once_with('USE SCHEMA "my schema"')
+
+    def test_checkout_skips_replay_when_state_matches(self, factory):
+        """Test that no statements run when the session already has the state."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=factory)
+        cursor = factory.created[0].connect.return_value.cursor.return_value
+        state = SessionState(database="MY_DB")
+
+        member = pool.checkout(state)
+        pool.checkin(member)
+        cursor.execute.reset_mock()
+        pool.checkout(state)
+
+        cursor.execute.assert_not_called()
+
+    def test_fallback_login_resets_session_state(self):
+        """Test that a member whose login fell back to the defaults replays state it lacks."""
+        conn = make_connection()
+        conn.role, conn.database = "GONE", "MY_DB"
+
+        def fallback():
+            # Login refused the restored context and used the env defaults
+            conn.role, conn.database = "PUBLIC", "ENV_DB"
+            conn.is_open.return_value = True
+            return DEFAULT
+
+        conn.connect.side_effect = fallback
+        pool = SnowflakeConnectionPool(min_size=0, max_size=1, connection_factory=lambda: conn)
+        cursor = conn.connect.return_value.cursor.return_value
+
+        member = pool.checkout(SessionState(database="MY_DB"))
+
+        cursor.execute.assert_called_once_with("USE DATABASE MY_DB")
+        assert (member.session_state.role, member.session_state.database) == ("PUBLIC", "MY_DB")
+
+    def test_reconnect_resets_session_state(self):
+        """Test that a forced reconnect forgets previously applied state."""
+        member = PooledConnection(make_connection())
+        member.session_state.database = "MY_DB"
+
+        member.reconnect()
+
+        assert member.session_state.database is None
+        member.connection.force_reconnect.assert_called_once()
+
+
+class TestRecycling:
+    """Test max-age and max-uses recycling."""
+
+    def test_member_retired_after_max_uses(self, factory):
+        """Test that a member is closed once it reaches max_uses."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, max_uses=2, connection_factory=factory)
+
+        for _ in range(2):
+            pool.checkin(pool.checkout())
+
+        factory.created[0].close.assert_called_once()
+        member = pool.checkout()
+        assert member.connection is factory.created[1]
+
+    def test_member_retired_after_max_age(self, factory):
+        """Test that an idle member older than max_age is replaced at checkout."""
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, max_age=60, connection_factory=factory)
+        pool._idle[0].created_at -= 120
+
+        member = pool.checkout()
+
+        factory.created[0].close.assert_called_once()
+        assert member.connection is factory.created[1]
+
+    def test_close_closes_idle_members(self, factory):
+        """Test that close() shuts every idle member."""
+        pool = SnowflakeConnectionPool(min_size=2, max_size=2, connection_factory=factory)
+        pool.close()
+
+        for conn in factory.created:
+            conn.close.assert_called_once()
+        assert pool.size == 0
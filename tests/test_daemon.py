@@ -1,3 +1,4 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from daemon.server import app
@@ -20,3 +21,182 @@ def test_query_endpoint_exists(client):
     response = client.post("/query", json={"sql": "SELECT 1"})
     assert response.status_code == 200
     # Will fail with "Not implemented yet" - that's expected
+
+
+def test_spilled_json_matches_normal_response(tmp_path):
+    """A spilled response streams the same JSON body as an in-memory one."""
+    import json
+    from daemon.models import QueryResponse
+    from daemon.server import spilled_json
+    from daemon.spill import RowSpill
+
+    spill = RowSpill(['n', 's'], str(tmp_path))
+    spill.append([(1, 'a'), (2, 'b')])
+    spill.append([(3, 'c')])
+    spill.finish()
+    response = QueryResponse(success=True, columns=['n', 's'], row_count=3, spill=spill)
+
+    body = json.loads(b''.join(spilled_json(response)))
+
+    assert body['data'] == [[1, 'a'], [2, 'b'], [3, 'c']]
+    assert body['row_count'] == 3
+    assert body['success'] is True
+    assert spill._mmap is None
+    assert not os.path.exists(spill.path)
+
+
+def test_spill_closed_when_client_leaves(tmp_path):
+    """A spill is closed if the client goes away mid-body or before it starts."""
+    from daemon.models import QueryResponse
+    from daemon.server import close_spilled, spilled_json
+    from daemon.spill import RowSpill
+
+    for chunks_read in (0, 1):
+        spill = RowSpill(['n'], str(tmp_path))
+        spill.append([(1,)])
+        spill.finish()
+        response = QueryResponse(success=True, columns=['n'], row_count=1, spill=spill)
+        body = spilled_json(response)
+        for _ in range(chunks_read):
+            next(body)
+
+        close_spilled(body, response)
+
+        assert spill._mmap is None
+
+
+def test_shared_spill_closed_by_last_reader(tmp_path):
+    """A spill shared by deduplicated callers stays readable until the last one is done."""
+    import json
+    from daemon.models import QueryResponse
+    from daemon.server import spilled_json
+    from daemon.spill import RowSpill
+
+    spill = RowSpill(['n'], str(tmp_path))
+    spill.append([(1,)])
+    spill.finish()
+    spill.share().share()
+    response = QueryResponse(success=True, columns=['n'], row_count=1, spill=spill)
+
+    first = json.loads(b''.join(spilled_json(response)))
+    assert spill._mmap is not None
+    second = json.loads(b''.join(spilled_json(response)))
+
+    assert first['data'] == second['data'] == [[1]]
+    assert spill._mmap is None
+
+
+def test_spilled_result_rendered_in_requested_format(tmp_path):
+    """A spilled result asked for as a table or CSV is rendered, not sent as rows."""
+    import json
+    from daemon.models import QueryResponse
+    from daemon.server import query_body, spilled_json
+    from daemon.spill import RowSpill
+
+    rows = [(1, 'a "b"'), (2, 'c|d'), (3, 'ü\n')]
+    spill = RowSpill(['n', 's'], str(tmp_path))
+    spill.append(rows[:2])
+    spill.append(rows[2:])
+    spill.finish()
+    # One reference per read below
+    spill.share().share()
+    spilled = QueryResponse(success=True, columns=['n', 's'], row_count=3, spill=spill)
+    in_memory = QueryResponse(success=True, columns=['n', 's'], row_count=3, data=rows)
+
+    for format in ("table", "csv"):
+        body = json.loads(b''.join(spilled_json(spilled, format)))
+        expected = json.loads(query_body(in_memory, format))
+        assert body['data'] is None
+        assert body['formatted'] == expected['formatted']
+
+
+def test_query_body_formats():
+    """/query puts table/CSV text in formatted, and leaves json rows in data."""
+    import json
+    from daemon.models import QueryResponse
+    from daemon.server import query_body
+
+    response = QueryResponse(success=True, data=[(1, None)], columns=['A', 'B'], row_count=1)
+
+    as_csv = json.loads(query_body(response, "csv"))
+    as_json = json.loads(query_body(response, "json"))
+
+    assert as_csv['formatted'] == "A,B\n1,\n"
+    assert as_csv['data'] is None
+    assert as_json['data'] == [[1, None]]
+    assert as_json['formatted'] is None
+
+
+def test_catalog_reports_unavailable_without_connection(client):
+    response = client.get("/catalog/tables")
+    assert response.status_code == 200
+    assert response.json()["success"] is False
+
+
+def test_ingest_rejects_ragged_columnar_data(client):
+    response = client.post("/ingest", json={"table": "t", "data": {"a": [1, 2], "b": [1]}})
+    assert response.status_code == 400
+    assert "same length" in response.json()["error"]
+
+
+@pytest.mark.asyncio
+async def test_slot_released_when_client_leaves_before_body():
+    """A disconnect before the first body chunk still releases the slot."""
+    from contextlib import AsyncExitStack
+    from daemon.server import SlotStreamingResponse
+
+    released = []
+    started = []
+    slot = AsyncExitStack()
+    slot.callback(released.append, True)
+
+    async def body():
+        started.append(True)
+        yield b"never sent"
+
+    async def send(message):
+        raise OSError("client went away")
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    response = SlotStreamingResponse(body(), slot)
+    with pytest.raises(Exception):
+        await response({"type": "http", "asgi": {"spec_version": "2.4"}}, receive, send)
+
+    assert started == []
+    assert released == [True]
+
+
+def test_compression_off_by_default(client):
+    """Responses are not compressed unless DAEMON_COMPRESS is set."""
+    from daemon.compression import CompressionMiddleware
+
+    assert all(m.cls is not CompressionMiddleware for m in app.user_middleware)
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+
+def test_ndjson_line_encodes_like_query():
+    """Streamed rows keep binary and NUMBER values the way /query sends them."""
+    import json
+    from decimal import Decimal
+    from daemon.server import ndjson_line
+
+    line = ndjson_line({"type": "rows", "data": [(b'\x89PNG', Decimal("12345678901234567890.123"))]})
+
+    assert line.endswith(b"\n")
+    assert json.loads(line)["data"] == [["89504e47", "12345678901234567890.123"]]
+
+
+def test_fanout_result_line_keeps_values():
+    """A fan-out result with binary and NUMBER values encodes without loss."""
+    import json
+    from decimal import Decimal
+    from daemon.models import QueryResponse
+    from daemon.server import ndjson_line
+
+    response = QueryResponse(success=True, columns=['b', 'n'], data=[(b'\xff\x00', Decimal("0.10"))])
+    line = ndjson_line({'index': 0, **response.model_dump()})
+
+    assert json.loads(line)["data"] == [["ff00", "0.10"]]
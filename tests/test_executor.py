@@ -1,8 +1,18 @@
+import asyncio
+import threading
+import time
+from datetime import datetime, timedelta, timezone
 import pytest
 from daemon.executor import QueryExecutor
 from daemon.connection import SnowflakeConnection
+from daemon.connection_pool import SnowflakeConnectionPool
+from daemon.cache import ResultCache
+from daemon.validators import WriteValidator
+from daemon.state import SessionState, StateManager
 from daemon.models import QueryResponse
+from daemon.scheduler import BATCH, QueryScheduler
 from unittest.mock import Mock, patch
+from snowflake.connector.constants import QueryStatus
 
 
 @pytest.fixture
@@ -89,82 +99,86 @@ class TestQueryValidation:
 
 
 class TestLimitAddition:
-    """Test automatic LIMIT clause addition."""
+    """Test that limit bounds rows at fetch time, not by rewriting SQL."""
 
     @pytest.mark.asyncio
-    async def test_execute_adds_limit_to_select(self, mock_connection):
-        """Test that LIMIT is added to SELECT queries without one."""
+    async def test_execute_does_not_rewrite_sql(self, mock_connection):
+        """Test that the SQL is sent unchanged."""
         mock_cursor = Mock()
         mock_cursor.description = [('col1',)]
-        mock_cursor.fetchall.return_value = [(1,), (2,)]
+        mock_cursor.fetchmany.return_value = [(1,), (2,)]
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connection.connect.return_value = mock_conn
 
         executor = QueryExecutor(mock_connection)
-        response = await executor.execute("SELECT * FROM table", limit=10)
+        response = await executor.execute("SELECT * FROM table;", limit=10)
 
-        # Verify LIMIT was added
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert "LIMIT 10" in call_args
+        assert mock_cursor.execute.call_args[0][0] == "SELECT * FROM table;"
         assert response.success is True
 
     @pytest.mark.asyncio
-    async def test_execute_does_not_add_limit_if_exists(self, mock_connection):
-        """Test that LIMIT is not added if query already has one."""
+    async def test_execute_fetches_at_most_limit(self, mock_connection):
+        """Test that one probe row past the limit is fetched and dropped."""
         mock_cursor = Mock()
         mock_cursor.description = [('col1',)]
-        mock_cursor.fetchall.return_value = [(1,), (2,)]
+        mock_cursor.fetchmany.return_value = [(i,) for i in range(11)]
+        mock_cursor.rowcount = 5000
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connection.connect.return_value = mock_conn
 
         executor = QueryExecutor(mock_connection)
-        await executor.execute("SELECT * FROM table LIMIT 5", limit=10)
+        response = await executor.execute("SELECT * FROM table", limit=10)
 
-        # Verify original LIMIT is preserved
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert "LIMIT 5" in call_args
-        assert "LIMIT 10" not in call_args
+        mock_cursor.fetchmany.assert_called_once_with(11)
+        mock_cursor.fetchall.assert_not_called()
+        assert response.row_count == 10
+        assert response.truncated is True
+        assert response.total_rows == 5000
+        mock_cursor.close.assert_called_once()
 
     @pytest.mark.asyncio
-    async def test_execute_does_not_add_limit_to_show(self, mock_connection):
-        """Test that LIMIT is not added to SHOW queries."""
+    async def test_execute_reports_complete_result(self, mock_connection):
+        """Test that a result within the limit is not marked truncated."""
         mock_cursor = Mock()
-        mock_cursor.description = [('name',)]
-        mock_cursor.fetchall.return_value = [('table1',)]
+        mock_cursor.description = [('col1',)]
+        mock_cursor.fetchmany.return_value = [(1,), (2,)]
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connection.connect.return_value = mock_conn
 
         executor = QueryExecutor(mock_connection)
-        await executor.execute("SHOW TABLES", limit=10)
+        response = await executor.execute("SELECT * FROM table", limit=10)
 
-        # Verify LIMIT was NOT added
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert "LIMIT" not in call_args
+        assert response.truncated is False
+        assert response.total_rows == 2
 
     @pytest.mark.asyncio
-    async def test_execute_removes_trailing_semicolon_before_limit(self, mock_connection):
-        """Test that trailing semicolons are removed before adding LIMIT."""
+    @pytest.mark.parametrize("sql", [
+        "WITH cte AS (SELECT 1) SELECT * FROM cte",
+        "SHOW TABLES",
+        "SELECT rate_limit FROM quotas",
+    ])
+    async def test_execute_bounds_every_statement_type(self, mock_connection, sql):
+        """Test that CTEs, SHOW and LIMIT-like column names are all bounded."""
         mock_cursor = Mock()
-        mock_cursor.description = [('col1',)]
-        mock_cursor.fetchall.return_value = [(1,)]
+        mock_cursor.description = [('name',)]
+        mock_cursor.fetchmany.return_value = [('a',)] * 4
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
         mock_connection.connect.return_value = mock_conn
 
         executor = QueryExecutor(mock_connection)
-        await executor.execute("SELECT * FROM table;", limit=10)
+        response = await executor.execute(sql, limit=3)
 
-        # Verify semicolon removed and LIMIT added
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert call_args.endswith("LIMIT 10")
-        assert not call_args.endswith("; LIMIT 10")
+        mock_cursor.fetchmany.assert_called_once_with(4)
+        assert response.row_count == 3
+        assert response.truncated is True
 
 
 class TestQueryExecution:
@@ -175,7 +189,7 @@ class TestQueryExecution:
         """Test that successful query returns proper response."""
         mock_cursor = Mock()
         mock_cursor.description = [('id',), ('name',)]
-        mock_cursor.fetchall.return_value = [(1, 'Alice'), (2, 'Bob')]
+        mock_cursor.fetchmany.return_value = [(1, 'Alice'), (2, 'Bob')]
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -197,7 +211,7 @@ class TestQueryExecution:
         """Test that queries with no results are handled correctly."""
         mock_cursor = Mock()
         mock_cursor.description = [('id',)]
-        mock_cursor.fetchall.return_value = []
+        mock_cursor.fetchmany.return_value = []
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -215,7 +229,7 @@ class TestQueryExecution:
         """Test that queries without description (like SHOW) are handled."""
         mock_cursor = Mock()
         mock_cursor.description = None
-        mock_cursor.fetchall.return_value = []
+        mock_cursor.fetchmany.return_value = []
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -232,7 +246,7 @@ class TestQueryExecution:
         """Test that cursor is properly closed after execution."""
         mock_cursor = Mock()
         mock_cursor.description = [('id',)]
-        mock_cursor.fetchall.return_value = [(1,)]
+        mock_cursor.fetchmany.return_value = [(1,)]
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -296,7 +310,7 @@ class TestDefaultLimit:
         """Test that default limit of 100 is used when not specified."""
         mock_cursor = Mock()
         mock_cursor.description = [('id',)]
-        mock_cursor.fetchall.return_value = [(1,)]
+        mock_cursor.fetchmany.return_value = [(1,)]
 
         mock_conn = Mock()
         mock_conn.cursor.return_value = mock_cursor
@@ -305,9 +319,8 @@ class TestDefaultLimit:
         executor = QueryExecutor(mock_connection)
         await executor.execute("SELECT * FROM table")
 
-        # Verify default LIMIT 100 was added
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert "LIMIT 100" in call_args
+        # Default limit of 100, plus one probe row
+        mock_cursor.fetchmany.assert_called_once_with(101)
 
     @pytest.mark.asyncio
     async def test_execute_allows_none_limit(self, mock_connection):
@@ -323,6 +336,1429 @@ class TestDefaultLimit:
         executor = QueryExecutor(mock_connection)
         await executor.execute("SELECT * FROM table", limit=None)
 
-        # Verify NO LIMIT was added
-        call_args = mock_cursor.execute.call_args[0][0]
-        assert "LIMIT" not in call_args
+        # Verify every row was fetched
+        mock_cursor.fetchall.assert_called_once()
+        mock_cursor.fetchmany.assert_not_called()
+
+
+class TestPooledExecution:
+    """Test execution through a SnowflakeConnectionPool."""
+
+    @pytest.fixture
+    def pool_connection(self):
+        """Mock connection whose session starts with no context."""
+        conn = Mock(spec=SnowflakeConnection)
+        conn.database = None
+        conn.schema = None
+        conn.warehouse = None
+        conn.role = None
+        return conn
+
+    @pytest.mark.asyncio
+    async def test_execute_replays_state_on_checkout(self, pool_connection):
+        """Test that StateManager state is applied to the pooled connection."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        pool_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=lambda: pool_connection)
+        state_manager = StateManager()
+        state_manager.set_database("MY_DB")
+
+        executor = QueryExecutor(pool, state_manager)
+        response = await executor.execute("SELECT 1")
+
+        statements = [c[0][0] for c in mock_cursor.execute.call_args_list]
+        assert statements[0] == "USE DATABASE MY_DB"
+        assert response.success is True
+        assert pool.in_use == 0
+
+    @pytest.mark.asyncio
+    async def test_execute_returns_error_when_pool_exhausted(self, pool_connection):
+        """Test that pool exhaustion is reported as a failed query."""
+        pool = SnowflakeConnectionPool(
+            min_size=1, max_size=1, checkout_timeout=0.01,
+            connection_factory=lambda: pool_connection
+        )
+        pool.checkout()
+
+        executor = QueryExecutor(pool)
+        response = await executor.execute("SELECT 1")
+
+        assert response.success is False
+        assert "No Snowflake connection available" in response.error
+
+
+class TestWorkerPool:
+    """Test that connector calls run off the event loop."""
+
+    @pytest.mark.asyncio
+    async def test_execute_does_not_block_event_loop(self, mock_connection):
+        """Test that the loop keeps running while a query executes."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        mock_cursor.execute.side_effect = lambda sql: time.sleep(0.2)
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        response = await executor.execute("SELECT 1")
+        task.cancel()
+
+        assert response.success is True
+        assert ticks >= 5
+
+    @pytest.mark.asyncio
+    async def test_execute_reports_queue_time(self, mock_connection):
+        """Test that time spent waiting for a worker is reported separately."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        mock_cursor.execute.side_effect = lambda sql: time.sleep(0.1)
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection, max_workers=1)
+        first, second = await asyncio.gather(
+            executor.execute("SELECT 1"),
+            executor.execute("SELECT 2")
+        )
+
+        assert first.queue_time < 0.05
+        assert second.queue_time >= 0.09
+        assert second.execution_time >= 0.09
+
+    def test_max_workers_read_from_env(self, mock_connection, monkeypatch):
+        """Test that the worker pool size is configurable."""
+        monkeypatch.setenv('DAEMON_WORKER_THREADS', '3')
+        executor = QueryExecutor(mock_connection)
+        assert executor.max_workers == 3
+
+
+class TestJobs:
+    """Test asynchronous query jobs."""
+
+    @pytest.mark.asyncio
+    async def test_submit_returns_query_id(self, mock_connection):
+        """Test that submit uses execute_async and returns the query ID."""
+        mock_cursor = Mock()
+        mock_cursor.sfqid = "01b2-0000-abcd"
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        response = await executor.submit("SELECT * FROM big_table")
+
+        mock_cursor.execute_async.assert_called_once_with("SELECT * FROM big_table")
+        assert response.success is True
+        assert response.query_id == "01b2-0000-abcd"
+        assert response.done is False
+
+    @pytest.mark.asyncio
+    async def test_submit_validates_query(self, executor):
+        """Test that submit applies the configured validator."""
+        response = await executor.submit("DROP TABLE t")
+        assert response.success is False
+        assert "read-only" in response.error.lower()
+
+    @pytest.mark.asyncio
+    async def test_poll_reports_running_query(self, mock_connection):
+        """Test that poll reports status without results while running."""
+        conn = mock_connection.connect.return_value
+        conn.get_query_status.return_value = QueryStatus.RUNNING
+        conn.is_still_running.return_value = True
+
+        executor = QueryExecutor(mock_connection)
+        response = await executor.poll("qid-1")
+
+        assert response.status == "RUNNING"
+        assert response.done is False
+        assert response.result is None
+
+    @pytest.mark.asyncio
+    async def test_poll_returns_results_when_done(self, mock_connection):
+        """Test that poll fetches results from the query ID once finished."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,), (2,)]
+        conn = mock_connection.connect.return_value
+        conn.cursor.return_value = mock_cursor
+        conn.get_query_status.return_value = QueryStatus.SUCCESS
+        conn.is_still_running.return_value = False
+        conn.is_an_error.return_value = False
+
+        executor = QueryExecutor(mock_connection)
+        response = await executor.poll("qid-1", limit=10)
+
+        mock_cursor.get_results_from_sfqid.assert_called_once_with("qid-1")
+        mock_cursor.fetchmany.assert_called_once_with(11)
+        assert response.done is True
+        assert response.result.row_count == 2
+
+    @pytest.mark.asyncio
+    async def test_poll_reports_failed_query(self, mock_connection):
+        """Test that poll surfaces the error of a failed query."""
+        conn = mock_connection.connect.return_value
+        conn.get_query_status.return_value = QueryStatus.FAILED_WITH_ERROR
+        conn.is_still_running.return_value = False
+        conn.is_an_error.return_value = True
+        conn.get_query_status_throw_if_error.side_effect = Exception("Division by zero")
+
+        executor = QueryExecutor(mock_connection)
+        response = await executor.poll("qid-1")
+
+        assert response.success is False
+        assert response.done is True
+        assert "Division by zero" in response.error
+
+    @pytest.mark.asyncio
+    async def test_cancel_calls_system_cancel_query(self, mock_connection):
+        """Test that cancel issues SYSTEM$CANCEL_QUERY with the query ID bound."""
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = ("query [qid-1] terminated.",)
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        response = await executor.cancel("qid-1")
+
+        sql, params = mock_cursor.execute.call_args[0]
+        assert "SYSTEM$CANCEL_QUERY" in sql
+        assert params == ("qid-1",)
+        assert response.success is True
+        assert "terminated" in response.message
+
+
+class TestStreaming:
+    """Test incremental result streaming."""
+
+    @staticmethod
+    async def collect(executor, sql, **kwargs):
+        return [message async for message in executor.stream(sql, **kwargs)]
+
+    @pytest.fixture
+    def stream_cursor(self, mock_connection):
+        """Cursor returning five rows through fetchmany."""
+        rows = [(i,) for i in range(5)]
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.sfqid = "qid-1"
+
+        def fetchmany(size):
+            batch = rows[:size]
+            del rows[:size]
+            return batch
+
+        mock_cursor.fetchmany.side_effect = fetchmany
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_stream_yields_schema_rows_and_end(self, mock_connection, stream_cursor):
+        """Test the message sequence of a streamed query."""
+        executor = QueryExecutor(mock_connection)
+        messages = await self.collect(executor, "SELECT id FROM t", chunk_size=2)
+
+        assert messages[0] == {"type": "schema", "columns": ["id"], "query_id": "qid-1"}
+        assert [m["data"] for m in messages[1:-1]] == [[(0,), (1,)], [(2,), (3,)], [(4,)]]
+        assert messages[-1]["type"] == "end"
+        assert messages[-1]["row_count"] == 5
+
+    @pytest.mark.asyncio
+    async def test_stream_uses_fetchmany_not_fetchall(self, mock_connection, stream_cursor):
+        """Test that streaming never materializes the full result."""
+        executor = QueryExecutor(mock_connection)
+        await self.collect(executor, "SELECT id FROM t", chunk_size=2)
+
+        stream_cursor.fetchall.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stream_stops_at_limit(self, mock_connection, stream_cursor):
+        """Test that limit bounds the rows fetched."""
+        executor = QueryExecutor(mock_connection)
+        messages = await self.collect(executor, "SELECT id FROM t", chunk_size=2, limit=3)
+
+        fetched = [c[0][0] for c in stream_cursor.fetchmany.call_args_list]
+        assert fetched == [2, 1]
+        assert messages[-1]["row_count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_reports_errors(self, mock_connection, stream_cursor):
+        """Test that execution errors become an error message."""
+        stream_cursor.execute.side_effect = Exception("Invalid SQL syntax")
+        executor = QueryExecutor(mock_connection)
+
+        messages = await self.collect(executor, "SELECT nope")
+
+        assert messages[-1]["type"] == "error"
+        assert "Invalid SQL syntax" in messages[-1]["error"]
+
+    @pytest.mark.asyncio
+    async def test_stream_releases_connection_when_abandoned(self, stream_cursor):
+        """Test that closing the stream early closes the cursor and checks in."""
+        conn = Mock(spec=SnowflakeConnection)
+        conn.database = conn.schema = conn.warehouse = conn.role = None
+        conn.connect.return_value.cursor.return_value = stream_cursor
+        pool = SnowflakeConnectionPool(min_size=1, max_size=1, connection_factory=lambda: conn)
+        executor = QueryExecutor(pool)
+
+        stream = executor.stream("SELECT id FROM t", chunk_size=1)
+        await stream.__anext__()  # schema
+        await stream.__anext__()  # first batch
+        await stream.aclose()
+
+        stream_cursor.close.assert_called_once()
+        assert pool.in_use == 0
+
+
+class TestArrowResults:
+    """Test the Arrow IPC result path."""
+
+    @staticmethod
+    async def collect(executor, sql, **kwargs):
+        return [chunk async for chunk in executor.stream_arrow(sql, **kwargs)]
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_writes_ipc_stream(self, mock_connection):
+        """Test that fetch_arrow_batches output round-trips through IPC."""
+        pa = pytest.importorskip("pyarrow")
+        mock_cursor = Mock(_query_result_format='arrow')
+        mock_cursor.fetch_arrow_batches.return_value = iter([
+            pa.table({"id": [1, 2]}),
+            pa.table({"id": [3]}),
+        ])
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        chunks = await self.collect(executor, "SELECT id FROM t")
+
+        table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+        assert table.column("id").to_pylist() == [1, 2, 3]
+        mock_cursor.fetchall.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_applies_limit(self, mock_connection):
+        """Test that limit slices the Arrow batches."""
+        pa = pytest.importorskip("pyarrow")
+        mock_cursor = Mock(_query_result_format='arrow')
+        mock_cursor.fetch_arrow_batches.return_value = iter([
+            pa.table({"id": [1, 2]}),
+            pa.table({"id": [3, 4]}),
+        ])
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        chunks = await self.collect(executor, "SELECT id FROM t", limit=3)
+
+        table = pa.ipc.open_stream(b"".join(chunks)).read_all()
+        assert table.num_rows == 3
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_binds_params(self, mock_connection):
+        """Test that bind values reach the Arrow statement."""
+        pa = pytest.importorskip("pyarrow")
+        mock_cursor = Mock(_query_result_format='arrow')
+        mock_cursor.fetch_arrow_batches.return_value = iter([pa.table({"id": [7]})])
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        await self.collect(executor, "SELECT id FROM t WHERE id = ?", params=[7])
+
+        mock_cursor.execute.assert_called_once_with("SELECT id FROM t WHERE id = ?", [7])
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_applies_timeout(self, mock_connection):
+        """Test that timeout_seconds sets the statement timeout on the Arrow path."""
+        pa = pytest.importorskip("pyarrow")
+        mock_cursor = Mock(_query_result_format='arrow')
+        mock_cursor.fetch_arrow_batches.return_value = iter([pa.table({"id": [1]})])
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        await self.collect(executor, "SELECT id FROM t", timeout_seconds=5)
+
+        assert mock_cursor.execute.call_args.kwargs == {
+            '_statement_params': {'STATEMENT_TIMEOUT_IN_SECONDS': 5}
+        }
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_rejects_json_results(self, mock_connection):
+        """Test that a statement answered in JSON gets a clear error."""
+        pytest.importorskip("pyarrow")
+        mock_cursor = Mock(_query_result_format='json')
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        chunks = await self.collect(executor, "SHOW TABLES")
+
+        assert chunks == [{
+            "type": "error",
+            "error": "Arrow format not available for this statement; use the default json format"
+        }]
+        mock_cursor.fetch_arrow_batches.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_reports_query_error(self, mock_connection):
+        """Test that a failure before any data yields an error message."""
+        pytest.importorskip("pyarrow")
+        mock_cursor = Mock()
+        mock_cursor.execute.side_effect = Exception("Invalid SQL syntax")
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        chunks = await self.collect(executor, "SELECT nope")
+
+        assert chunks[0]["type"] == "error"
+        assert "Invalid SQL syntax" in chunks[0]["error"]
+
+    @pytest.mark.asyncio
+    async def test_stream_arrow_requires_pyarrow(self, mock_connection):
+        """Test that a missing pyarrow install is reported, not raised."""
+        executor = QueryExecutor(mock_connection)
+        with patch.dict('sys.modules', {'pyarrow': None}):
+            chunks = await self.collect(executor, "SELECT 1")
+
+        assert chunks == [{
+            "type": "error",
+            "error": "Arrow results require pyarrow: pip install 'snowflake-connector-python[pandas]'"
+        }]
+
+
+class TestResultCache:
+    """Test result caching in the executor."""
+
+    @pytest.fixture
+    def cached_executor(self, mock_connection):
+        """Executor with a result cache and a cursor returning one row."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        executor = QueryExecutor(mock_connection, validator=WriteValidator(), cache=ResultCache())
+        return executor, mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_served_from_cache(self, cached_executor):
+        """Test that an identical query does not reach Snowflake twice."""
+        executor, mock_cursor = cached_executor
+
+        first = await executor.execute("SELECT * FROM orders")
+        second = await executor.execute("select *  from ORDERS;")
+
+        assert mock_cursor.execute.call_count == 1
+        assert first.cached is False
+        assert second.cached is True
+        assert second.data == first.data
+
+    @pytest.mark.asyncio
+    async def test_state_change_misses_cache(self, cached_executor):
+        """Test that the session state is part of the cache key."""
+        executor, mock_cursor = cached_executor
+
+        await executor.execute("SELECT * FROM orders")
+        executor.state_manager.set_database("OTHER_DB")
+        await executor.execute("SELECT * FROM orders")
+
+        assert mock_cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_write_invalidates_referenced_results(self, cached_executor):
+        """Test that DML on a table drops cached reads of that table."""
+        executor, mock_cursor = cached_executor
+
+        await executor.execute("SELECT * FROM orders")
+        await executor.execute("INSERT INTO orders VALUES (2)")
+        response = await executor.execute("SELECT * FROM orders")
+
+        assert response.cached is False
+        assert mock_cursor.execute.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_submitted_write_invalidates_when_finished(self, cached_executor, mock_connection):
+        """Test that reads cached while a write job ran are dropped once it finishes."""
+        executor, mock_cursor = cached_executor
+        mock_cursor.sfqid = "qid-1"
+        conn = mock_connection.connect.return_value
+        conn.get_query_status.return_value = QueryStatus.SUCCESS
+        conn.is_still_running.return_value = False
+        conn.is_an_error.return_value = False
+
+        await executor.submit("INSERT INTO orders SELECT * FROM staging")
+        await executor.execute("SELECT * FROM orders")
+        await executor.poll("qid-1")
+        response = await executor.execute("SELECT * FROM orders")
+
+        assert response.cached is False
+        assert executor._pending_writes == {}
+
+    @pytest.mark.asyncio
+    async def test_cached_size_measured_on_worker(self, cached_executor):
+        """Test that the cache entry size comes from the worker, not a repr of the rows."""
+        executor, mock_cursor = cached_executor
+        mock_cursor.fetchmany.return_value = [('hello',), (None,)]
+
+        response = await executor.execute("SELECT * FROM orders")
+
+        assert response.data_bytes == 9
+        assert executor.cache._bytes == 9 + len('id')
+        assert 'data_bytes' not in response.model_dump()
+
+    @pytest.mark.asyncio
+    async def test_volatile_query_not_cached(self, cached_executor):
+        """Test that queries calling volatile functions always execute."""
+        executor, mock_cursor = cached_executor
+
+        await executor.execute("SELECT CURRENT_TIMESTAMP()")
+        await executor.execute("SELECT CURRENT_TIMESTAMP()")
+
+        assert mock_cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_freshness_check_rejects_altered_table(self, cached_executor):
+        """Test that a newer LAST_ALTERED forces re-execution."""
+        executor, mock_cursor = cached_executor
+        executor.cache.check_freshness = True
+        executor.state_manager.set_database("DB")
+
+        await executor.execute("SELECT * FROM orders")
+        mock_cursor.fetchone.return_value = (datetime.now(timezone.utc) + timedelta(hours=1),)
+        response = await executor.execute("SELECT * FROM orders")
+
+        assert response.cached is False
+        assert "LAST_ALTERED" in mock_cursor.execute.call_args_list[1][0][0]
+
+
+class TestPagination:
+    """Test paged results with result handles."""
+
+    @pytest.fixture
+    def paged_cursor(self, mock_connection):
+        """Cursor with ten rows, a query ID and a known row count."""
+        rows = [(i,) for i in range(10)]
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.sfqid = "qid-1"
+        mock_cursor.rowcount = 10
+
+        def fetchmany(size):
+            batch = rows[:size]
+            del rows[:size]
+            return batch
+
+        mock_cursor.fetchmany.side_effect = fetchmany
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_first_page_returns_handle(self, mock_connection, paged_cursor):
+        """Test that page_size returns the first page and a query ID."""
+        executor = QueryExecutor(mock_connection)
+        response = await executor.execute("SELECT * FROM t", page_size=4)
+
+        assert response.data == [(0,), (1,), (2,), (3,)]
+        assert response.query_id == "qid-1"
+        assert response.has_more is True
+        assert response.total_rows == 10
+        # No LIMIT injected; paging needs the whole result
+        assert "LIMIT" not in paged_cursor.execute.call_args[0][0]
+
+    @pytest.mark.asyncio
+    async def test_next_page_served_without_reexecution(self, mock_connection, paged_cursor):
+        """Test that later pages come from the kept cursor or prefetch."""
+        executor = QueryExecutor(mock_connection)
+        await executor.execute("SELECT * FROM t", page_size=4)
+
+        page = await executor.fetch_page("qid-1", offset=4, size=4)
+
+        assert page.data == [(4,), (5,), (6,), (7,)]
+        assert page.offset == 4
+        assert paged_cursor.execute.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_last_page_has_no_more(self, mock_connection, paged_cursor):
+        """Test that the final page reports has_more=False."""
+        executor = QueryExecutor(mock_connection)
+        await executor.execute("SELECT * FROM t", page_size=4)
+
+        page = await executor.fetch_page("qid-1", offset=8, size=4)
+
+        assert page.data == [(8,), (9,)]
+        assert page.has_more is False
+
+    @pytest.mark.asyncio
+    async def test_unknown_handle_uses_result_scan(self, mock_connection):
+        """Test that pages of an unknown query ID come from RESULT_SCAN."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchall.return_value = [(20,), (21,)]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+
+        executor = QueryExecutor(mock_connection)
+        page = await executor.fetch_page("qid-9", offset=20, size=2)
+
+        sql, params = mock_cursor.execute.call_args_list[0][0]
+        assert "RESULT_SCAN(?)" in sql
+        assert sql.endswith("LIMIT 2 OFFSET 20")
+        assert params == ("qid-9",)
+        assert page.data == [(20,), (21,)]
+        assert page.columns == ['id']
+
+
+class TestBatch:
+    """Test multi-statement batches."""
+
+    @pytest.fixture
+    def batch_cursor(self, mock_connection):
+        """Cursor returning one row for every statement."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('x',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    def test_split_script_handles_semicolons_in_literals(self):
+        """Test that scripts split like the connector splits them."""
+        statements = QueryExecutor.split_script(
+            "USE DATABASE d; -- comment\nSELECT ';' AS x;\n\nSELECT 2"
+        )
+        assert statements == ["USE DATABASE d", "SELECT ';' AS x", "SELECT 2"]
+
+    @pytest.mark.asyncio
+    async def test_batch_runs_statements_in_order(self, mock_connection, batch_cursor):
+        """Test that every statement runs in order with its own timing."""
+        executor = QueryExecutor(mock_connection)
+        response = await executor.execute_batch(["SELECT 1", "SHOW TABLES"])
+
+        assert response.success is True
+        assert response.executed == 2
+        assert [r.index for r in response.results] == [0, 1]
+        assert [r.sql for r in response.results] == ["SELECT 1", "SHOW TABLES"]
+        assert all(r.execution_time is not None for r in response.results)
+        assert batch_cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_batch_applies_use_to_later_statements(self, mock_connection, batch_cursor):
+        """Test that USE in a batch changes the state for what follows."""
+        mock_connection.connect.return_value.database = "ANALYTICS"
+        state_manager = StateManager()
+        executor = QueryExecutor(mock_connection, state_manager=state_manager)
+
+        await executor.execute_batch(["USE DATABASE analytics", "SELECT 1"])
+
+        assert state_manager.get_state().database == "ANALYTICS"
+
+    @pytest.mark.asyncio
+    async def test_batch_stops_on_error(self, mock_connection, batch_cursor):
+        """Test that the first failure ends the batch by default."""
+        batch_cursor.execute.side_effect = [None, Exception("boom"), None]
+        executor = QueryExecutor(mock_connection)
+
+        response = await executor.execute_batch(["SELECT 1", "SELECT 2", "SELECT 3"])
+
+        assert response.success is False
+        assert response.executed == 2
+        assert response.failed == 1
+        assert response.results[1].success is False
+
+    @pytest.mark.asyncio
+    async def test_batch_continues_when_asked(self, mock_connection, batch_cursor):
+        """Test that stop_on_error=False runs every statement."""
+        batch_cursor.execute.side_effect = [None, Exception("boom"), None]
+        executor = QueryExecutor(mock_connection)
+
+        response = await executor.execute_batch(
+            ["SELECT 1", "SELECT 2", "SELECT 3"], stop_on_error=False
+        )
+
+        assert response.executed == 3
+        assert response.failed == 1
+        assert response.results[2].success is True
+
+    @pytest.mark.asyncio
+    async def test_batch_validates_before_running(self, mock_connection, batch_cursor):
+        """Test that a blocked statement stops the batch before anything runs."""
+        executor = QueryExecutor(mock_connection)
+
+        response = await executor.execute_batch(["SELECT 1", "DROP TABLE t"])
+
+        assert response.success is False
+        assert "Statement 2" in response.error
+        batch_cursor.execute.assert_not_called()
+
+
+class TestFanout:
+    """Test concurrent fan-out of independent queries."""
+
+    @pytest.mark.asyncio
+    async def test_results_arrive_in_completion_order(self, executor):
+        """Test that a fast query is not held back by a slow one."""
+        async def fake_execute(sql, limit=100):
+            await asyncio.sleep(0.05 if sql == "SLOW" else 0)
+            return QueryResponse(success=True, data=[(sql,)], columns=['q'])
+
+        with patch.object(executor, 'execute', side_effect=fake_execute):
+            results = [r async for r in executor.fanout(["SLOW", "FAST"])]
+
+        assert [r['index'] for r in results] == [1, 0]
+        assert results[0]['data'] == [("FAST",)]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_capped(self, executor):
+        """Test that no more than max_concurrency queries run at once."""
+        running = 0
+        peak = 0
+
+        async def fake_execute(sql, limit=100):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return QueryResponse(success=True)
+
+        with patch.object(executor, 'execute', side_effect=fake_execute):
+            results = [r async for r in executor.fanout(["SELECT 1"] * 6, max_concurrency=2)]
+
+        assert len(results) == 6
+        assert peak == 2
+
+    @pytest.mark.asyncio
+    async def test_runs_concurrently(self, executor):
+        """Test that total time is close to the slowest query, not the sum."""
+        async def fake_execute(sql, limit=100):
+            await asyncio.sleep(0.05)
+            return QueryResponse(success=True)
+
+        start = time.time()
+        with patch.object(executor, 'execute', side_effect=fake_execute):
+            results = [r async for r in executor.fanout(["SELECT 1"] * 4)]
+
+        assert len(results) == 4
+        assert time.time() - start < 0.15
+
+    @pytest.mark.asyncio
+    async def test_each_query_is_admitted(self, executor):
+        """Test that every query runs inside its own scheduler slot."""
+        scheduler = QueryScheduler(max_concurrent=1, per_client=1, max_queue=10)
+        running = 0
+        peak = 0
+
+        async def fake_execute(sql, limit=100):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return QueryResponse(success=True)
+
+        with patch.object(executor, 'execute', side_effect=fake_execute):
+            results = [r async for r in executor.fanout(
+                ["SELECT 1"] * 4, max_concurrency=4, admit=lambda: scheduler.slot("c", BATCH)
+            )]
+
+        assert len(results) == 4
+        assert peak == 1
+
+    @pytest.mark.asyncio
+    async def test_full_queue_fails_only_that_query(self, executor):
+        """Test that a rejected admission is reported for its index."""
+        scheduler = QueryScheduler(max_concurrent=1, per_client=1, max_queue=1)
+
+        async def fake_execute(sql, limit=100):
+            await asyncio.sleep(0.01)
+            return QueryResponse(success=True)
+
+        with patch.object(executor, 'execute', side_effect=fake_execute):
+            results = [r async for r in executor.fanout(
+                ["SELECT 1"] * 3, max_concurrency=3, admit=lambda: scheduler.slot("c", BATCH)
+            )]
+
+        assert sorted(r['success'] for r in results) == [False, True, True]
+        assert "queue is full" in next(r['error'] for r in results if not r['success'])
+
+    def test_cap_bounded_by_pool_size(self):
+        """Test that the cap never exceeds the pool's connections."""
+        pool = SnowflakeConnectionPool(min_size=0, max_size=3, connection_factory=Mock)
+        executor = QueryExecutor(pool, max_workers=8)
+
+        assert executor._fanout_cap(None) == 3
+        assert executor._fanout_cap(10) == 3
+        assert executor._fanout_cap(2) == 2
+
+
+class TestByteBudget:
+    """Test max_bytes enforcement while building responses."""
+
+    @pytest.fixture
+    def wide_cursor(self, mock_connection):
+        """Cursor with twenty rows of one 100-character cell each."""
+        rows = [("v" * 100,) for _ in range(20)]
+        mock_cursor = Mock()
+        mock_cursor.description = [('payload',)]
+        mock_cursor.rowcount = 20
+
+        def fetchmany(size):
+            batch = rows[:size]
+            del rows[:size]
+            return batch
+
+        mock_cursor.fetchmany.side_effect = fetchmany
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_stops_fetching_at_budget(self, mock_connection, wide_cursor):
+        """Test that rows stop once the budget is spent."""
+        executor = QueryExecutor(mock_connection, cache=None)
+        response = await executor.execute("SELECT payload FROM t", limit=None, max_bytes=450)
+
+        assert response.row_count == 4
+        assert response.truncated is True
+        assert response.total_rows == 20
+        assert response.bytes_omitted == 100
+
+    @pytest.mark.asyncio
+    async def test_cuts_oversized_cells(self, mock_connection, wide_cursor):
+        """Test that cells over the per-cell cap carry a truncation marker."""
+        executor = QueryExecutor(mock_connection)
+        response = await executor.execute("SELECT payload FROM t", limit=2, max_bytes=200)
+
+        assert response.row_count == 2
+        assert response.data[0][0].startswith("v" * 50)
+        assert "bytes truncated" in response.data[0][0]
+        assert response.truncated_cells == 2
+
+    @pytest.mark.asyncio
+    async def test_no_budget_reports_no_omissions(self, mock_connection, wide_cursor):
+        """Test that responses without max_bytes leave the fields unset."""
+        executor = QueryExecutor(mock_connection)
+        response = await executor.execute("SELECT payload FROM t", limit=5)
+
+        assert response.bytes_omitted is None
+        assert response.row_count == 5
+
+
+class TestBindParameters:
+    """Test server-side binding of query parameters."""
+
+    @pytest.fixture
+    def bind_cursor(self, mock_connection):
+        """Cursor returning one row."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('id',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_positional_params_passed_through(self, mock_connection, bind_cursor):
+        """Test that a list binds to ? placeholders unchanged."""
+        executor = QueryExecutor(mock_connection)
+        await executor.execute("SELECT * FROM t WHERE id = ?", params=[42])
+
+        bind_cursor.execute.assert_called_once_with("SELECT * FROM t WHERE id = ?", [42])
+
+    @pytest.mark.asyncio
+    async def test_named_params_rewritten_to_qmark(self, mock_connection, bind_cursor):
+        """Test that :name placeholders become ? with values in order."""
+        executor = QueryExecutor(mock_connection)
+        await executor.execute(
+            "SELECT * FROM t WHERE a = :a AND b = :b AND c = :a",
+            params={"b": 2, "a": 1}
+        )
+
+        bind_cursor.execute.assert_called_once_with(
+            "SELECT * FROM t WHERE a = ? AND b = ? AND c = ?", [1, 2, 1]
+        )
+
+    @pytest.mark.asyncio
+    async def test_repeated_statement_uses_statement_cache(self, mock_connection, bind_cursor):
+        """Test that a statement run in a loop is only rewritten once."""
+        executor = QueryExecutor(mock_connection)
+        for value in range(3):
+            await executor.execute("SELECT * FROM t WHERE id = :id", params={"id": value})
+
+        assert executor._member.statement_hits == 2
+
+    @pytest.mark.asyncio
+    async def test_params_are_part_of_cache_key(self, mock_connection, bind_cursor):
+        """Test that different bind values are not served each other's results."""
+        executor = QueryExecutor(mock_connection, cache=ResultCache())
+        await executor.execute("SELECT * FROM t WHERE id = ?", params=[1])
+        response = await executor.execute("SELECT * FROM t WHERE id = ?", params=[2])
+
+        assert response.cached is False
+        assert bind_cursor.execute.call_count == 2
+
+
+class TestIngest:
+    """Test bulk loading through the executor."""
+
+    @pytest.fixture
+    def ingest_cursor(self, mock_connection):
+        """Cursor for executemany and COPY INTO."""
+        mock_cursor = Mock()
+        mock_cursor.rowcount = 3
+        mock_cursor.description = [('file',), ('status',), ('rows_loaded',)]
+        mock_cursor.fetchall.return_value = [("rows.csv.gz", "LOADED", 3)]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.fixture
+    def writer(self, mock_connection):
+        """Executor that allows writes."""
+        return QueryExecutor(mock_connection, validator=WriteValidator())
+
+    @pytest.mark.asyncio
+    async def test_small_batch_uses_executemany(self, writer, ingest_cursor):
+        """Test that batches under bulk_rows are one array-bound INSERT."""
+        response = await writer.ingest("t", ["a"], [[1], [2], [3]])
+
+        assert response.success is True
+        assert response.method == "executemany"
+        assert response.rows_loaded == 3
+        assert response.rows_per_second is not None
+        ingest_cursor.executemany.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_large_batch_uses_staged_copy(self, writer, ingest_cursor):
+        """Test that large batches go through PUT + COPY INTO without pandas."""
+        writer.bulk_rows = 2
+        with patch('daemon.executor.importlib.util.find_spec', return_value=None):
+            response = await writer.ingest("t", ["a"], [[1], [2], [3]])
+
+        assert response.method == "copy"
+        assert response.rows_loaded == 3
+        assert response.copy_results[0]["status"] == "LOADED"
+        ingest_cursor.executemany.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_table_name(self, writer, ingest_cursor):
+        """Test that table names must be plain identifiers."""
+        response = await writer.ingest("t; DROP TABLE x", ["a"], [[1]])
+
+        assert response.success is False
+        assert "Invalid table name" in response.error
+
+    @pytest.mark.asyncio
+    async def test_read_only_validator_blocks_ingest(self, executor, ingest_cursor):
+        """Test that ingest is refused when writes are not allowed."""
+        response = await executor.ingest("t", ["a"], [[1]])
+
+        assert response.success is False
+        ingest_cursor.executemany.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_ingest_invalidates_cached_reads(self, mock_connection, ingest_cursor):
+        """Test that loading a table drops cached results that read it."""
+        cache = ResultCache()
+        writer = QueryExecutor(mock_connection, validator=WriteValidator(), cache=cache)
+        ingest_cursor.fetchmany.return_value = [(1,)]
+        await writer.execute("SELECT * FROM t")
+
+        await writer.ingest("t", ["a"], [[1]])
+
+        assert cache.stats()['entries'] == 0
+
+
+class TestExport:
+    """Test unloading results to local files."""
+
+    @pytest.fixture
+    def export_cursor(self, mock_connection):
+        """Cursor answering COPY INTO and GET."""
+        mock_cursor = Mock()
+        mock_cursor.fetchone.return_value = (1000, 5000, 4000)
+        mock_cursor.description = [('file',), ('size',), ('status',), ('message',)]
+        mock_cursor.fetchall.return_value = [
+            ("data_0_0_0.snappy.parquet", 2500, "DOWNLOADED", ""),
+            ("data_0_0_1.snappy.parquet", 1500, "DOWNLOADED", ""),
+        ]
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_export_unloads_downloads_and_cleans_up(self, executor, export_cursor, tmp_path):
+        """Test COPY INTO @~, GET to the directory, then REMOVE."""
+        response = await executor.export("SELECT * FROM t", str(tmp_path / "out"))
+
+        statements = [c[0][0] for c in export_cursor.execute.call_args_list]
+        assert statements[0].startswith("COPY INTO @~/sf-export/")
+        assert "FROM (\nSELECT * FROM t\n)" in statements[0]
+        assert "TYPE = PARQUET" in statements[0]
+        assert statements[1].startswith("GET @~/sf-export/")
+        assert f"'file://{tmp_path / 'out'}/'" in statements[1]
+        assert statements[2].startswith("REMOVE @~/sf-export/")
+
+        assert response.success is True
+        assert response.rows_exported == 1000
+        assert response.bytes == 4000
+        assert response.files[0] == str(tmp_path / "out" / "data_0_0_0.snappy.parquet")
+        assert (tmp_path / "out").is_dir()
+
+    @pytest.mark.asyncio
+    async def test_export_keeps_trailing_comment_inside_subquery(self, executor, export_cursor, tmp_path):
+        """Test that a trailing -- comment cannot swallow the closing parenthesis."""
+        await executor.export("SELECT 1; -- daily extract", str(tmp_path))
+
+        copy_sql = export_cursor.execute.call_args_list[0][0][0]
+        assert "FROM (\nSELECT 1 -- daily extract\n) FILE_FORMAT" in copy_sql
+
+    @pytest.mark.asyncio
+    async def test_export_csv_is_compressed(self, executor, export_cursor, tmp_path):
+        """Test that CSV exports are gzipped."""
+        await executor.export("SELECT 1", str(tmp_path), format="csv")
+
+        copy_sql = export_cursor.execute.call_args_list[0][0][0]
+        assert "TYPE = CSV COMPRESSION = GZIP" in copy_sql
+
+    @pytest.mark.asyncio
+    async def test_export_rejects_non_queries(self, executor, export_cursor, tmp_path):
+        """Test that only SELECT/WITH can be exported."""
+        response = await executor.export("SHOW TABLES", str(tmp_path))
+
+        assert response.success is False
+        export_cursor.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_export_cleans_up_after_failure(self, executor, export_cursor, tmp_path):
+        """Test that staged files are removed even when GET fails."""
+        export_cursor.execute.side_effect = [None, Exception("download failed"), None]
+
+        response = await executor.export("SELECT 1", str(tmp_path))
+
+        assert response.success is False
+        assert export_cursor.execute.call_args_list[-1][0][0].startswith("REMOVE")
+
+
+class TestSingleFlight:
+    """Test deduplication of identical in-flight queries."""
+
+    @pytest.fixture
+    def slow_cursor(self, mock_connection):
+        """Cursor whose execute takes long enough for requests to overlap."""
+        mock_cursor = Mock()
+        mock_cursor.description = [('name',)]
+        mock_cursor.fetchmany.return_value = [('t1',)]
+        mock_cursor.execute.side_effect = lambda *args: time.sleep(0.05)
+        mock_connection.connect.return_value.cursor.return_value = mock_cursor
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_queries_share_execution(self, mock_connection, slow_cursor):
+        """Test that identical concurrent reads run once and all get the result."""
+        executor = QueryExecutor(mock_connection)
+
+        responses = await asyncio.gather(
+            executor.execute("SHOW TABLES"),
+            executor.execute("show   tables"),
+            executor.execute("SHOW TABLES;"),
+        )
+
+        assert slow_cursor.execute.call_count == 1
+        assert all(r.data == [('t1',)] for r in responses)
+        assert sum(r.deduplicated for r in responses) == 2
+        assert executor.flight_stats() == {'in_flight': 0, 'executions': 1, 'saved': 2}
+
+    @pytest.mark.asyncio
+    async def test_different_limits_run_separately(self, mock_connection, slow_cursor):
+        """Test that the limit is part of the key."""
+        executor = QueryExecutor(mock_connection)
+
+        await asyncio.gather(
+            executor.execute("SHOW TABLES", limit=10),
+            executor.execute("SHOW TABLES", limit=20),
+        )
+
+        assert slow_cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_writes_are_never_shared(self, mock_connection, slow_cursor):
+        """Test that identical writes each execute."""
+        executor = QueryExecutor(mock_connection, validator=WriteValidator())
+
+        await asyncio.gather(
+            executor.execute("INSERT INTO t VALUES (1)"),
+            executor.execute("INSERT INTO t VALUES (1)"),
+        )
+
+        assert slow_cursor.execute.call_count == 2
+
+    @pytest.mark.asyncio
+    async def test_followers_survive_leader_cancellation(self, mock_connection, slow_cursor):
+        """Test that a cancelled first caller does not fail the others."""
+        executor = QueryExecutor(mock_connection)
+
+        leader = asyncio.create_task(executor.execute("SHOW TABLES"))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(executor.execute("SHOW TABLES"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+
+        response = await follower
+        assert response.success is True
+        assert response.deduplicated is True
+
+
+class TestStatementTimeout:
+    """Test per-request statement timeouts and cancellation of abandoned queries."""
+
+    @pytest.fixture
+    def blocking_cursor(self, mock_connection):
+        """Cursor whose query runs until SYSTEM$CANCEL_ALL_QUERIES is issued."""
+        cancelled = threading.Event()
+        mock_cursor = Mock()
+        mock_cursor.description = [('n',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+
+        def execute(sql, *args, **kwargs):
+            if 'CANCEL_ALL_QUERIES' in sql:
+                cancelled.set()
+            else:
+                cancelled.wait(2)
+
+        mock_cursor.execute.side_effect = execute
+        mock_cursor.cancelled = cancelled
+        conn = mock_connection.connect.return_value
+        conn.cursor.return_value = mock_cursor
+        conn.session_id = 4242
+        return mock_cursor
+
+    @pytest.mark.asyncio
+    async def test_timeout_sets_statement_parameter(self, mock_connection):
+        """Test that timeout_seconds is sent as a parameter of that statement only."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.description = [('n',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        executor = QueryExecutor(mock_connection)
+
+        await executor.execute("SELECT 1", timeout_seconds=30)
+
+        mock_cursor.execute.assert_called_once_with(
+            "SELECT 1", _statement_params={'STATEMENT_TIMEOUT_IN_SECONDS': 30}
+        )
+
+    @pytest.mark.asyncio
+    async def test_no_timeout_sends_no_parameter(self, mock_connection):
+        """Test that the session timeout applies when none is requested."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.description = [('n',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        executor = QueryExecutor(mock_connection)
+
+        await executor.execute("SELECT 1")
+
+        mock_cursor.execute.assert_called_once_with("SELECT 1")
+
+    @pytest.mark.asyncio
+    async def test_timeout_applies_to_submitted_jobs(self, mock_connection):
+        """Test that execute_async() gets the statement timeout too."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.sfqid = 'qid-1'
+        executor = QueryExecutor(mock_connection)
+
+        await executor.submit("SELECT 1", timeout_seconds=5)
+
+        mock_cursor.execute_async.assert_called_once_with(
+            "SELECT 1", _statement_params={'STATEMENT_TIMEOUT_IN_SECONDS': 5}
+        )
+
+    @pytest.mark.asyncio
+    async def test_cancelling_caller_cancels_snowflake_query(self, mock_connection, blocking_cursor):
+        """Test that an abandoned execute() cancels the running query by session."""
+        executor = QueryExecutor(mock_connection)
+
+        task = asyncio.create_task(executor.execute("SELECT 1"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert await asyncio.to_thread(blocking_cursor.cancelled.wait, 2)
+        blocking_cursor.execute.assert_any_call("SELECT SYSTEM$CANCEL_ALL_QUERIES(?)", (4242,))
+
+    @pytest.mark.asyncio
+    async def test_shared_query_cancelled_only_when_all_callers_leave(self, mock_connection, blocking_cursor):
+        """Test that a deduplicated query keeps running while anyone still waits."""
+        executor = QueryExecutor(mock_connection)
+
+        first = asyncio.create_task(executor.execute("SELECT 1"))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(executor.execute("SELECT 1"))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        await asyncio.sleep(0.05)
+        assert not blocking_cursor.cancelled.is_set()
+
+        second.cancel()
+        assert await asyncio.to_thread(blocking_cursor.cancelled.wait, 2)
+        assert executor.flight_stats()['in_flight'] == 0
+
+    @pytest.mark.asyncio
+    async def test_different_timeouts_do_not_share_execution(self, mock_connection):
+        """Test that a caller never inherits another caller's statement timeout."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.description = [('n',)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        executor = QueryExecutor(mock_connection)
+
+        await asyncio.gather(
+            executor.execute("SELECT 1", timeout_seconds=5),
+            executor.execute("SELECT 1", timeout_seconds=60),
+        )
+
+        assert executor.flight_stats()['executions'] == 2
+
+    def test_member_held_until_cancel_completes(self):
+        """Test that detach() waits for a running cancel, so checkin cannot race it."""
+        from daemon.executor import _Watch
+
+        started, release = threading.Event(), threading.Event()
+        connection = Mock(session_id=1)
+        connection.cursor.return_value.execute.side_effect = lambda *a: (started.set(), release.wait(2))
+        watch = _Watch()
+        watch.attach(connection)
+
+        canceller = threading.Thread(target=watch.cancel)
+        canceller.start()
+        started.wait(2)
+        detacher = threading.Thread(target=watch.detach)
+        detacher.start()
+        detacher.join(0.05)
+        assert detacher.is_alive()
+
+        release.set()
+        canceller.join(2)
+        detacher.join(2)
+        assert not detacher.is_alive()
+
+    def test_cancel_before_start_skips_statement(self, mock_connection):
+        """Test that a statement cancelled while queued never runs."""
+        from daemon.executor import _Watch
+
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        executor = QueryExecutor(mock_connection)
+        watch = _Watch()
+        watch.cancel()
+
+        response = executor._execute_sync("SELECT 1", 100, time.time(), watch=watch)
+
+        assert response.success is False
+        assert "cancelled" in response.error
+        mock_cursor.execute.assert_not_called()
+
+
+class TestSpill:
+    """Test spilling large results to memory-mapped files."""
+
+    @pytest.fixture
+    def large_cursor(self, mock_connection):
+        """Cursor reporting a 5-row result."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.description = [('n',)]
+        mock_cursor.rowcount = 5
+        mock_cursor.fetchmany.side_effect = lambda size: [(i,) for i in range(min(size, 5))]
+        mock_cursor.fetchall.return_value = [(i,) for i in range(5)]
+        return mock_cursor
+
+    @pytest.fixture(autouse=True)
+    def no_arrow(self):
+        with patch('daemon.spill.arrow_available', return_value=False):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_large_result_is_spilled(self, mock_connection, large_cursor):
+        """Test that a result over the threshold is left in a spill, not in data."""
+        executor = QueryExecutor(mock_connection)
+        executor.spill_rows = 3
+
+        response = await executor.execute("SELECT n FROM t", limit=None, spill=True)
+
+        assert response.data is None
+        assert response.row_count == 5
+        assert [row for rows in response.spill.batches() for row in rows] == [(i,) for i in range(5)]
+        assert 'spill' not in response.model_dump()
+
+    @pytest.mark.asyncio
+    async def test_limit_bounds_spill(self, mock_connection, large_cursor):
+        """Test that the limit is applied while spilling."""
+        executor = QueryExecutor(mock_connection)
+        executor.spill_rows = 3
+
+        response = await executor.execute("SELECT n FROM t", limit=4, spill=True)
+
+        assert response.row_count == 4
+        assert response.truncated is True
+        assert response.total_rows == 5
+
+    @pytest.mark.asyncio
+    async def test_small_result_not_spilled(self, mock_connection, large_cursor):
+        """Test that results under the threshold are returned as usual."""
+        executor = QueryExecutor(mock_connection)
+        executor.spill_rows = 10
+
+        response = await executor.execute("SELECT n FROM t", limit=None, spill=True)
+
+        assert response.spill is None
+        assert response.row_count == 5
+
+    @pytest.mark.asyncio
+    async def test_spill_only_when_requested(self, mock_connection, large_cursor):
+        """Test that callers needing data in memory never get a spill."""
+        executor = QueryExecutor(mock_connection)
+        executor.spill_rows = 3
+
+        response = await executor.execute("SELECT n FROM t", limit=None)
+
+        assert response.spill is None
+        assert response.row_count == 5
+
+    @pytest.mark.asyncio
+    async def test_spilled_results_not_cached(self, mock_connection, large_cursor):
+        """Test that spilled results stay out of the in-memory cache."""
+        cache = ResultCache()
+        executor = QueryExecutor(mock_connection, cache=cache)
+        executor.spill_rows = 3
+
+        await executor.execute("SELECT n FROM t", limit=None, spill=True)
+        response = await executor.execute("SELECT n FROM t", limit=None, spill=True)
+
+        assert response.cached is False
+
+    @pytest.mark.asyncio
+    async def test_deduplicated_callers_each_hold_spill(self, mock_connection, large_cursor):
+        """Test that a shared spill is released only after every caller closes it."""
+        executor = QueryExecutor(mock_connection)
+        executor.spill_rows = 3
+
+        first, second = await asyncio.gather(
+            executor.execute("SELECT n FROM t", limit=None, spill=True),
+            executor.execute("SELECT n FROM t", limit=None, spill=True)
+        )
+
+        assert second.deduplicated is True
+        assert first.spill is second.spill
+        first.spill.close()
+        assert sum(len(rows) for rows in second.spill.batches()) == 5
+        second.spill.close()
+        assert second.spill._mmap is None
+
+
+class TestColumnTypes:
+    """Test type metadata in query responses."""
+
+    @pytest.mark.asyncio
+    async def test_response_carries_column_types(self, mock_connection):
+        """Test that cursor.description types are reported with the rows."""
+        mock_cursor = mock_connection.connect.return_value.cursor.return_value
+        mock_cursor.description = [('ID', 0, None, None, 38, 0, False)]
+        mock_cursor.fetchmany.return_value = [(1,)]
+        executor = QueryExecutor(mock_connection)
+
+        response = await executor.execute("SELECT id FROM t")
+
+        assert response.column_types == [
+            {'name': 'ID', 'type': 'FIXED', 'nullable': False, 'precision': 38, 'scale': 0}
+        ]
+
+
+class TestSessionStateCapture:
+    """Test that session state is read back from the connector."""
+
+    @pytest.fixture
+    def raw(self, mock_connection):
+        """Raw connector connection with a cursor returning one row."""
+        raw = mock_connection.connect.return_value
+        cursor = raw.cursor.return_value
+        cursor.description = [('x',)]
+        cursor.fetchmany.return_value = [(1,)]
+        return raw
+
+    @pytest.mark.asyncio
+    async def test_use_records_names_reported_by_connector(self, mock_connection, raw):
+        """Test that quoted names keep their case instead of being uppercased."""
+        raw.role, raw.warehouse, raw.database, raw.schema = "R", "WH", "my_db", "PUBLIC"
+        state_manager = StateManager()
+        executor = QueryExecutor(mock_connection, state_manager=state_manager)
+
+        await executor.execute('USE DATABASE "my_db"')
+
+        state = state_manager.get_state()
+        assert (state.database, state.schema, state.role) == ("my_db", "PUBLIC", "R")
+        raw.cursor.return_value.fetchone.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_current_functions(self, mock_connection, raw):
+        """Test that CURRENT_* is queried when the connector reports nothing."""
+        raw.cursor.return_value.fetchone.return_value = ("R", "WH", "DB", "SCH")
+        state_manager = StateManager()
+        executor = QueryExecutor(mock_connection, state_manager=state_manager)
+
+        await executor.execute("USE ROLE analyst")
+
+        statements = [c[0][0] for c in raw.cursor.return_value.execute.call_args_list]
+        assert statements[-1].startswith("SELECT CURRENT_ROLE()")
+        assert state_manager.get_state().schema == "SCH"
+
+    @pytest.mark.asyncio
+    async def test_plain_query_does_not_touch_global_state(self, mock_connection, raw):
+        """Test that a SELECT on a member checked out before a concurrent USE cannot undo it."""
+        for field in ('role', 'warehouse', 'database', 'schema'):
+            setattr(mock_connection, field, None)
+        raw.database = "OLD_DB"
+        state_manager = StateManager(initial_state=SessionState(database="OLD_DB"))
+        pool = SnowflakeConnectionPool(min_size=0, max_size=1, connection_factory=lambda: mock_connection)
+        executor = QueryExecutor(pool, state_manager=state_manager)
+
+        def concurrent_use(sql, *args, **kwargs):
+            if sql == "SELECT 1":
+                state_manager.set_database("NEW_DB")
+
+        raw.cursor.return_value.execute.side_effect = concurrent_use
+        await executor.execute("SELECT 1")
+
+        assert state_manager.get_state().database == "NEW_DB"
+        raw.cursor.return_value.fetchone.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_create_database_switches_context(self, mock_connection, raw):
+        """Test that DDL which moves the session to a new object updates the state."""
+        raw.database, raw.schema = "OLD_DB", "OLD"
+        state_manager = StateManager(initial_state=SessionState(database="OLD_DB", schema="OLD"))
+        executor = QueryExecutor(mock_connection, state_manager=state_manager, validator=WriteValidator())
+
+        def create(sql, *args, **kwargs):
+            raw.database, raw.schema = "SCRATCH", "PUBLIC"
+
+        raw.cursor.return_value.execute.side_effect = create
+        await executor.execute("CREATE DATABASE scratch")
+
+        state = state_manager.get_state()
+        assert (state.database, state.schema) == ("SCRATCH", "PUBLIC")
+
+
+class TestCatalogInvalidation:
+    """Test that DDL through the executor reaches the metadata catalog."""
+
+    @pytest.mark.asyncio
+    async def test_ddl_invalidates_catalog(self, mock_connection):
+        """Test that DDL marks catalog metadata stale and reads do not."""
+        cursor = mock_connection.connect.return_value.cursor.return_value
+        cursor.description = [('status',)]
+        cursor.fetchmany.return_value = [("Table T successfully created.",)]
+        catalog = Mock()
+        executor = QueryExecutor(mock_connection, validator=WriteValidator(), catalog=catalog)
+
+        await executor.execute("CREATE TABLE t (x INT)")
+        await executor.execute("SELECT x FROM t")
+
+        catalog.invalidate.assert_called_once()
+        assert catalog.invalidate.call_args[0][0] == "CREATE TABLE t (x INT)"
@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+
+from daemon.formatters import CsvRenderer, JsonRenderer, TableRenderer, render
+
+
+def run(renderer, *batches, execution_time=None):
+    out = renderer.start()
+    for batch in batches:
+        out += renderer.rows(batch)
+    return (out + renderer.end(execution_time)).decode()
+
+
+class TestTableRenderer:
+    """Test markdown table output."""
+
+    def test_padded_and_aligned(self):
+        """Test that columns are padded and numbers right-aligned."""
+        text = render('table', ['ID', 'NAME'], [(1, 'Alice'), (22, 'Bo')])
+
+        assert text == (
+            "| ID | NAME  |\n"
+            "|---:|-------|\n"
+            "|  1 | Alice |\n"
+            "| 22 | Bo    |\n"
+        )
+
+    def test_null_and_escaping(self):
+        """Test NULL rendering and escaping of pipes and line breaks."""
+        text = render('table', ['V'], [(None,), ('a|b',), ('x\ny',)])
+
+        assert "| NULL |" in text
+        assert "a\\|b" in text
+        assert "x\\ny" in text
+        assert text.count("\n") == 5
+
+    def test_widths_from_first_batch(self):
+        """Test that later, wider values print in full without re-padding earlier rows."""
+        renderer = TableRenderer(['V'], summary=False)
+        first = renderer.rows([('ab',)])
+        later = renderer.rows([('abcdef',)])
+
+        assert first.decode().splitlines()[-1] == "| ab |"
+        assert later.decode() == "| abcdef |\n"
+
+    def test_summary_line(self):
+        """Test the closing row count, and the message for empty results."""
+        assert run(TableRenderer(['A']), [(1,)], execution_time=0.25).endswith("\n✓ 1 row(s) in 0.250s\n")
+        assert run(TableRenderer(['A'])).startswith("No results returned\n")
+
+
+class TestCsvRenderer:
+    """Test CSV output."""
+
+    def test_quoting_and_nulls(self):
+        """Test that fields are quoted as needed and NULL is empty."""
+        text = run(CsvRenderer(['A', 'B']), [('x,y', None)], [('say "hi"', 2)])
+
+        assert list(csv.reader(io.StringIO(text))) == [['A', 'B'], ['x,y', ''], ['say "hi"', '2']]
+
+    def test_values_as_text(self):
+        """Test that timestamps are ISO 8601 and binary is hex."""
+        text = run(CsvRenderer(['T', 'B']), [(datetime(2024, 1, 2, 3, 4), b'\x01\x02')])
+
+        assert text.splitlines()[1] == "2024-01-02T03:04:00,0102"
+
+
+class TestJsonRenderer:
+    """Test JSON output."""
+
+    def test_array_of_objects_across_batches(self):
+        """Test that batches join into one valid JSON array."""
+        text = run(JsonRenderer(['ID', 'AMOUNT']), [(1, Decimal('2.50'))], [(2, None)])
+
+        assert json.loads(text) == [{'ID': 1, 'AMOUNT': '2.50'}, {'ID': 2, 'AMOUNT': None}]
+
+    def test_empty_result(self):
+        """Test that no rows renders an empty array."""
+        assert json.loads(run(JsonRenderer(['ID']))) == []
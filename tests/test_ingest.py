@@ -0,0 +1,90 @@
+"""Tests for bulk loading helpers."""
+from unittest.mock import Mock
+
+from daemon import ingest
+
+
+class TestCsv:
+    """Test the CSV written for staged COPY."""
+
+    def test_write_csv_quotes_text_and_leaves_null_empty(self, tmp_path):
+        """Test that NULL and empty string stay distinguishable."""
+        path = tmp_path / "rows.csv"
+        ingest.write_csv(str(path), ["a", "b", "c"], [(None, "", 1), ('x"y', True, 2.5)])
+
+        assert path.read_text().splitlines() == [
+            '"a","b","c"',
+            ',"",1',
+            '"x""y",TRUE,2.5',
+        ]
+
+
+class TestTableStage:
+    """Test table stage names."""
+
+    def test_unqualified(self):
+        """Test the stage of an unqualified table."""
+        assert ingest.table_stage("t") == "@%t"
+
+    def test_qualified(self):
+        """Test that the % goes in front of the table part only."""
+        assert ingest.table_stage("db.s.t") == "@db.s.%t"
+
+
+class TestInsertMany:
+    """Test array-bound INSERTs."""
+
+    def test_insert_many_uses_executemany(self):
+        """Test that all rows go in one executemany call with ? binds."""
+        cursor = Mock()
+        cursor.rowcount = 2
+        conn = Mock()
+        conn.cursor.return_value = cursor
+
+        loaded = ingest.insert_many(conn, "t", ["a", "b"], [(1, "x"), (2, "y")])
+
+        cursor.executemany.assert_called_once_with(
+            "INSERT INTO t (a, b) VALUES (?, ?)", [[1, "x"], [2, "y"]]
+        )
+        assert loaded == 2
+        cursor.close.assert_called_once()
+
+
+class TestCopyFile:
+    """Test staged COPY INTO."""
+
+    def test_copy_file_puts_and_copies(self, tmp_path):
+        """Test PUT to the table stage, COPY of that file, and the summary."""
+        path = tmp_path / "rows.csv"
+        path.write_text('"a"\n1\n')
+        cursor = Mock()
+        cursor.description = [('FILE',), ('STATUS',), ('ROWS_LOADED',)]
+        cursor.fetchall.return_value = [("rows.csv.gz", "LOADED", 1)]
+        conn = Mock()
+        conn.cursor.return_value = cursor
+
+        loaded, results = ingest.copy_file(conn, "db.s.t", str(path), ["a"])
+
+        put_sql = cursor.execute.call_args_list[0][0][0]
+        copy_sql = cursor.execute.call_args_list[1][0][0]
+        assert put_sql.startswith(f"PUT 'file://{path}' @db.s.%t")
+        assert copy_sql.startswith("COPY INTO db.s.t (a) FROM @db.s.%t FILES = ('rows.csv.gz')")
+        assert "PURGE = TRUE" in copy_sql
+        assert loaded == 1
+        assert results == [{"file": "rows.csv.gz", "status": "LOADED", "rows_loaded": 1}]
+
+    def test_copy_rows_stages_unique_file_names(self):
+        """Test that concurrent loads into one table never share a staged file."""
+        cursor = Mock()
+        cursor.description = None
+        cursor.fetchall.return_value = []
+        conn = Mock()
+        conn.cursor.return_value = cursor
+
+        ingest.copy_rows(conn, "t", ["a"], [(1,)])
+        ingest.copy_rows(conn, "t", ["a"], [(2,)])
+
+        puts = [c[0][0] for c in cursor.execute.call_args_list if c[0][0].startswith("PUT")]
+        names = [put.split("'")[1].rsplit('/', 1)[-1] for put in puts]
+        assert len(set(names)) == 2
+        assert all(name.startswith("sf-ingest-") for name in names)
@@ -0,0 +1,79 @@
+"""Tests for paged result handles."""
+from unittest.mock import Mock
+from daemon.results import ResultHandle, ResultPager
+
+
+def make_cursor(row_count):
+    """Mock cursor serving row_count rows through fetchmany."""
+    rows = [(i,) for i in range(row_count)]
+    cursor = Mock()
+
+    def fetchmany(size):
+        batch = rows[:size]
+        del rows[:size]
+        return batch
+
+    cursor.fetchmany.side_effect = fetchmany
+    return cursor
+
+
+class TestResultHandle:
+    """Tests for reading pages from an open cursor."""
+
+    def test_sequential_pages_read_from_cursor(self):
+        handle = ResultHandle("q", ["ID"], cursor=make_cursor(5))
+        assert handle.read(0, 2) == [(0,), (1,)]
+        assert handle.read(2, 2) == [(2,), (3,)]
+        assert handle.position == 4
+
+    def test_forward_skip_discards_rows(self):
+        handle = ResultHandle("q", ["ID"], cursor=make_cursor(10))
+        assert handle.read(6, 2) == [(6,), (7,)]
+
+    def test_earlier_page_not_served_from_cursor(self):
+        handle = ResultHandle("q", ["ID"], cursor=make_cursor(10))
+        handle.read(0, 4)
+        assert handle.read(0, 2) is None
+
+    def test_short_page_closes_cursor_and_sets_total(self):
+        cursor = make_cursor(3)
+        handle = ResultHandle("q", ["ID"], cursor=cursor)
+
+        assert handle.read(0, 5) == [(0,), (1,), (2,)]
+
+        cursor.close.assert_called_once()
+        assert handle.cursor is None
+        assert handle.total_rows == 3
+
+    def test_prefetched_pages_are_bounded(self):
+        handle = ResultHandle("q", ["ID"])
+        for offset in range(5):
+            handle.keep(offset, 1, [(offset,)])
+        assert len(handle.pages) == ResultHandle.MAX_PREFETCHED
+
+
+class TestResultPager:
+    """Tests for the handle registry."""
+
+    def test_get_returns_registered_handle(self):
+        pager = ResultPager()
+        handle = pager.register(ResultHandle("q1", []))
+        assert pager.get("q1") is handle
+        assert pager.get("missing") is None
+
+    def test_least_recently_used_handle_closed_over_cap(self):
+        pager = ResultPager(max_handles=2)
+        first = pager.register(ResultHandle("q1", [], cursor=Mock()))
+        pager.register(ResultHandle("q2", []))
+        pager.register(ResultHandle("q3", []))
+
+        assert pager.get("q1") is None
+        assert first.cursor is None
+
+    def test_idle_handles_expire(self):
+        pager = ResultPager(idle_timeout=60)
+        old = pager.register(ResultHandle("old", []))
+        old.last_used -= 120
+        pager.register(ResultHandle("new", []))
+
+        assert pager.get("old") is None
@@ -0,0 +1,163 @@
+"""Tests for the query scheduler."""
+import asyncio
+
+import pytest
+
+from daemon.scheduler import (
+    BATCH,
+    INTERACTIVE,
+    NORMAL,
+    QueryScheduler,
+    QueueFullError,
+    classify,
+)
+
+
+class TestClassify:
+    """Test priority classes."""
+
+    @pytest.mark.parametrize("sql,limit,expected", [
+        ("SHOW TABLES", 100, INTERACTIVE),
+        ("DESCRIBE TABLE t", 100, INTERACTIVE),
+        ("USE DATABASE d", 100, INTERACTIVE),
+        ("SELECT * FROM t", 100, INTERACTIVE),
+        ("SELECT * FROM t", 50000, NORMAL),
+        ("SELECT * FROM t", None, BATCH),
+        ("INSERT INTO t VALUES (1)", 100, NORMAL),
+    ])
+    def test_classify(self, sql, limit, expected):
+        """Test that metadata and small reads are interactive, unbounded reads batch."""
+        assert classify(sql, limit) == expected
+
+
+class TestQueryScheduler:
+    """Test slot admission."""
+
+    def test_rejects_invalid_limits(self):
+        """Test that limits below one are refused."""
+        with pytest.raises(ValueError):
+            QueryScheduler(max_concurrent=0)
+
+    def test_from_env_capped_at_capacity(self, monkeypatch):
+        """Test that no more requests are admitted than connections can run."""
+        monkeypatch.setenv("DAEMON_SCHEDULER_MAX_CONCURRENT", "8")
+        assert QueryScheduler.from_env(capacity=5).max_concurrent == 5
+        assert QueryScheduler.from_env(capacity=20).max_concurrent == 8
+        assert QueryScheduler.from_env().max_concurrent == 8
+
+    @pytest.mark.asyncio
+    async def test_grants_immediately_when_free(self):
+        """Test that a free scheduler admits without queueing."""
+        scheduler = QueryScheduler(max_concurrent=2)
+
+        async with scheduler.slot("a"):
+            assert scheduler.running == 1
+            assert scheduler.queue_depth == 0
+        assert scheduler.running == 0
+
+    @pytest.mark.asyncio
+    async def test_interactive_jumps_ahead_of_batch(self):
+        """Test that waiting requests are granted by priority, not arrival."""
+        scheduler = QueryScheduler(max_concurrent=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        async def run(name, priority):
+            async with scheduler.slot(name, priority):
+                order.append(name)
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(run("batch", BATCH))
+        interactive = asyncio.create_task(run("interactive", INTERACTIVE))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 2
+
+        release.set()
+        await asyncio.gather(holder, batch, interactive)
+
+        assert order == ["interactive", "batch"]
+
+    @pytest.mark.asyncio
+    async def test_per_client_limit_lets_other_clients_through(self):
+        """Test that one busy client does not block another."""
+        scheduler = QueryScheduler(max_concurrent=4, per_client=1)
+        release = asyncio.Event()
+
+        async def hold(client):
+            async with scheduler.slot(client):
+                await release.wait()
+
+        first = asyncio.create_task(hold("a"))
+        second = asyncio.create_task(hold("a"))
+        other = asyncio.create_task(hold("b"))
+        await asyncio.sleep(0)
+
+        assert scheduler.running == 2
+        assert scheduler.queue_depth == 1
+
+        release.set()
+        await asyncio.gather(first, second, other)
+        assert scheduler.running == 0
+
+    @pytest.mark.asyncio
+    async def test_full_queue_raises_with_retry_after(self):
+        """Test backpressure once max_queue requests are waiting."""
+        scheduler = QueryScheduler(max_concurrent=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        tasks = [asyncio.create_task(hold()), asyncio.create_task(hold())]
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError) as excinfo:
+            async with scheduler.slot("b"):
+                pass
+        assert excinfo.value.retry_after >= 1
+        assert scheduler.rejected == 1
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    @pytest.mark.asyncio
+    async def test_cancelled_waiter_leaves_queue(self):
+        """Test that a request that goes away stops waiting."""
+        scheduler = QueryScheduler(max_concurrent=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with scheduler.slot("a"):
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        assert scheduler.queue_depth == 0
+
+        release.set()
+        await holder
+        assert scheduler.running == 0
+
+    @pytest.mark.asyncio
+    async def test_reports_wait_percentiles(self):
+        """Test that stats include queue wait percentiles."""
+        scheduler = QueryScheduler()
+        assert scheduler.wait_percentiles()['p50'] is None
+
+        async with scheduler.slot("a"):
+            pass
+
+        stats = scheduler.stats()
+        assert stats['wait_seconds']['p99'] == 0.0
+        assert stats['queued_by_priority'] == {'interactive': 0, 'normal': 0, 'batch': 0}
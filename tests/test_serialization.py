@@ -0,0 +1,65 @@
+import json
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+
+from daemon.models import QueryResponse
+from daemon.serialization import dumps, response_body, rows_fragment
+
+
+class TestDumps:
+    """Test explicit encoding of Snowflake values."""
+
+    def test_decimal_kept_exact(self):
+        """Test that NUMBER values with a scale keep every digit."""
+        assert dumps([Decimal('12345678901234567890.123456789')]) == b'["12345678901234567890.123456789"]'
+        assert dumps([Decimal('1.50')]) == b'["1.50"]'
+
+    def test_binary_as_hex(self):
+        """Test that BINARY values are hex, matching Snowflake's output format."""
+        assert dumps([b'\x00\xffab']) == b'["00ff6162"]'
+
+    def test_temporal_values_iso(self):
+        """Test that dates and times are ISO 8601, with UTC as Z."""
+        row = (
+            datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc),
+            datetime(2024, 1, 2, 3, 4, 5, 600000),
+            date(2024, 1, 2),
+            time(3, 4, 5),
+        )
+
+        assert json.loads(dumps(row)) == [
+            "2024-01-02T03:04:05Z", "2024-01-02T03:04:05.600000", "2024-01-02", "03:04:05"
+        ]
+
+    def test_other_types_follow_pydantic(self):
+        """Test that types orjson lacks fall back to Pydantic's JSON form."""
+        assert dumps([timedelta(seconds=90)]) == b'["PT1M30S"]'
+
+    def test_big_integers_in_rows_fragment(self):
+        """Test that spilled rows with wide integers do not fail mid-stream."""
+        assert rows_fragment([(2 ** 70, 1)]) == b'["%d",1]' % 2 ** 70
+
+    def test_rows_fragment(self):
+        """Test that rows are encoded without the enclosing brackets."""
+        assert rows_fragment([(1, 'a'), (2, None)]) == b'[1,"a"],[2,null]'
+
+
+class TestResponseBody:
+    """Test pre-serialized /query bodies."""
+
+    def test_matches_model_fields(self):
+        """Test that the body has the same fields as the Pydantic encoding."""
+        response = QueryResponse(
+            success=True, data=[(1, Decimal('2.5'), 'x')], columns=['A', 'B', 'C'], row_count=1
+        )
+
+        body = json.loads(response_body(response))
+
+        assert body == json.loads(response.model_dump_json())
+        assert body['data'] == [[1, '2.5', 'x']]
+
+    def test_big_integers_as_strings(self):
+        """Test that integers beyond 64 bits are exact strings, binary stays hex."""
+        response = QueryResponse(success=True, data=[(2 ** 70, b'\xff')], columns=['N', 'B'], row_count=1)
+
+        assert json.loads(response_body(response))['data'] == [[str(2 ** 70), 'ff']]
@@ -0,0 +1,137 @@
+import os
+from unittest.mock import Mock, patch
+
+import pytest
+
+from daemon import spill as spill_module
+from daemon.spill import ArrowSpill, RowSpill, spill_cursor
+
+
+class TestRowSpill:
+    """Test the pickled-batch spill format."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that batches read back as the tuples written."""
+        spill = RowSpill(['a', 'b'], str(tmp_path))
+        spill.append([(1, 'x'), (2, 'y')])
+        spill.append([[3, None]])
+        spill.finish()
+
+        assert list(spill.batches()) == [[(1, 'x'), (2, 'y')], [(3, None)]]
+        assert spill.row_count == 3
+        spill.close()
+
+    def test_file_unlinked_once_mapped(self, tmp_path):
+        """Test that the spill takes no directory entry after finish()."""
+        spill = RowSpill(['a'], str(tmp_path))
+        spill.append([(1,)])
+        spill.finish()
+
+        assert os.listdir(tmp_path) == []
+        assert list(spill.batches()) == [[(1,)]]
+        spill.close()
+
+    def test_empty_spill(self, tmp_path):
+        """Test that a spill with no rows can be finished and read."""
+        spill = RowSpill(['a'], str(tmp_path))
+        spill.append([])
+        spill.finish()
+
+        assert list(spill.batches()) == []
+        assert spill.row_count == 0
+        spill.close()
+
+    def test_close_removes_unfinished_file(self, tmp_path):
+        """Test that abandoning a spill while writing removes its file."""
+        spill = RowSpill(['a'], str(tmp_path))
+        spill.append([(1,)])
+        spill.close()
+
+        assert os.listdir(tmp_path) == []
+
+
+class TestSpillCursor:
+    """Test draining a cursor into a spill."""
+
+    @pytest.fixture(autouse=True)
+    def no_arrow(self):
+        with patch.object(spill_module, 'arrow_available', return_value=False):
+            yield
+
+    def test_fetches_in_batches(self, tmp_path):
+        """Test that rows are drained with fetchmany() until exhausted."""
+        cursor = Mock()
+        cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)]]
+
+        with patch.object(spill_module, 'SPILL_BATCH_ROWS', 2):
+            spill = spill_cursor(cursor, ['n'], directory=str(tmp_path))
+
+        assert spill.row_count == 3
+        assert [row for rows in spill.batches() for row in rows] == [(1,), (2,), (3,)]
+        spill.close()
+
+    def test_stops_at_limit(self, tmp_path):
+        """Test that no more than ``limit`` rows are fetched."""
+        cursor = Mock()
+        cursor.fetchmany.side_effect = [[(1,), (2,)], [(3,)]]
+
+        with patch.object(spill_module, 'SPILL_BATCH_ROWS', 2):
+            spill = spill_cursor(cursor, ['n'], limit=3, directory=str(tmp_path))
+
+        assert cursor.fetchmany.call_args_list[-1].args == (1,)
+        assert spill.row_count == 3
+        spill.close()
+
+    def test_error_removes_file(self, tmp_path):
+        """Test that a failed fetch leaves no temp file behind."""
+        cursor = Mock()
+        cursor.fetchmany.side_effect = RuntimeError("connection lost")
+
+        with pytest.raises(RuntimeError):
+            spill_cursor(cursor, ['n'], directory=str(tmp_path))
+
+        assert os.listdir(tmp_path) == []
+
+
+class TestSpillFormat:
+    """Test the choice between Arrow and row spills."""
+
+    def test_json_results_use_row_spill(self, tmp_path):
+        """Test that SHOW-style JSON results never call fetch_arrow_batches()."""
+        cursor = Mock(_query_result_format='json')
+        cursor.fetchmany.return_value = [(1,)]
+
+        with patch.object(spill_module, 'arrow_available', return_value=True):
+            spill = spill_cursor(cursor, ['n'], directory=str(tmp_path))
+
+        assert isinstance(spill, RowSpill)
+        cursor.fetch_arrow_batches.assert_not_called()
+        spill.close()
+
+    def test_arrow_batches_forced_to_microseconds(self, tmp_path):
+        """Test that every Arrow batch is fetched with one timestamp precision."""
+        pa = pytest.importorskip('pyarrow')
+        cursor = Mock(_query_result_format='arrow')
+        cursor.fetch_arrow_batches.return_value = iter([pa.table({'n': [1]})])
+
+        spill = spill_cursor(cursor, ['n'], directory=str(tmp_path))
+
+        cursor.fetch_arrow_batches.assert_called_once_with(force_microsecond_precision=True)
+        spill.close()
+
+
+class TestArrowSpill:
+    """Test the Arrow IPC spill format."""
+
+    def test_round_trip(self, tmp_path):
+        """Test that Arrow batches read back as row tuples."""
+        pa = pytest.importorskip('pyarrow')
+
+        spill = ArrowSpill(['a', 'b'], str(tmp_path))
+        spill.append(pa.table({'a': [1, 2], 'b': ['x', None]}))
+        spill.append(pa.table({'a': [3], 'b': ['z']}))
+        spill.finish()
+
+        assert list(spill.batches()) == [[(1, 'x'), (2, None)], [(3, 'z')]]
+        assert spill.row_count == 3
+        spill.close()
@@ -1,5 +1,6 @@
+import json
 import pytest
-from daemon.state import StateManager, SessionState
+from daemon.state import StateManager, SessionState, load_state
 
 
 class TestSessionState:
@@ -137,6 +138,19 @@ class TestStateManager:
         assert state.warehouse is None
         assert state.role is None
 
+    def test_update_sets_several_fields(self):
+        """Test that update() changes only the given fields."""
+        manager = StateManager(initial_state=SessionState(role="R"))
+        manager.update(database="DB", schema="S")
+
+        state = manager.get_state()
+        assert (state.database, state.schema, state.role) == ("DB", "S", "R")
+
+    def test_update_rejects_unknown_fields(self):
+        """Test that a typo in a field name is an error."""
+        with pytest.raises(ValueError):
+            StateManager().update(datbase="DB")
+
 
 class TestStateManagerEdgeCases:
     """Test edge cases for StateManager."""
@@ -170,3 +184,61 @@ class TestStateManagerEdgeCases:
         for i in range(10):
             manager.set_database(f"DB_{i}")
             assert manager.get_state().database == f"DB_{i}"
+
+
+class TestStatePersistence:
+    """Test saving session state between daemon runs."""
+
+    def test_changes_are_saved(self, tmp_path):
+        """Test that every change is written to the state file."""
+        path = tmp_path / "state.json"
+        manager = StateManager(path=str(path))
+
+        manager.set_database("DB")
+        manager.update(schema="S")
+
+        assert json.loads(path.read_text())["database"] == "DB"
+        assert load_state(str(path)) == SessionState(database="DB", schema="S")
+
+    def test_from_env_restores_saved_state(self, tmp_path, monkeypatch):
+        """Test that a new manager starts where the previous one stopped."""
+        path = tmp_path / "state.json"
+        monkeypatch.setenv("DAEMON_STATE_FILE", str(path))
+        StateManager.from_env().update(role="ANALYST", warehouse="wh")
+
+        state = StateManager.from_env().get_state()
+
+        assert (state.role, state.warehouse) == ("ANALYST", "wh")
+
+    def test_unreadable_file_is_ignored(self, tmp_path):
+        """Test that a missing or corrupt file means no saved state."""
+        path = tmp_path / "state.json"
+        assert load_state(str(path)) is None
+        path.write_text("{not json")
+        assert load_state(str(path)) is None
+
+    def test_unwritable_file_does_not_fail(self, tmp_path):
+        """Test that persistence errors never reach the caller."""
+        blocker = tmp_path / "file"
+        blocker.write_text("")
+        manager = StateManager(path=str(blocker / "state.json"))
+
+        manager.set_role("R")
+
+        assert manager.get_state().role == "R"
+
+    def test_discard_forgets_state_and_file(self, tmp_path):
+        """Test that a rejected state is cleared and not restored again."""
+        path = tmp_path / "state.json"
+        manager = StateManager(path=str(path))
+        manager.update(role="GONE", database="DB")
+
+        manager.discard()
+
+        assert manager.get_state() == SessionState()
+        assert not path.exists()
+
+    def test_empty_env_disables_persistence(self, monkeypatch):
+        """Test that DAEMON_STATE_FILE= turns saving off."""
+        monkeypatch.setenv("DAEMON_STATE_FILE", "")
+        assert StateManager.from_env().path is None
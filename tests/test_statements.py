@@ -0,0 +1,144 @@
+"""Tests for SQL text helpers."""
+import pytest
+from daemon.statements import (
+    is_read_only,
+    is_volatile,
+    normalize_sql,
+    qualified_objects,
+    quote_identifier,
+    referenced_objects,
+    statement_type,
+    strip_terminator,
+    to_qmark
+)
+
+
+class TestNormalizeSql:
+    """Tests for normalize_sql."""
+
+    def test_collapses_whitespace_and_case(self):
+        assert normalize_sql("select  *\n  from   t") == "SELECT * FROM T"
+
+    def test_strips_trailing_semicolons(self):
+        assert normalize_sql("SELECT 1;  ;") == "SELECT 1"
+
+    def test_drops_comments(self):
+        assert normalize_sql("SELECT 1 -- note\n/* block */ FROM t") == "SELECT 1 FROM T"
+
+    def test_preserves_string_literals(self):
+        assert normalize_sql("select 'a  B' from t") == "SELECT 'a  B' FROM T"
+
+    def test_preserves_quoted_identifiers(self):
+        assert normalize_sql('select * from "MixedCase"') == 'SELECT * FROM "MixedCase"'
+
+
+class TestStripTerminator:
+    """Test removing a statement's trailing semicolon."""
+
+    def test_semicolon_before_comment(self):
+        """Test that a semicolon followed by a comment is removed."""
+        assert strip_terminator("SELECT 1; -- done") == "SELECT 1 -- done"
+        assert strip_terminator("SELECT 1 ;;\n") == "SELECT 1\n"
+
+    def test_quoted_semicolons_kept(self):
+        """Test that semicolons in literals, identifiers and comments stay."""
+        assert strip_terminator("SELECT ';'") == "SELECT ';'"
+        assert strip_terminator('SELECT ";" FROM t /* a; */') == 'SELECT ";" FROM t /* a; */'
+
+
+class TestStatementType:
+    """Tests for statement classification."""
+
+    def test_statement_type_skips_leading_comment(self):
+        assert statement_type("-- comment\nselect 1") == "SELECT"
+
+    def test_statement_type_empty(self):
+        assert statement_type("   ") == ""
+
+    @pytest.mark.parametrize("sql", ["SELECT 1", "WITH c AS (SELECT 1) SELECT * FROM c", "SHOW TABLES", "DESC TABLE t"])
+    def test_read_only_statements(self, sql):
+        assert is_read_only(sql) is True
+
+    @pytest.mark.parametrize("sql", ["INSERT INTO t VALUES (1)", "DROP TABLE t", "CALL proc()", "USE DATABASE d"])
+    def test_non_read_only_statements(self, sql):
+        assert is_read_only(sql) is False
+
+    def test_volatile_functions_detected(self):
+        assert is_volatile("SELECT CURRENT_TIMESTAMP()") is True
+        assert is_volatile("SELECT RANDOM()") is True
+
+    def test_volatile_names_in_literals_ignored(self):
+        assert is_volatile("SELECT * FROM t WHERE note = 'random'") is False
+
+
+class TestReferencedObjects:
+    """Tests for referenced object extraction."""
+
+    def test_from_and_join(self):
+        sql = "SELECT * FROM db.s.orders o JOIN customers c ON o.id = c.id"
+        assert referenced_objects(sql) == {"ORDERS", "CUSTOMERS"}
+
+    def test_quoted_identifier_keeps_case(self):
+        assert referenced_objects('SELECT * FROM "Mixed Case"') == {"Mixed Case"}
+
+    def test_keywords_in_literals_ignored(self):
+        assert referenced_objects("SELECT * FROM t WHERE x = 'from other'") == {"T"}
+
+    def test_dml_targets(self):
+        assert referenced_objects("INSERT INTO t1 SELECT * FROM t2") == {"T1", "T2"}
+        assert referenced_objects("UPDATE t3 SET a = 1") == {"T3"}
+        assert referenced_objects("MERGE INTO tgt USING src ON tgt.id = src.id") == {"TGT", "SRC"}
+
+    def test_ddl_targets(self):
+        assert referenced_objects("DROP TABLE IF EXISTS s.t") == {"T"}
+        assert referenced_objects("TRUNCATE TABLE t") == {"T"}
+        assert referenced_objects("CREATE OR REPLACE VIEW v AS SELECT * FROM t") == {"V", "T"}
+
+    def test_describe_target(self):
+        assert referenced_objects("DESCRIBE TABLE my_table") == {"MY_TABLE"}
+
+    def test_table_function_is_not_an_object(self):
+        assert referenced_objects("SELECT * FROM TABLE(RESULT_SCAN('id'))") == set()
+
+    def test_qualified_objects_pad_missing_parts(self):
+        assert qualified_objects("SELECT * FROM s.t JOIN db.s2.u ON 1 = 1") == {
+            (None, "S", "T"),
+            ("DB", "S2", "U"),
+        }
+
+
+class TestToQmark:
+    """Test rewriting of :name placeholders."""
+
+    def test_rewrites_known_names_in_order(self):
+        """Test that placeholders become ? and names are listed in order."""
+        sql, names = to_qmark("SELECT * FROM t WHERE a = :a OR b = :b", {"a", "b"})
+        assert sql == "SELECT * FROM t WHERE a = ? OR b = ?"
+        assert names == ["a", "b"]
+
+    def test_leaves_literals_casts_and_paths_alone(self):
+        """Test that strings, ::casts and VARIANT paths are not placeholders."""
+        sql, names = to_qmark("SELECT ':a', x::int, src:a FROM t WHERE y = :a", {"a", "int"})
+        assert sql == "SELECT ':a', x::int, src:a FROM t WHERE y = ?"
+        assert names == ["a"]
+
+    def test_ignores_unknown_names(self):
+        """Test that names without a value are left for Snowflake to reject."""
+        sql, names = to_qmark("SELECT :missing", {"other"})
+        assert sql == "SELECT :missing"
+        assert names == []
+
+
+class TestQuoteIdentifier:
+    """Test identifier quoting for replayed USE statements."""
+
+    def test_uppercase_names_stay_bare(self):
+        """Test that names Snowflake would resolve unquoted are not quoted."""
+        assert quote_identifier("MY_DB") == "MY_DB"
+        assert quote_identifier("WH$1") == "WH$1"
+
+    def test_case_sensitive_names_are_quoted(self):
+        """Test that lowercase, spaces and quotes survive the round trip."""
+        assert quote_identifier("analytics") == '"analytics"'
+        assert quote_identifier('My "Lab"') == '"My ""Lab"""'
+        assert quote_identifier("1DB") == '"1DB"'